@@ -1,43 +1,136 @@
 // API Wrapper
+
+// Thrown by GET helpers so callers can tell "failed" from "empty"
+class APIError extends Error {
+    constructor(message, status = 0) {
+        super(message);
+        this.name = 'APIError';
+        this.status = status;
+    }
+}
+
+// GET responses are kept in localStorage with their ETag: reused outright for
+// CACHE_FRESH_MS, then revalidated with If-None-Match (a 304 costs no body).
+const CACHE_PREFIX = 'apicache:';
+const CACHE_FRESH_MS = 30 * 1000;
+const inflightRequests = new Map();
+
 class API {
     static getHeaders() {
-        // In a real app with token auth, add Authorization header here
-        return {
-            'Content-Type': 'application/json',
-            // 'Authorization': `Token ${localStorage.getItem('token')}`
-        };
+        const headers = { 'Content-Type': 'application/json' };
+        // Signed API token from the login/register responses
+        const token = localStorage.getItem('token');
+        if (token) headers['Authorization'] = `Bearer ${token}`;
+        return headers;
     }
 
-    static async fetchGyms(lat = null, lon = null) {
-        let url = `${config.API_URL}/gyms/`;
-        if (lat && lon) {
-            url += `?lat=${lat}&lon=${lon}`;
-        }
+    static cacheKey(url) {
+        // Responses can be personalised, so keep each user's copies apart
+        return `${CACHE_PREFIX}${localStorage.getItem('username') || ''}:${url}`;
+    }
 
+    static readCache(url) {
         try {
-            const response = await fetch(url);
-            if (!response.ok) throw new Error('Failed to fetch gyms');
-            return await response.json();
+            return JSON.parse(localStorage.getItem(this.cacheKey(url)));
         } catch (error) {
-            console.error('API Error:', error);
-            return [];
+            return null;
         }
     }
 
-    static async getGymDetail(id) {
+    static writeCache(url, etag, body) {
+        const entry = JSON.stringify({ etag, body, at: Date.now() });
         try {
-            const response = await fetch(`${config.API_URL}/gyms/${id}/`);
-            if (!response.ok) throw new Error('Gym not found');
-            return await response.json();
+            localStorage.setItem(this.cacheKey(url), entry);
         } catch (error) {
-            console.error('API Error:', error);
-            return null;
+            // Quota exceeded: drop our cached responses and try once more
+            this.clearCache();
+            try { localStorage.setItem(this.cacheKey(url), entry); } catch (e) { /* give up quietly */ }
         }
     }
 
+    static invalidate(url) {
+        localStorage.removeItem(this.cacheKey(url));
+    }
+
+    static clearCache() {
+        Object.keys(localStorage)
+            .filter(key => key.startsWith(CACHE_PREFIX))
+            .forEach(key => localStorage.removeItem(key));
+    }
+
+    // Cached, revalidated GET; identical concurrent calls share one request
+    static cachedGet(url) {
+        if (inflightRequests.has(url)) return inflightRequests.get(url);
+
+        const request = (async () => {
+            const cached = this.readCache(url);
+            if (cached && Date.now() - cached.at < CACHE_FRESH_MS) return cached.body;
+
+            const headers = this.getHeaders();
+            delete headers['Content-Type'];
+            if (cached && cached.etag) headers['If-None-Match'] = cached.etag;
+
+            let response;
+            try {
+                response = await fetch(url, { headers });
+            } catch (error) {
+                // Offline: a stale copy beats nothing
+                if (cached) return cached.body;
+                throw new APIError('Network error');
+            }
+            if (response.status === 304 && cached) {
+                this.writeCache(url, cached.etag, cached.body);
+                return cached.body;
+            }
+            if (!response.ok) throw new APIError(`Request failed (${response.status})`, response.status);
+
+            const body = await response.json();
+            const etag = response.headers.get('ETag');
+            if (etag) this.writeCache(url, etag, body);
+            return body;
+        })().finally(() => inflightRequests.delete(url));
+
+        inflightRequests.set(url, request);
+        return request;
+    }
+
+    // filters: { city, max_price, duration, open_now, open_at, min_rating } - applied server-side
+    // Rejects with APIError when the request fails.
+    static async fetchGyms(lat = null, lon = null, filters = {}) {
+        const params = new URLSearchParams();
+        if (lat && lon) {
+            params.set('lat', lat);
+            params.set('lon', lon);
+        }
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value !== null && value !== undefined && value !== '') params.set(key, value);
+        });
+
+        let url = `${config.API_URL}/gyms/`;
+        if (params.toString()) {
+            url += `?${params.toString()}`;
+        }
+        return this.cachedGet(url);
+    }
+
+    // Same as fetchGyms but returns { count, filters, facets, results }
+    static async fetchGymFacets(lat = null, lon = null, filters = {}) {
+        return this.fetchGyms(lat, lon, { ...filters, facets: 1 });
+    }
+
+    // Rejects with APIError (status 404 for an unknown gym)
+    static async getGymDetail(id) {
+        return this.cachedGet(`${config.API_URL}/gyms/${id}/`);
+    }
+
+    // Warm the cache, e.g. while a gym card is hovered
+    static prefetchGymDetail(id) {
+        this.getGymDetail(id).catch(() => {});
+    }
+
     static async login(username, password) {
         try {
-            const response = await fetch(`${config.API_URL}/login/`, {
+            const response = await fetch(`${config.API_URL}/auth/token/`, {
                 method: 'POST',
                 headers: this.getHeaders(),
                 body: JSON.stringify({ username, password })
@@ -110,7 +203,8 @@ class API {
     static async createGym(data) {
         try {
             const isFormData = data instanceof FormData;
-            const headers = isFormData ? {} : this.getHeaders();
+            const headers = this.getHeaders();
+            if (isFormData) delete headers['Content-Type'];
 
             // If strictly using FormData, we trust browser to set Content-Type
             // If using JSON, getHeaders sets application/json
@@ -120,6 +214,7 @@ class API {
                 headers: headers,
                 body: isFormData ? data : JSON.stringify(data)
             });
+            this.clearCache();
             return await response.json();
         } catch (error) {
             console.error('Gym Creation Error:', error);
@@ -134,6 +229,7 @@ class API {
                 headers: this.getHeaders(),
                 body: JSON.stringify(data)
             });
+            this.invalidate(`${config.API_URL}/gyms/${gymId}/`);
             return await response.json();
         } catch (error) {
             console.error('Plan Creation Error:', error);
@@ -119,6 +119,8 @@ function logout() {
     localStorage.removeItem('username');
     localStorage.removeItem('userRole');
     localStorage.removeItem('isOwner');
+    localStorage.removeItem('token');
+    if (typeof API !== 'undefined') API.clearCache();
     window.location.href = 'index.html';
 }
 
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""
+Build the standalone frontend into ``frontend/dist/``.
+
+- JS and CSS under ``assets/`` plus ``config.js`` are minified and renamed
+  with a content hash (``assets/js/api.3f9c1d2e7a.js``), so they can be
+  cached forever.
+- HTML pages are copied with their ``src``/``href`` references rewritten
+  to the hashed names; they keep their names and are always revalidated.
+- Every text file gets precompressed ``.gz`` (and ``.br`` when the
+  ``brotli`` package is installed) siblings for servers that serve them
+  directly.
+- ``_headers`` (Netlify format) marks hashed files immutable, and
+  ``manifest.json`` maps source paths to built ones.
+
+Only the standard library is needed: ``python frontend/build.py``.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional; .gz files are always written
+    brotli = None
+
+ROOT = Path(__file__).resolve().parent
+DIST = ROOT / 'dist'
+HASH_LENGTH = 10
+COMPRESS_MIN_BYTES = 256
+COMPRESSIBLE = {'.html', '.js', '.css', '.json', '.svg', '.txt'}
+SKIP = {'build.py', 'README_DEPLOY.md'}
+
+# After one of these, a "/" starts a regex literal rather than a division
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+ASSET_REF = re.compile(r'''(\b(?:src|href)\s*=\s*["'])([^"'#?]+)(["'])''')
+
+
+def minify_js(source):
+    """Drop comments, indentation and blank lines; strings, templates and regexes are kept verbatim.
+
+    Line breaks are preserved so automatic semicolon insertion behaves
+    exactly as in the source.
+    """
+    out = []
+    last = ''  # last significant (non-whitespace) character emitted
+    i, n = 0, len(source)
+
+    def at_line_start():
+        return not out or out[-1].endswith('\n')
+
+    while i < n:
+        c = source[i]
+        nxt = source[i + 1] if i + 1 < n else ''
+        if c in '\'"`':
+            j = i + 1
+            while j < n and source[j] != c:
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '\n' and c != '`':
+                    break
+                j += 1
+            out.append(source[i:j + 1])
+            last, i = c, j + 1
+        elif c == '/' and nxt == '/':
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif c == '/' and nxt == '*':
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            if not at_line_start() and not out[-1].endswith(' '):
+                out.append(' ')  # a/**/b must not become ab
+        elif c == '/' and (not last or last in REGEX_PRECEDERS):
+            j, in_class = i + 1, False
+            while j < n and source[j] != '\n':
+                if source[j] == '\\':
+                    j += 2
+                    continue
+                if source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                elif source[j] == '/' and not in_class:
+                    break
+                j += 1
+            out.append(source[i:j + 1])
+            last, i = '/', j + 1
+        elif c == '\n':
+            while out and out[-1] == ' ':
+                out.pop()
+            if not at_line_start():
+                out.append('\n')
+            i += 1
+        elif c in ' \t\r':
+            if not at_line_start() and out[-1] != ' ':
+                out.append(' ')
+            i += 1
+        else:
+            out.append(c)
+            last, i = c, i + 1
+    return ''.join(out).strip() + '\n'
+
+
+def minify_css(source):
+    """Drop comments and collapse whitespace, leaving quoted strings alone."""
+    parts = re.split(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''', source)
+    for k in range(0, len(parts), 2):  # even indexes are outside strings
+        text = re.sub(r'/\*.*?\*/', '', parts[k], flags=re.S)
+        text = re.sub(r'\s+', ' ', text)
+        text = re.sub(r'\s*([{};,])\s*', r'\1', text)
+        text = re.sub(r':\s+', ':', text)
+        parts[k] = text.replace(';}', '}')
+    return ''.join(parts).strip() + '\n'
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+
+def hashed_name(path, content):
+    digest = hashlib.sha256(content.encode()).hexdigest()[:HASH_LENGTH]
+    return path.with_name(f'{path.stem}.{digest}{path.suffix}')
+
+
+def rewrite_refs(html, page, manifest):
+    """Point local src/href attributes at hashed files."""
+    def replace(match):
+        ref = match.group(2)
+        if '://' in ref or ref.startswith(('/', 'data:', 'mailto:')):
+            return match.group(0)
+        target = (page.parent / ref).resolve()
+        try:
+            key = target.relative_to(ROOT).as_posix()
+        except ValueError:
+            return match.group(0)
+        if key not in manifest:
+            return match.group(0)
+        built = Path(os.path.relpath(ROOT / manifest[key], page.parent))
+        return f'{match.group(1)}{built.as_posix()}{match.group(3)}'
+    return ASSET_REF.sub(replace, html)
+
+
+def precompress(path):
+    data = path.read_bytes()
+    if path.suffix not in COMPRESSIBLE or len(data) < COMPRESS_MIN_BYTES:
+        return
+    path.with_name(path.name + '.gz').write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        path.with_name(path.name + '.br').write_bytes(brotli.compress(data))
+
+
+HEADERS = """\
+# Generated by build.py: hashed assets never change, pages always revalidate
+/assets/*
+  Cache-Control: public, max-age=31536000, immutable
+/config.*.js
+  Cache-Control: public, max-age=31536000, immutable
+/
+  Cache-Control: no-cache
+/*.html
+  Cache-Control: no-cache
+"""
+
+
+def build():
+    if DIST.exists():
+        shutil.rmtree(DIST)
+    DIST.mkdir()
+
+    sources = sorted(
+        p for p in ROOT.rglob('*')
+        if p.is_file() and DIST not in p.parents and p.name not in SKIP and '__pycache__' not in p.parts
+    )
+    manifest = {}
+    before = after = 0
+
+    # Hashed assets first so the pages can reference them
+    for path in sources:
+        rel = path.relative_to(ROOT)
+        if path.suffix not in MINIFIERS:
+            continue
+        source = path.read_text(encoding='utf-8')
+        content = MINIFIERS[path.suffix](source)
+        built = hashed_name(rel, content)
+        (DIST / built).parent.mkdir(parents=True, exist_ok=True)
+        (DIST / built).write_text(content, encoding='utf-8')
+        manifest[rel.as_posix()] = built.as_posix()
+        before += len(source.encode())
+        after += len(content.encode())
+
+    for path in sources:
+        rel = path.relative_to(ROOT)
+        if rel.as_posix() in manifest:
+            continue
+        (DIST / rel).parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == '.html':
+            html = rewrite_refs(path.read_text(encoding='utf-8'), path, manifest)
+            (DIST / rel).write_text(html, encoding='utf-8')
+        else:
+            shutil.copy2(path, DIST / rel)
+
+    (DIST / 'manifest.json').write_text(json.dumps(manifest, indent=2, sort_keys=True) + '\n')
+    (DIST / '_headers').write_text(HEADERS)
+    for path in list(DIST.rglob('*')):
+        if path.is_file():
+            precompress(path)
+
+    saved = 100 - after * 100 // before if before else 0
+    print(f'Built {len(sources)} files into {DIST.relative_to(ROOT.parent)}: '
+          f'{len(manifest)} hashed assets, {before} -> {after} bytes minified ({saved}% smaller)'
+          f'{"" if brotli else "; brotli not installed, skipped .br"}')
+
+
+if __name__ == '__main__':
+    sys.exit(build())
@@ -0,0 +1,327 @@
+"""
+Owner analytics: plan performance, retention cohorts and busy hours.
+
+The numbers are kept in small result tables (``PlanStats``,
+``CohortStats``, ``GymStats``) that ``refresh()`` brings up to date by
+reading the ``BookingEvent`` log from where it last stopped
+(``AnalyticsCheckpoint``). Each batch of events is folded into
+in-memory counters first (``Tally``), so a batch costs one write per
+plan, gym and cohort cell it touched, however many bookings it held.
+Reading the numbers (``owner_analytics()``) touches only those tables,
+so it costs the same with a year of history as with a week.
+
+A cohort is the month a customer first paid for a pass at the gym;
+``offset`` n counts the ones who held a pass there n months later.
+
+``manage.py refresh_analytics`` runs the job. The first run, or
+``--rebuild``, recomputes everything from the ``Booking`` table instead,
+which also covers bookings made before the event log existed.
+"""
+import calendar
+import time
+from array import array
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from .models import (
+    AnalyticsCheckpoint, Booking, BookingEvent, CohortMember, CohortStats, GymPlan, GymStats, PlanStats,
+)
+
+CHECKPOINT = 'bookings'
+BATCH_SIZE = 5000
+EVENT_LAG = timedelta(seconds=60)  # events younger than this wait, so a late commit can't be skipped
+MAX_OFFSET = 62  # months tracked per customer (bits of CohortMember.active_months)
+COUNTERS = ('checkouts', 'paid', 'renewals', 'lapsed', 'refunds')
+WEEK_HOURS = 7 * 24
+
+EVENT_FIELDS = (
+    'id', 'from_status', 'to_status', 'created_at', 'booking__plan_id', 'booking__gym_id',
+    'booking__customer_id', 'booking__amount', 'booking__start_date', 'booking__renewal_of_id',
+)
+BOOKING_FIELDS = (
+    'id', 'payment_status', 'created_at', 'plan_id', 'gym_id', 'customer_id', 'amount', 'start_date',
+    'renewal_of_id',
+)
+
+
+def _month(day):
+    return day.replace(day=1)
+
+
+def _months_between(start, end):
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def _add_months(month, n):
+    years, index = divmod(month.month - 1 + n, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def _week_hour(moment):
+    local = timezone.localtime(moment)
+    return local.weekday() * 24 + local.hour
+
+
+class Tally:
+    """Counter deltas for a batch of bookings, written with ``save()``."""
+
+    def __init__(self):
+        self.plans = {}  # plan_id -> array of COUNTERS deltas
+        self.plan_gyms = {}
+        self.revenue = defaultdict(Decimal)
+        self.hours = {}  # gym_id -> array of WEEK_HOURS checkout counts
+        self.active = set()  # (gym_id, customer_id, month)
+
+    def count(self, plan_id, gym_id, counter, n=1):
+        if plan_id not in self.plans:
+            self.plans[plan_id] = array('q', bytes(8 * len(COUNTERS)))
+            self.plan_gyms[plan_id] = gym_id
+        self.plans[plan_id][COUNTERS.index(counter)] += n
+
+    def created(self, plan_id, gym_id, renewal, at):
+        if renewal:  # counted once it is paid for
+            return
+        self.count(plan_id, gym_id, 'checkouts')
+        if gym_id not in self.hours:
+            self.hours[gym_id] = array('q', bytes(8 * WEEK_HOURS))
+        self.hours[gym_id][_week_hour(at)] += 1
+
+    def paid(self, plan_id, gym_id, customer_id, amount, start_date, renewal):
+        self.count(plan_id, gym_id, 'renewals' if renewal else 'paid')
+        self.revenue[plan_id] += amount
+        self.active.add((gym_id, customer_id, _month(start_date)))
+
+    def refunded(self, plan_id, gym_id, amount):
+        self.count(plan_id, gym_id, 'refunds')
+        self.revenue[plan_id] -= amount
+
+    def add_event(self, row):
+        """Fold one ``BookingEvent`` (as ``EVENT_FIELDS`` values)."""
+        plan_id, gym_id = row['booking__plan_id'], row['booking__gym_id']
+        renewal = row['booking__renewal_of_id'] is not None
+        if not row['from_status']:
+            self.created(plan_id, gym_id, renewal, row['created_at'])
+        if row['to_status'] == 'completed':
+            self.paid(plan_id, gym_id, row['booking__customer_id'], row['booking__amount'],
+                      row['booking__start_date'], renewal)
+        elif row['to_status'] == 'expired':
+            self.count(plan_id, gym_id, 'lapsed')
+        elif row['to_status'] == 'refunded':
+            self.refunded(plan_id, gym_id, row['booking__amount'])
+
+    def add_booking(self, row):
+        """Fold the whole history of one booking (as ``BOOKING_FIELDS`` values), for rebuilds."""
+        plan_id, gym_id, status = row['plan_id'], row['gym_id'], row['payment_status']
+        renewal = row['renewal_of_id'] is not None
+        self.created(plan_id, gym_id, renewal, row['created_at'])
+        if status in ('completed', 'expired', 'refunded'):
+            self.paid(plan_id, gym_id, row['customer_id'], row['amount'], row['start_date'], renewal)
+        if status == 'expired':
+            self.count(plan_id, gym_id, 'lapsed')
+        elif status == 'refunded':
+            self.refunded(plan_id, gym_id, row['amount'])
+
+    # -- writing -----------------------------------------------------------
+
+    def save(self):
+        self._save_plans()
+        self._save_hours()
+        self._save_cohorts()
+
+    def _save_plans(self):
+        touched = set(self.plans) | set(self.revenue)
+        if not touched:
+            return
+        PlanStats.objects.bulk_create(
+            [PlanStats(plan_id=plan_id, gym_id=self.plan_gyms[plan_id]) for plan_id in touched],
+            ignore_conflicts=True,
+        )
+        for plan_id in touched:
+            deltas = dict(zip(COUNTERS, self.plans.get(plan_id, ())))
+            PlanStats.objects.filter(plan_id=plan_id).update(
+                revenue=F('revenue') + self.revenue.get(plan_id, 0),
+                **{name: F(name) + delta for name, delta in deltas.items() if delta},
+            )
+
+    def _save_hours(self):
+        if not self.hours:
+            return
+        GymStats.objects.bulk_create(
+            [GymStats(gym_id=gym_id, booking_hours=[0] * WEEK_HOURS) for gym_id in self.hours],
+            ignore_conflicts=True,
+        )
+        rows = list(GymStats.objects.select_for_update().filter(gym_id__in=self.hours))
+        for row in rows:
+            delta = self.hours[row.gym_id]
+            row.booking_hours = [count + delta[i] for i, count in enumerate(row.booking_hours or [0] * WEEK_HOURS)]
+        GymStats.objects.bulk_update(rows, ['booking_hours'])
+
+    def _save_cohorts(self):
+        if not self.active:
+            return
+        members = {
+            (member.gym_id, member.customer_id): member
+            for member in CohortMember.objects.select_for_update().filter(
+                gym_id__in={gym_id for gym_id, _, _ in self.active},
+                customer_id__in={customer_id for _, customer_id, _ in self.active},
+            )
+        }
+        new, changed = {}, set()
+        cells = defaultdict(int)
+        # Oldest month first, so a new member's cohort is the first month seen
+        for gym_id, customer_id, month in sorted(self.active, key=lambda key: key[2]):
+            key = (gym_id, customer_id)
+            member = members.get(key)
+            if member is None:
+                member = members[key] = new[key] = CohortMember(gym_id=gym_id, customer_id=customer_id, cohort=month)
+            offset = _months_between(member.cohort, month)
+            if not 0 <= offset <= MAX_OFFSET or member.active_months >> offset & 1:
+                continue
+            member.active_months |= 1 << offset
+            cells[(gym_id, member.cohort, offset)] += 1
+            if key not in new:
+                changed.add(key)
+
+        CohortMember.objects.bulk_create(new.values(), batch_size=1000)
+        CohortMember.objects.bulk_update([members[key] for key in changed], ['active_months'], batch_size=1000)
+        CohortStats.objects.bulk_create(
+            [CohortStats(gym_id=gym_id, cohort=cohort, offset=offset) for gym_id, cohort, offset in cells],
+            ignore_conflicts=True,
+        )
+        for (gym_id, cohort, offset), n in cells.items():
+            CohortStats.objects.filter(gym_id=gym_id, cohort=cohort, offset=offset).update(customers=F('customers') + n)
+
+
+# -- jobs ------------------------------------------------------------------------
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Recompute every table from the ``Booking`` table; returns how many bookings were read."""
+    read = 0
+    with transaction.atomic():
+        checkpoint, _ = AnalyticsCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+        for model in (PlanStats, CohortStats, CohortMember, GymStats):
+            model.objects.all().delete()
+        checkpoint.last_event_id = BookingEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+        tally = Tally()
+        # Oldest first: a customer's cohort is their first paid month
+        for row in Booking.objects.order_by('id').values(*BOOKING_FIELDS).iterator(chunk_size=batch_size):
+            tally.add_booking(row)
+            read += 1
+            if read % batch_size == 0:
+                tally.save()
+                tally = Tally()
+        tally.save()
+        checkpoint.save()
+    return read
+
+
+def refresh_batch(batch_size=BATCH_SIZE, now=None):
+    """Fold the next batch of settled events into the tables; returns how many were read."""
+    cutoff = (now or timezone.now()) - EVENT_LAG
+    with transaction.atomic():
+        checkpoint = AnalyticsCheckpoint.objects.select_for_update().get(name=CHECKPOINT)
+        rows = list(
+            BookingEvent.objects.filter(id__gt=checkpoint.last_event_id).order_by('id')
+            .values(*EVENT_FIELDS)[:batch_size]
+        )
+        # Stop at the first event that is too new; everything after it waits for the next run
+        ready = next((i for i, row in enumerate(rows) if row['created_at'] > cutoff), len(rows))
+        rows = rows[:ready]
+        if not rows:
+            return 0
+        tally = Tally()
+        for row in rows:
+            tally.add_event(row)
+        tally.save()
+        checkpoint.last_event_id = rows[-1]['id']
+        checkpoint.save()
+    return len(rows)
+
+
+def refresh(batch_size=BATCH_SIZE, max_seconds=None, force_rebuild=False):
+    """Bring the tables up to date; returns ``{'rebuilt', 'bookings', 'events', 'finished'}``."""
+    result = {'rebuilt': False, 'bookings': 0, 'events': 0, 'finished': False}
+    if force_rebuild or not AnalyticsCheckpoint.objects.filter(name=CHECKPOINT).exists():
+        result['rebuilt'] = True
+        result['bookings'] = rebuild(batch_size)
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    while not deadline or time.monotonic() < deadline:
+        read = refresh_batch(batch_size)
+        if not read:
+            result['finished'] = True
+            break
+        result['events'] += read
+    return result
+
+
+# -- reading ---------------------------------------------------------------------
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def owner_analytics(owner, gym_id=None, months=12, today=None):
+    """Analytics for an owner's gyms (or one of them), from the result tables only."""
+    today = today or timezone.localdate()
+    gym_ids = list(owner.gyms.filter(**({'id': gym_id} if gym_id else {})).values_list('id', flat=True))
+
+    plans = []
+    for plan in GymPlan.objects.filter(gym_id__in=gym_ids).select_related('gym', 'stats').order_by('gym_id', 'price'):
+        stats = getattr(plan, 'stats', None) or PlanStats(plan=plan, gym_id=plan.gym_id)
+        plans.append({
+            'plan_id': plan.id,
+            'plan': plan.name,
+            'gym_id': plan.gym_id,
+            'gym': plan.gym.name,
+            'checkouts': stats.checkouts,
+            'paid': stats.paid,
+            'conversion_rate': _rate(stats.paid, stats.checkouts),
+            'renewals': stats.renewals,
+            'lapsed': stats.lapsed,
+            'renewal_rate': _rate(stats.renewals, stats.lapsed),
+            'refunds': stats.refunds,
+            'revenue': stats.revenue,
+        })
+
+    first_cohort = _add_months(_month(today), -(months - 1))
+    cells = defaultdict(dict)
+    for row in (
+        CohortStats.objects.filter(gym_id__in=gym_ids, cohort__gte=first_cohort)
+        .values('cohort', 'offset').annotate(customers=Sum('customers')).order_by()
+    ):
+        cells[row['cohort']][row['offset']] = row['customers']
+    cohorts = []
+    for n in range(months):
+        cohort = _add_months(first_cohort, n)
+        row = cells.get(cohort)
+        if not row or not row.get(0):
+            continue
+        cohorts.append({
+            'cohort': f'{cohort:%Y-%m}',
+            'customers': row[0],
+            'retention': [_rate(row.get(offset, 0), row[0]) for offset in range(_months_between(cohort, today) + 1)],
+        })
+
+    hours = array('q', bytes(8 * WEEK_HOURS))
+    for counts in GymStats.objects.filter(gym_id__in=gym_ids).values_list('booking_hours', flat=True):
+        for i, count in enumerate(counts):
+            hours[i] += count
+    peak = sorted((i for i in range(WEEK_HOURS) if hours[i]), key=lambda i: -hours[i])[:3]
+    checkpoint = AnalyticsCheckpoint.objects.filter(name=CHECKPOINT).first()
+
+    return {
+        'as_of': checkpoint.updated_at if checkpoint else None,
+        'plans': plans,
+        'cohorts': cohorts,
+        'booking_hours': [list(hours[day * 24:(day + 1) * 24]) for day in range(7)],
+        'peak_hours': [
+            {'weekday': i // 24, 'day': calendar.day_name[i // 24], 'hour': i % 24, 'checkouts': hours[i]}
+            for i in peak
+        ],
+    }
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class GymAppConfig(AppConfig):
     name = 'gym_app'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,97 @@
+"""
+Stateless signed-token authentication for the REST API.
+
+A token is the user's id, username, staff flags and profile ids signed
+with ``SECRET_KEY`` (HMAC via ``django.core.signing``) plus an issue
+timestamp. Verifying it is one HMAC, so an API call costs no session
+lookup, no user query and no password hash, and role checks such as
+``hasattr(request.user, 'gym_owner_profile')`` are answered from the
+claims.
+
+Tokens can't be revoked individually: they expire after
+``API_TOKEN_MAX_AGE`` seconds, and a user whose role changes needs a new
+one (every login and register endpoint hands one out).
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from rest_framework import authentication, exceptions
+
+from .models import Customer, GymOwner
+
+TOKEN_SALT = 'gym_app.api-token'
+
+
+def token_claims(user):
+    """Claims for ``user``; reads both profiles once at issue time."""
+    owner = getattr(user, 'gym_owner_profile', None)
+    customer = getattr(user, 'customer_profile', None)
+    return {
+        'uid': user.pk,
+        'username': user.username,
+        'staff': user.is_staff,
+        'superuser': user.is_superuser,
+        'owner': owner.pk if owner else None,
+        'customer': customer.pk if customer else None,
+    }
+
+
+def issue_token(user):
+    return signing.dumps(token_claims(user), salt=TOKEN_SALT, compress=True)
+
+
+def read_token(token):
+    """Claims from a token; raises ``signing.BadSignature`` (or ``SignatureExpired``)."""
+    max_age = getattr(settings, 'API_TOKEN_MAX_AGE', 60 * 60 * 24 * 7)
+    return signing.loads(token, salt=TOKEN_SALT, max_age=max_age)
+
+
+def token_user(claims):
+    """An unsaved-state ``User`` built from the claims, with its profiles pre-cached.
+
+    Only the claimed fields are set, so it can be used for permission
+    checks and as a foreign key but must never be saved; load the real row
+    with ``User.objects.get(pk=...)`` when other fields are needed.
+    """
+    user = User(
+        pk=claims['uid'],
+        username=claims['username'],
+        is_staff=claims['staff'],
+        is_superuser=claims['superuser'],
+        is_active=True,
+    )
+    user._state.adding = False
+    for accessor, model, key in (
+        ('gym_owner_profile', GymOwner, 'owner'),
+        ('customer_profile', Customer, 'customer'),
+    ):
+        # Caching None makes the accessor raise DoesNotExist without a query,
+        # so hasattr() checks stay free for users without that profile
+        profile = model(pk=claims[key], user=user) if claims[key] else None
+        User._meta.get_field(accessor).set_cached_value(user, profile)
+    return user
+
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+    """``Authorization: Bearer <token>`` with a token from ``issue_token``."""
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = authentication.get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            claims = read_token(auth[1].decode())
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Token expired.')
+        except (signing.BadSignature, UnicodeError):
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        try:
+            return token_user(claims), claims
+        except KeyError:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+    def authenticate_header(self, request):
+        return self.keyword
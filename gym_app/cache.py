@@ -0,0 +1,321 @@
+"""
+Two-tier cache backend plus namespace and single-flight helpers.
+
+``TieredCache`` (the ``default`` cache) keeps a small LRU of recently
+read values in each process in front of the cache shared by all
+workers (Redis when ``REDIS_URL`` is set, otherwise a file-based cache).
+Local copies live at most ``LOCAL_TIMEOUT`` seconds, so a change made
+by another worker is visible after that long at worst; counters
+(``incr``) and locks (``add``) always go to the shared tier. They are
+only as atomic as that tier: Redis's are, the file cache's are a read
+followed by a write, so with it locks and counters are only reliable
+within one process. ``manage.py check --deploy`` flags that setup
+(``gym_app.E001``).
+
+Hit/miss/eviction counts are accumulated per process and periodically
+added to the shared tier, where ``manage.py cache_stats`` reads them.
+
+Version counters (``get_version``/``bump_version``, and the ``gyms``,
+``plans`` and ``bookings`` namespaces built on them) live in the same
+cache as ordinary entries and may be evicted. They start from the clock
+in nanoseconds, so a counter recreated after an eviction is still larger
+than any value it had and keys built from an old version never return.
+"""
+import atexit
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+STAT_NAMES = ('local_hit', 'shared_hit', 'miss', 'set', 'eviction')
+STATS_PREFIX = 'tiered:stats'
+STATS_FLUSH_EVERY = 200  # operations between pushes of the counters to the shared tier
+STATS_FLUSH_SECONDS = 10
+
+NAMESPACES = ('gyms', 'plans', 'bookings')
+
+
+class _LocalTier:
+    """One process's LRU and counters, shared by the per-thread cache instances."""
+
+    def __init__(self):
+        self.entries = OrderedDict()  # key -> (expires_at, pickled value)
+        self.lock = threading.Lock()
+        self.stats = dict.fromkeys(STAT_NAMES, 0)
+        self.pending_ops = 0
+        self.last_flush = time.monotonic()
+
+
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._max_entries = int(options.get('LOCAL_MAX_ENTRIES', 1000))
+        self._local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        # Django builds a cache instance per thread; the local tier is per process
+        with _local_tiers_lock:
+            tier = _local_tiers.get(self._shared_alias)
+            if tier is None:
+                tier = _local_tiers[self._shared_alias] = _LocalTier()
+                atexit.register(self._flush_at_exit)
+        self._tier = tier
+
+    def _flush_at_exit(self):
+        try:
+            self.flush_stats()
+        except Exception:
+            pass  # the shared cache may be gone at shutdown; the counts are only metrics
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # -- local tier --------------------------------------------------------
+
+    def _local_get(self, key):
+        tier = self._tier
+        with tier.lock:
+            entry = tier.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del tier.entries[key]
+                return None
+            tier.entries.move_to_end(key)
+        return entry
+
+    def _local_set(self, key, value, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        ttl = self._local_timeout if timeout is None else min(self._local_timeout, timeout)
+        if ttl <= 0:
+            self._local_drop(key)
+            return
+        entry = (time.monotonic() + ttl, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        tier = self._tier
+        with tier.lock:
+            tier.entries[key] = entry
+            tier.entries.move_to_end(key)
+            while len(tier.entries) > self._max_entries:
+                tier.entries.popitem(last=False)
+                tier.stats['eviction'] += 1
+
+    def _local_drop(self, key):
+        with self._tier.lock:
+            self._tier.entries.pop(key, None)
+
+    # -- metrics -----------------------------------------------------------
+
+    def _count(self, name):
+        tier = self._tier
+        with tier.lock:
+            tier.stats[name] += 1
+            tier.pending_ops += 1
+            due = (
+                tier.pending_ops >= STATS_FLUSH_EVERY
+                or time.monotonic() - tier.last_flush >= STATS_FLUSH_SECONDS
+            )
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add this process's counters to the shared totals."""
+        tier = self._tier
+        with tier.lock:
+            stats, tier.stats = tier.stats, dict.fromkeys(STAT_NAMES, 0)
+            tier.pending_ops = 0
+            tier.last_flush = time.monotonic()
+        for name, value in stats.items():
+            if not value:
+                continue
+            key = f'{STATS_PREFIX}:{name}'
+            if not self.shared.add(key, value, None):
+                try:
+                    self.shared.incr(key, value)
+                except ValueError:
+                    self.shared.set(key, value, None)
+
+    def get_stats(self):
+        self.flush_stats()
+        stats = {name: self.shared.get(f'{STATS_PREFIX}:{name}', 0) for name in STAT_NAMES}
+        lookups = stats['local_hit'] + stats['shared_hit'] + stats['miss']
+        stats['lookups'] = lookups
+        stats['hit_rate'] = (stats['local_hit'] + stats['shared_hit']) / lookups if lookups else 0.0
+        stats['local_entries'] = len(self._tier.entries)
+        return stats
+
+    def reset_stats(self):
+        with self._tier.lock:
+            self._tier.stats = dict.fromkeys(STAT_NAMES, 0)
+        self.shared.delete_many([f'{STATS_PREFIX}:{name}' for name in STAT_NAMES])
+
+    # -- cache API ---------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        entry = self._local_get(local_key)
+        if entry is not None:
+            self._count('local_hit')
+            return pickle.loads(entry[1])
+
+        sentinel = object()
+        value = self.shared.get(key, sentinel, version=version)
+        if value is sentinel:
+            self._count('miss')
+            return default
+        self._count('shared_hit')
+        self._local_set(local_key, value, self._local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        # Local hits first, then one round trip to the shared tier for the rest
+        found, missing = {}, []
+        for key in keys:
+            entry = self._local_get(self.make_and_validate_key(key, version=version))
+            if entry is not None:
+                self._count('local_hit')
+                found[key] = pickle.loads(entry[1])
+            else:
+                missing.append(key)
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            for key in missing:
+                if key in shared:
+                    self._count('shared_hit')
+                    self._local_set(self.make_and_validate_key(key, version=version), shared[key], self._local_timeout)
+                else:
+                    self._count('miss')
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(local_key, value, timeout)
+        self._count('set')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Used for locks and counters, so the shared tier decides (atomically only on Redis/Memcached)
+        self._local_drop(self.make_and_validate_key(key, version=version))
+        return self.shared.add(key, value, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local_drop(self.make_and_validate_key(key, version=version))
+        return self.shared.incr(key, delta, version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local_drop(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._local_drop(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        if self._local_get(self.make_and_validate_key(key, version=version)) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def clear(self):
+        self.clear_local()
+        self.shared.clear()
+
+    def clear_local(self):
+        with self._tier.lock:
+            self._tier.entries.clear()
+
+
+# -- version counters and namespaces -------------------------------------------
+
+def get_version(key):
+    """Current value of a version counter, started from the clock if it is missing."""
+    version = cache.get(key)
+    if version is None:
+        seed = time.time_ns()
+        cache.add(key, seed, None)
+        version = cache.get(key, seed)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def _namespace_key(namespace):
+    return f'ns:{namespace}'
+
+
+def namespace_version(namespace):
+    return get_version(_namespace_key(namespace))
+
+
+def namespaced_key(namespace, key):
+    """``key`` scoped to the current version of ``namespace``; bumping it orphans every such key."""
+    return f'{namespace}:{namespace_version(namespace)}:{key}'
+
+
+def bump_namespace(namespace):
+    bump_version(_namespace_key(namespace))
+
+
+# -- single-flight -------------------------------------------------------------
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def get_or_compute(key, compute, timeout=DEFAULT_TIMEOUT, lock_timeout=30, wait=5.0):
+    """Cached ``compute()``; on a miss only one caller (per cluster) recomputes.
+
+    Threads in this process wait on the first one; other processes wait
+    on a shared lock for up to ``wait`` seconds before computing
+    themselves rather than failing.
+    """
+    missing = object()
+    value = cache.get(key, missing)
+    if value is not missing:
+        return value
+
+    with _inflight_lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _inflight[key] = threading.Event()
+    if not leader:
+        event.wait(wait)
+        value = cache.get(key, missing)
+        return compute() if value is missing else value
+
+    try:
+        lock_key = f'{key}:lock'
+        if not cache.add(lock_key, 1, lock_timeout):
+            # Another process is computing it; poll briefly for its result
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = cache.get(key, missing)
+                if value is not missing:
+                    return value
+            return compute()
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        event.set()
@@ -0,0 +1,58 @@
+"""
+System checks for configuration the app can start without but shouldn't.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Shared-cache backends whose add() and incr() are atomic across processes
+ATOMIC_CACHE_BACKENDS = {
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+}
+DEV_WEBHOOK_SECRET = 'insecure-dev-webhook-secret'  # PAYMENT_WEBHOOK_SECRET's default in settings.py
+
+
+@register()
+def firebase_project_check(app_configs, **kwargs):
+    # Only the cheap sources here; GCP default credentials are looked up on the first login
+    from .firebase_tokens import firebase_project_id
+
+    if firebase_project_id(include_default_credentials=False):
+        return []
+    return [Warning(
+        'No Firebase project is configured, so Google login will fail unless this runs on GCP '
+        'with default credentials.',
+        hint='Set FIREBASE_PROJECT_ID, FIREBASE_CREDENTIALS, GOOGLE_APPLICATION_CREDENTIALS or GOOGLE_CLOUD_PROJECT.',
+        id='gym_app.W001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    # Locks (get_or_compute, explore and snapshot rebuilds, location flushes, the payments
+    # drain) and counters rely on the shared tier's add()/incr() being atomic
+    default = settings.CACHES.get('default', {})
+    alias = 'default'
+    if default.get('BACKEND') == 'gym_app.cache.TieredCache':
+        alias = default.get('OPTIONS', {}).get('SHARED', 'shared')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    if backend in ATOMIC_CACHE_BACKENDS:
+        return []
+    return [Error(
+        f'The shared cache ({backend or alias!r}) has no atomic add()/incr(), so cache locks and '
+        'counters race between worker processes.',
+        hint='Set REDIS_URL (or use Memcached) for the shared cache when running more than one process.',
+        id='gym_app.E001',
+    )]
+
+
+@register(Tags.security, deploy=True)
+def webhook_secret_check(app_configs, **kwargs):
+    if settings.DEBUG or settings.PAYMENT_WEBHOOK_SECRET not in ('', DEV_WEBHOOK_SECRET):
+        return []
+    return [Error(
+        'PAYMENT_WEBHOOK_SECRET is the public development default, so anyone can forge payment webhooks.',
+        hint="Set PAYMENT_WEBHOOK_SECRET to the secret from the payment provider's dashboard.",
+        id='gym_app.E002',
+    )]
@@ -0,0 +1,187 @@
+"""
+Fragment cache for the explore page.
+
+Results are bucketed by a rounded geo cell plus the active filters, so
+visitors in the same neighbourhood share one computed gym list and one
+rendered grid. Entries are served stale while a single request rebuilds
+them. Every cell lists every active gym, so any gym change bumps one
+generation shared by all cells and every visitor sees it straight away.
+"""
+import hashlib
+import json
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .cache import bump_version, get_version
+from .filters import filter_gyms
+from .geo import calculate_distance
+from .models import Gym, GymPlan
+from .pricing import price_items
+
+KEY_PREFIX = 'explore'
+GENERATION_KEY = f'{KEY_PREFIX}:generation'
+STAT_EVENTS = ('hit', 'stale', 'miss', 'revalidate')
+
+
+def get_cell_size():
+    """Cell edge length in degrees (0.01 is roughly 1.1 km)."""
+    return float(getattr(settings, 'EXPLORE_CACHE_CELL_SIZE', 0.01))
+
+
+def geo_cell(lat, lon):
+    """Return the (row, col) cell containing a coordinate, or None if unknown."""
+    if lat in (None, '') or lon in (None, ''):
+        return None
+    size = get_cell_size()
+    try:
+        return (math.floor(float(lat) / size), math.floor(float(lon) / size))
+    except (TypeError, ValueError):
+        return None
+
+
+def cell_centre(cell):
+    """Coordinates used to compute distances for everyone in a cell."""
+    size = get_cell_size()
+    return round((cell[0] + 0.5) * size, 6), round((cell[1] + 0.5) * size, 6)
+
+
+def _cell_label(cell):
+    if cell is None:
+        return 'all'
+    return f'{get_cell_size()}:{cell[0]}:{cell[1]}'
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def _count(event):
+    key = f'{KEY_PREFIX}:stats:{event}'
+    if not cache.add(key, 1, None):
+        _bump(key)
+
+
+def _entry_key(cell, filters):
+    label = _cell_label(cell)
+    if filters.get('open_now'):
+        # "Open now" results change with the clock; bucket them by 10 minutes
+        filters = {**filters, 'at': timezone.localtime().strftime('%H:%M')[:4]}
+    digest = hashlib.md5(
+        json.dumps(filters, sort_keys=True, default=str).encode()
+    ).hexdigest()[:12]
+    return f'{KEY_PREFIX}:grid:{label}:{get_version(GENERATION_KEY)}:{digest}'
+
+
+def invalidate_grids():
+    """Drop every cached grid; called whenever a gym or anything shown on its card changes."""
+    bump_version(GENERATION_KEY)
+
+
+def build_explore_items(cell, filters=None):
+    """Compute the gym cards for a cell as plain, cacheable dicts."""
+    gyms = filter_gyms(Gym.objects.filter(is_active=True), filters or {})
+    return gym_items(gyms, cell_centre(cell) if cell is not None else None)
+
+
+def gym_items(gyms, centre=None):
+    """Gym cards for a queryset, nearest first when ``centre`` (lat, lon) is given."""
+    gyms = gyms.prefetch_related(
+        'photos',
+        Prefetch('plans', queryset=GymPlan.objects.filter(is_active=True)),
+    )
+
+    items = []
+    for gym in gyms:
+        # Photos are ordered primary first
+        photos = list(gym.photos.all())
+        plans = list(gym.plans.all())
+        item = {
+            'id': gym.id,
+            'name': gym.name,
+            'address': gym.address,
+            'rating': gym.rating,
+            'photo_url': photos[0].image.url if photos else '',
+            'plans': [(plan.id, plan.duration, plan.price) for plan in plans],
+            'distance': None,
+        }
+        if centre:
+            item['distance'] = round(
+                calculate_distance(centre[0], centre[1], gym.latitude, gym.longitude), 1
+            )
+        items.append(item)
+
+    if centre:
+        items.sort(key=lambda x: x['distance'])
+    # "From" prices include the gyms' current discounts (see pricing.py)
+    return price_items(items)
+
+
+def _rebuild(key, cell, filters):
+    items = build_explore_items(cell, filters)
+    centre = cell_centre(cell) if cell is not None else (None, None)
+    html = render_to_string('gym_app/explore_grid.html', {
+        'gyms': items,
+        'cell_lat': centre[0],
+        'cell_lon': centre[1],
+    })
+    fresh_ttl = getattr(settings, 'EXPLORE_CACHE_FRESH_TTL', 60)
+    stale_ttl = getattr(settings, 'EXPLORE_CACHE_STALE_TTL', 600)
+    cache.set(key, {
+        'items': items,
+        'html': html,
+        'fresh_until': time.time() + fresh_ttl,
+    }, fresh_ttl + stale_ttl)
+    return items, html
+
+
+def get_explore_grid(cell, filters=None):
+    """Return ``(items, html)`` for a cell and filter set.
+
+    Fresh entries are returned directly. Stale entries are returned to
+    everyone except the one request that wins the rebuild lock.
+    """
+    filters = filters or {}
+    key = _entry_key(cell, filters)
+    entry = cache.get(key)
+
+    if entry is None:
+        _count('miss')
+        return _rebuild(key, cell, filters)
+
+    if time.time() < entry['fresh_until']:
+        _count('hit')
+        return entry['items'], entry['html']
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, getattr(settings, 'EXPLORE_CACHE_LOCK_TIMEOUT', 30)):
+        _count('stale')
+        return entry['items'], entry['html']
+
+    _count('revalidate')
+    try:
+        return _rebuild(key, cell, filters)
+    finally:
+        cache.delete(lock_key)
+
+
+def get_stats():
+    """Lookup counters plus the hit rate (stale serves count as hits)."""
+    stats = {event: cache.get(f'{KEY_PREFIX}:stats:{event}', 0) for event in STAT_EVENTS}
+    lookups = sum(stats.values())
+    stats['lookups'] = lookups
+    stats['hit_rate'] = (stats['hit'] + stats['stale']) / lookups if lookups else 0.0
+    stats['cell_size'] = get_cell_size()
+    return stats
+
+
+def reset_stats():
+    cache.delete_many([f'{KEY_PREFIX}:stats:{event}' for event in STAT_EVENTS])
@@ -0,0 +1,225 @@
+"""
+Server-side gym filtering and facet counts.
+
+Filters are parsed from query params into a plain dict so the same dict
+can be applied to a queryset, used as part of a cache key and echoed back
+to clients. Each facet is counted with one grouped query over the gyms
+matching every *other* active filter, so selecting a value in one facet
+doesn't collapse the counts shown for its alternatives.
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Case, CharField, Count, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+
+from .models import MINUTES_PER_DAY, MINUTES_PER_WEEK, Feature, Gym, GymPlan, GymSchedule, PlanFeature, feature_slug
+
+PRICE_BUCKETS = [
+    ('0-500', 0, 500),
+    ('500-1000', 500, 1000),
+    ('1000-2000', 1000, 2000),
+    ('2000-5000', 2000, 5000),
+    ('5000+', 5000, None),
+]
+
+RATING_BUCKETS = [
+    ('4.5+', Decimal('4.5')),
+    ('4.0+', Decimal('4.0')),
+    ('3.0+', Decimal('3.0')),
+    ('below 3.0', None),
+]
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+FEATURE_FACET_LIMIT = 20
+
+
+def _decimal(value):
+    """A finite Decimal, or None (``Decimal()`` also accepts NaN and Infinity)."""
+    try:
+        value = Decimal(value)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return value if value.is_finite() else None
+
+
+def parse_gym_filters(params):
+    """Normalize filter query params, dropping anything missing or invalid."""
+    filters = {}
+
+    city = (params.get('city') or '').strip()
+    if city:
+        filters['city'] = city
+
+    max_price = _decimal(params.get('max_price'))
+    if max_price is not None and max_price >= 0:
+        filters['max_price'] = str(max_price)
+
+    duration = params.get('duration')
+    if duration in dict(GymPlan.DURATION_CHOICES):
+        filters['duration'] = duration
+
+    if (params.get('open_now') or '').lower() in TRUE_VALUES:
+        filters['open_now'] = True
+
+    # ?open_at=2026-10-24T23:30 (local time unless it carries an offset)
+    try:
+        open_at = datetime.fromisoformat((params.get('open_at') or '').strip())
+    except ValueError:
+        open_at = None
+    if open_at is not None:
+        if timezone.is_aware(open_at):
+            open_at = timezone.localtime(open_at)
+        filters['open_at'] = open_at.strftime('%Y-%m-%dT%H:%M')
+
+    min_rating = _decimal(params.get('min_rating'))
+    if min_rating is not None:
+        filters['min_rating'] = str(min_rating)
+
+    # ?feature=sauna&feature=parking (or comma-separated) - gyms must offer all of them
+    features = params.getlist('feature') if hasattr(params, 'getlist') else [params.get('feature') or '']
+    slugs = sorted({feature_slug(f) for value in features for f in value.split(',') if feature_slug(f)})
+    if slugs:
+        filters['feature'] = slugs
+
+    return filters
+
+
+def minute_of_week(at):
+    return at.weekday() * MINUTES_PER_DAY + at.hour * 60 + at.minute
+
+
+def open_at_q(at):
+    """Q matching gyms open at local datetime ``at``.
+
+    Gyms with a weekly schedule are matched on its minute-of-week ranges;
+    a range that runs past Sunday midnight is also tried one week later.
+    The rest use their daily hours, including overnight ones (22:00-06:00).
+    """
+    minute = minute_of_week(at)
+    scheduled = GymSchedule.objects.filter(gym=OuterRef('pk'))
+    open_in_schedule = scheduled.filter(
+        Q(start_minute__lte=minute, end_minute__gt=minute)
+        | Q(start_minute__lte=minute + MINUTES_PER_WEEK, end_minute__gt=minute + MINUTES_PER_WEEK)
+    )
+    t = at.time()
+    same_day = Q(opening_time__lte=F('closing_time')) & Q(opening_time__lte=t, closing_time__gt=t)
+    overnight = Q(opening_time__gt=F('closing_time')) & (Q(opening_time__lte=t) | Q(closing_time__gt=t))
+    return Exists(open_in_schedule) | (~Exists(scheduled) & (same_day | overnight))
+
+
+def _active_plans(filters):
+    plans = GymPlan.objects.filter(gym=OuterRef('pk'), is_active=True)
+    if filters.get('duration'):
+        plans = plans.filter(duration=filters['duration'])
+    return plans
+
+
+def with_min_price(queryset, filters=None):
+    """Annotate ``min_price``: the cheapest active plan (of the filtered duration, if any)."""
+    cheapest = _active_plans(filters or {}).order_by('price').values('price')[:1]
+    return queryset.annotate(min_price=Subquery(cheapest))
+
+
+def filter_gyms(queryset, filters, now=None):
+    """Apply parsed filters to a Gym queryset."""
+    if filters.get('city'):
+        queryset = queryset.filter(city__iexact=filters['city'])
+
+    if filters.get('duration'):
+        queryset = queryset.filter(Exists(_active_plans(filters)))
+
+    if filters.get('max_price') is not None:
+        queryset = with_min_price(queryset, filters).filter(min_price__lte=Decimal(filters['max_price']))
+
+    if filters.get('open_at'):
+        queryset = queryset.filter(open_at_q(datetime.fromisoformat(filters['open_at'])))
+    elif filters.get('open_now'):
+        queryset = queryset.filter(open_at_q(now or timezone.localtime()))
+
+    if filters.get('min_rating') is not None:
+        queryset = queryset.filter(rating__gte=Decimal(filters['min_rating']))
+
+    for slug in filters.get('feature', []):
+        queryset = queryset.filter(Exists(PlanFeature.objects.filter(
+            plan__gym=OuterRef('pk'), plan__is_active=True, feature__slug=slug,
+        )))
+
+    return queryset
+
+
+def _facet_base(filters, facet, now):
+    others = {key: value for key, value in filters.items() if key != facet}
+    matching = filter_gyms(Gym.objects.filter(is_active=True), others, now)
+    return Gym.objects.filter(pk__in=matching.values('pk')), others
+
+
+def _bucket_case(whens, default):
+    return Case(*whens, default=Value(default), output_field=CharField())
+
+
+def _rows(queryset, field):
+    return [
+        {'value': row[field], 'count': row['count']}
+        for row in queryset.values(field).annotate(count=Count('pk')).order_by(field)
+    ]
+
+
+def gym_facets(filters, now=None):
+    """Return facet counts for the list endpoint, one grouped query per facet."""
+    now = now or timezone.localtime()
+    facets = {}
+
+    base, _ = _facet_base(filters, 'city', now)
+    facets['city'] = _rows(base, 'city')
+
+    base, _ = _facet_base(filters, 'duration', now)
+    labels = dict(GymPlan.DURATION_CHOICES)
+    order = list(labels)
+    facets['duration'] = sorted(
+        (
+            {'value': row['duration'], 'label': labels.get(row['duration'], row['duration']), 'count': row['count']}
+            for row in GymPlan.objects.filter(is_active=True, gym__in=base)
+            .values('duration').annotate(count=Count('gym', distinct=True)).order_by('duration')
+        ),
+        key=lambda row: order.index(row['value']) if row['value'] in order else len(order),
+    )
+
+    base, others = _facet_base(filters, 'max_price', now)
+    price_whens = [
+        When(min_price__gte=low, then=Value(label)) if high is None
+        else When(min_price__gte=low, min_price__lt=high, then=Value(label))
+        for label, low, high in PRICE_BUCKETS
+    ]
+    priced = with_min_price(base, others).filter(min_price__isnull=False)
+    order = [label for label, _, _ in PRICE_BUCKETS]
+    facets['price'] = sorted(
+        _rows(priced.annotate(bucket=_bucket_case(price_whens, order[-1])), 'bucket'),
+        key=lambda row: order.index(row['value']),
+    )
+
+    base, _ = _facet_base(filters, 'min_rating', now)
+    rating_whens = [When(rating__gte=low, then=Value(label)) for label, low in RATING_BUCKETS if low is not None]
+    order = [label for label, _ in RATING_BUCKETS]
+    facets['rating'] = sorted(
+        _rows(base.annotate(bucket=_bucket_case(rating_whens, order[-1])), 'bucket'),
+        key=lambda row: order.index(row['value']),
+    )
+
+    base, _ = _facet_base(filters, 'feature', now)
+    facets['feature'] = [
+        {'value': row['slug'], 'label': row['name'], 'count': row['count']}
+        for row in Feature.objects.filter(plan_features__plan__is_active=True, plan_features__plan__gym__in=base)
+        .values('slug', 'name').annotate(count=Count('plan_features__plan__gym', distinct=True))
+        .order_by('-count', 'name')[:FEATURE_FACET_LIMIT]
+    ]
+
+    base, _ = _facet_base(filters, 'open_now', now)
+    open_case = Case(When(open_at_q(now), then=Value('true')), default=Value('false'), output_field=CharField())
+    facets['open_now'] = [
+        {'value': row['value'] == 'true', 'count': row['count']}
+        for row in _rows(base.annotate(bucket=open_case), 'bucket')
+    ]
+
+    return facets
@@ -0,0 +1,217 @@
+"""
+Local verification of Firebase ID tokens.
+
+Firebase signs ID tokens with Google's rotating RS256 keys. The public
+certificates are fetched once and kept in-process until the
+``Cache-Control: max-age`` of the response runs out, so verifying a login
+is a signature check and a few claim comparisons rather than an HTTP
+round trip.
+
+The accepted project comes from ``firebase_project_id()``: ``FIREBASE_PROJECT_ID``
+when set, otherwise the project of the Google credentials the Firebase
+Admin SDK would use.
+
+Tests swap in a ``LocalKeySet`` with ``set_key_set()`` to mint and
+verify tokens without network access.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.request
+
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+ISSUER_PREFIX = 'https://securetoken.google.com/'
+FETCH_TIMEOUT = 5
+DEFAULT_MAX_AGE = 60 * 60  # when the response carries no max-age
+RETRY_AFTER = 60  # keep serving old keys this long after a failed refresh
+CLOCK_SKEW = 10  # seconds of leeway on exp/iat/auth_time
+
+
+class InvalidIdToken(Exception):
+    pass
+
+
+def _max_age(headers):
+    match = re.search(r'max-age=(\d+)', headers.get('Cache-Control', ''))
+    if not match:
+        return DEFAULT_MAX_AGE
+    age = headers.get('Age', '0')
+    return max(int(match.group(1)) - (int(age) if age.isdigit() else 0), 0)
+
+
+class KeySet:
+    """Google's token signing keys, cached until the response's max-age expires."""
+
+    def __init__(self, url=CERTS_URL):
+        self.url = url
+        self._keys = {}
+        self._expires_at = 0
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _fetch(self):
+        with urllib.request.urlopen(self.url, timeout=FETCH_TIMEOUT) as response:
+            certs = json.load(response)
+            max_age = _max_age(response.headers)
+        keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode()).public_key()
+            for kid, pem in certs.items()
+        }
+        return keys, max_age
+
+    def refresh(self):
+        try:
+            keys, max_age = self._fetch()
+        except Exception as e:
+            if not self._keys:
+                raise InvalidIdToken(f'Could not fetch signing keys: {e}')
+            logger.warning('Firebase key refresh failed, reusing cached keys: %s', e)
+            self._checked_at = time.monotonic()
+            self._expires_at = self._checked_at + RETRY_AFTER
+            return
+        self._keys = keys
+        self._checked_at = time.monotonic()
+        self._expires_at = self._checked_at + max_age
+
+    def _stale(self, kid):
+        now = time.monotonic()
+        if now >= self._expires_at:
+            return True
+        # A kid we haven't seen may be a fresh rotation; recheck, but at most once a minute
+        return kid not in self._keys and now - self._checked_at >= RETRY_AFTER
+
+    def get(self, kid):
+        if self._stale(kid):
+            # One thread refetches; the others wait and then see the fresh keys
+            with self._lock:
+                if self._stale(kid):
+                    self.refresh()
+        return self._keys.get(kid)
+
+
+class LocalKeySet:
+    """Stand-in key set for tests: a freshly generated RSA key that can also sign tokens."""
+
+    def __init__(self, kid='local-test-key'):
+        self.kid = kid
+        self._private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def get(self, kid):
+        return self._private_key.public_key() if kid == self.kid else None
+
+    def sign(self, claims, project_id=None):
+        """A token shaped like a Firebase ID token; ``claims`` override the defaults."""
+        project_id = project_id or firebase_project_id()
+        now = int(time.time())
+        payload = {
+            'iss': ISSUER_PREFIX + project_id,
+            'aud': project_id,
+            'auth_time': now,
+            'iat': now,
+            'exp': now + 3600,
+            'sub': claims.get('email', 'local-user'),
+        }
+        payload.update(claims)
+        return jwt.encode(payload, self._private_key, algorithm='RS256', headers={'kid': self.kid})
+
+
+_key_set = KeySet()
+_project_id = None
+_project_lock = threading.Lock()
+
+
+def _credentials_project_id(include_default_credentials=True):
+    path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
+    if path:
+        try:
+            with open(path) as f:
+                project = json.load(f).get('project_id')
+        except (OSError, ValueError) as e:
+            logger.warning('Could not read GOOGLE_APPLICATION_CREDENTIALS: %s', e)
+        else:
+            if project:
+                return project
+    project = os.environ.get('GOOGLE_CLOUD_PROJECT') or os.environ.get('GCLOUD_PROJECT')
+    if project or not include_default_credentials:
+        return project or ''
+    try:
+        # On GCP the metadata server knows the project
+        import google.auth
+        return google.auth.default()[1] or ''
+    except Exception as e:
+        logger.warning('No Google default credentials to take the Firebase project from: %s', e)
+        return ''
+
+
+def firebase_project_id(include_default_credentials=True):
+    """The Firebase project whose ID tokens are accepted, or '' if none is configured.
+
+    ``FIREBASE_PROJECT_ID`` (or the ``FIREBASE_CREDENTIALS`` service
+    account) wins; otherwise the ``GOOGLE_APPLICATION_CREDENTIALS`` file,
+    ``GOOGLE_CLOUD_PROJECT`` or the GCP default credentials, as the
+    Firebase Admin SDK would find it.
+    """
+    global _project_id
+    if settings.FIREBASE_PROJECT_ID:
+        return settings.FIREBASE_PROJECT_ID
+    if not include_default_credentials:
+        return _credentials_project_id(include_default_credentials=False)
+    if _project_id is None:
+        with _project_lock:
+            if _project_id is None:
+                _project_id = _credentials_project_id()
+    return _project_id
+
+
+def get_key_set():
+    return _key_set
+
+
+def set_key_set(key_set):
+    """Replace the process-wide key set (tests); returns the previous one."""
+    global _key_set
+    previous, _key_set = _key_set, key_set
+    return previous
+
+
+def verify_id_token(token, project_id=None):
+    """Verified claims of a Firebase ID token, or ``InvalidIdToken``."""
+    project_id = project_id or firebase_project_id()
+    if not project_id:
+        logger.error('Google login is disabled: no Firebase project is configured (set FIREBASE_PROJECT_ID)')
+        raise InvalidIdToken('FIREBASE_PROJECT_ID is not configured')
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError:
+        raise InvalidIdToken('Malformed token')
+    if header.get('alg') != 'RS256':
+        raise InvalidIdToken('Unexpected signing algorithm')
+
+    key = get_key_set().get(header.get('kid'))
+    if key is None:
+        raise InvalidIdToken('Unknown signing key')
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=['RS256'],
+            audience=project_id,
+            issuer=ISSUER_PREFIX + project_id,
+            leeway=CLOCK_SKEW,
+            options={'require': ['exp', 'iat', 'aud', 'iss', 'sub']},
+        )
+    except jwt.InvalidTokenError as e:
+        raise InvalidIdToken(str(e))
+    if not claims['sub'] or claims.get('auth_time', 0) > time.time() + CLOCK_SKEW:
+        raise InvalidIdToken('Invalid subject or auth time')
+    return claims
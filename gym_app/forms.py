@@ -134,7 +134,8 @@ class GymRegistrationForm(forms.ModelForm):
         fields = [
             'name', 'description', 'address', 'city',
             'latitude', 'longitude', 'google_maps_link',
-            'phone_number', 'email', 'opening_time', 'closing_time'
+            'phone_number', 'email', 'opening_time', 'closing_time',
+            'slot_minutes', 'slot_capacity'
         ]
         widgets = {
             'name': forms.TextInput(attrs={
@@ -187,6 +188,15 @@ class GymRegistrationForm(forms.ModelForm):
                 'class': 'form-control',
                 'type': 'time'
             }),
+            'slot_minutes': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': 15,
+                'step': 15
+            }),
+            'slot_capacity': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Max people per slot'
+            }),
         }
 
 
@@ -256,6 +266,9 @@ class GymPlanForm(forms.ModelForm):
 class BookingForm(forms.Form):
     """Form for booking a gym plan."""
     plan_id = forms.IntegerField(widget=forms.HiddenInput())
+    # Applied from the order summary; re-checked when paying
+    promo_code = forms.CharField(max_length=30, required=False, widget=forms.HiddenInput())
+    auto_renew = forms.BooleanField(required=False, widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}))
     
     # Simulated payment fields
     card_number = forms.CharField(max_length=19, widget=forms.TextInput(attrs={
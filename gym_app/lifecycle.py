@@ -0,0 +1,197 @@
+"""
+Booking lifecycle: explicit status transitions with an audit trail.
+
+    pending -> completed | failed
+    completed -> expired | refunded
+
+A booking moves through ``transition()`` (or ``bulk_transition()`` for
+many), which updates the row only if it still has the status we read
+(so two concurrent changes can't both win) and records a
+``BookingEvent``. A booking that becomes ``completed`` queues its
+confirmation email in the same transaction (see ``notifications``).
+
+``sweep()`` handles passes whose ``end_date`` has passed, a batch at a
+time: the auto-renewing ones in the batch get their next period with
+one ``bulk_create``, then the whole batch is expired with one
+``UPDATE``. Renewals start out ``pending``, like a checkout;
+``payments.charge_renewals()`` asks the gateway to collect them and
+its webhook completes (or fails) them. Expired rows drop out of the lapsed-pass index, so each
+batch is a fresh index lookup and a sweep stays linear. It stops
+starting batches once its time budget is spent; the next run carries on
+where it stopped.
+"""
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_namespace
+from .models import Booking, BookingEvent, new_access_code
+from .notifications import queue_booking_confirmations
+from .pricing import rule_sets
+
+TRANSITIONS = {
+    'pending': {'completed', 'failed'},
+    'completed': {'expired', 'refunded'},
+    'failed': set(),
+    'expired': set(),
+    'refunded': set(),
+}
+PLAN_DAYS = {'day': 1, 'week': 7, 'month': 30, 'quarter': 90, 'half_year': 180, 'year': 365}
+SWEEP_BATCH_SIZE = 5000
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def pass_dates(duration, start):
+    """(start_date, end_date) of a pass for a plan duration."""
+    return start, start + timedelta(days=PLAN_DAYS.get(duration, 30))
+
+
+def create_booking(customer, gym, plan, amount, auto_renew=False, reason='checkout', actor=None):
+    """A pending booking for a pass starting today."""
+    start_date, end_date = pass_dates(plan.duration, timezone.localdate())
+    with transaction.atomic():
+        booking = Booking.objects.create(
+            customer=customer, gym=gym, plan=plan, amount=amount, payment_status='pending',
+            start_date=start_date, end_date=end_date, auto_renew=auto_renew,
+        )
+        BookingEvent.objects.create(booking=booking, to_status='pending', reason=reason, actor=actor)
+    return booking
+
+
+def transition(booking, to_status, reason='', actor=None, **fields):
+    """Move ``booking`` to ``to_status``, also setting ``fields``; raises InvalidTransition."""
+    from_status = booking.payment_status
+    if to_status not in TRANSITIONS.get(from_status, ()):
+        raise InvalidTransition(f'A {from_status} booking cannot become {to_status}')
+    with transaction.atomic():
+        updated = Booking.objects.filter(pk=booking.pk, payment_status=from_status).update(
+            payment_status=to_status, **fields
+        )
+        if not updated:
+            raise InvalidTransition('The booking was changed by someone else; reload and try again')
+        BookingEvent.objects.create(
+            booking=booking, from_status=from_status, to_status=to_status, reason=reason, actor=actor,
+        )
+        if to_status == 'completed':
+            queue_booking_confirmations([booking.pk])
+    booking.payment_status = to_status
+    for name, value in fields.items():
+        setattr(booking, name, value)
+    # update() sends no signals
+    bump_namespace('bookings')
+    return booking
+
+
+def bulk_transition(ids, from_status, to_status, reason=''):
+    """Move the bookings in ``ids`` that are still ``from_status``; returns the ids that moved."""
+    if to_status not in TRANSITIONS.get(from_status, ()):
+        raise InvalidTransition(f'A {from_status} booking cannot become {to_status}')
+    if not ids:
+        return []
+    with transaction.atomic():
+        moved = list(
+            Booking.objects.select_for_update().filter(id__in=ids, payment_status=from_status)
+            .order_by().values_list('id', flat=True)
+        )
+        Booking.objects.filter(id__in=moved).update(payment_status=to_status)
+        BookingEvent.objects.bulk_create(
+            BookingEvent(booking_id=booking_id, from_status=from_status, to_status=to_status, reason=reason)
+            for booking_id in moved
+        )
+        if to_status == 'completed':
+            queue_booking_confirmations(moved)
+    if moved:
+        bump_namespace('bookings')
+    return moved
+
+
+def complete(booking, payment_id, reason='payment', actor=None):
+    return transition(booking, 'completed', reason, actor, payment_id=payment_id)
+
+
+def fail(booking, reason='payment', actor=None):
+    return transition(booking, 'failed', reason, actor)
+
+
+def refund(booking, reason='refund', actor=None):
+    return transition(booking, 'refunded', reason, actor)
+
+
+def lapsed(today):
+    # No ordering: a batch is whichever lapsed rows the index finds first
+    return Booking.objects.filter(payment_status='completed', end_date__lt=today).order_by()
+
+
+def _sweep_batch(today, batch_size):
+    """Renew the auto-renew passes among up to ``batch_size`` lapsed ones, then expire them all.
+
+    Returns (renewed, expired).
+    """
+    with transaction.atomic():
+        rows = list(
+            lapsed(today).select_for_update(skip_locked=True, of=('self',)).values(
+                'id', 'auto_renew', 'renewal', 'customer_id', 'gym_id', 'gym__is_active', 'plan_id',
+                'plan__is_active', 'plan__duration', 'plan__price', 'end_date',
+            )[:batch_size]
+        )
+        if not rows:
+            return 0, 0
+        to_renew = [
+            row for row in rows
+            if row['auto_renew'] and row['renewal'] is None and row['plan__is_active'] and row['gym__is_active']
+        ]
+        prices = rule_sets(row['gym_id'] for row in to_renew)
+        renewals = []
+        for row in to_renew:
+            # A pass that lapsed a while ago restarts today rather than back-charging the gap
+            start_date, end_date = pass_dates(row['plan__duration'], max(row['end_date'] + timedelta(days=1), today))
+            quote = prices[row['gym_id']].quote(row['plan_id'], row['plan__duration'], row['plan__price'])
+            renewals.append(Booking(
+                customer_id=row['customer_id'], gym_id=row['gym_id'], plan_id=row['plan_id'],
+                amount=quote['price'], payment_status='pending',  # charged by payments.charge_renewals()
+                start_date=start_date, end_date=end_date, access_code=new_access_code(),
+                auto_renew=True, renewal_of_id=row['id'],
+            ))
+        Booking.objects.bulk_create(renewals, batch_size=1000)
+
+        # The row locks (SQLite: the single writer) keep these passes 'completed' until we commit
+        ids = [row['id'] for row in rows]
+        Booking.objects.filter(id__in=ids).update(payment_status='expired')
+        BookingEvent.objects.bulk_create([
+            *(BookingEvent(booking_id=renewal.pk, to_status='pending', reason='renewal') for renewal in renewals),
+            *(BookingEvent(booking_id=booking_id, from_status='completed', to_status='expired', reason='sweep')
+              for booking_id in ids),
+        ], batch_size=1000)
+    return len(renewals), len(ids)
+
+
+def sweep(today=None, batch_size=SWEEP_BATCH_SIZE, max_seconds=None, progress=None):
+    """Renew and expire lapsed passes in batches until none are left.
+
+    Returns ``{'renewed', 'expired', 'finished'}``; ``finished`` is False
+    when ``max_seconds`` ran out first. ``progress(result)`` is called
+    after each batch.
+    """
+    today = today or timezone.localdate()
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+    result = {'renewed': 0, 'expired': 0, 'finished': False}
+    try:
+        while not deadline or time.monotonic() < deadline:
+            renewed, expired = _sweep_batch(today, batch_size)
+            if not expired:
+                result['finished'] = True
+                break
+            result['renewed'] += renewed
+            result['expired'] += expired
+            if progress:
+                progress(result)
+        return result
+    finally:
+        if result['expired']:
+            # update() and bulk_create() send no signals
+            bump_namespace('bookings')
@@ -0,0 +1,136 @@
+"""
+Write-behind buffer for customer location pings.
+
+``/api/update-location/`` can be hit every few seconds per customer.
+Pings that moved less than ``LOCATION_MIN_DISTANCE_KM`` from the last
+known position are dropped; the rest are kept in the shared cache, so
+they survive the worker that received them. Only the newest position
+per customer is kept, and each customer is queued once per
+``LOCATION_FLUSH_INTERVAL``-second interval, in a numbered slot claimed
+with ``cache.add`` so two workers never queue into the same one.
+
+``flush()`` writes every finished interval with one ``bulk_update`` of
+the three location columns. A ping triggers it once an interval has
+passed since the last flush, and ``manage.py flush_locations --loop``
+runs it periodically, so a customer who pings once and stops is still
+written. Only one process flushes at a time.
+
+A just-sent position reaches the database an interval or two later;
+use ``last_location()`` rather than the model fields when the freshest
+position matters.
+"""
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo import calculate_distance
+from .models import Customer
+
+LOCATION_FIELDS = ['last_latitude', 'last_longitude', 'last_city']
+COORD_PLACES = Decimal('0.000001')  # Customer.last_latitude/longitude decimal_places
+PENDING_TIMEOUT = 6 * 60 * 60  # seconds queued pings wait for a flush before they are dropped
+FLUSH_GRACE = 2  # seconds after an interval ends before it is flushed, for pings still being queued
+FLUSH_LOCK_TIMEOUT = 60
+BATCH_SIZE = 500
+
+
+class LocationBuffer:
+
+    def __init__(self, min_distance_km=None, flush_interval=None, clock=time.time, prefix='locations'):
+        self.min_distance_km = (
+            min_distance_km if min_distance_km is not None
+            else getattr(settings, 'LOCATION_MIN_DISTANCE_KM', 0.1)
+        )
+        self.flush_interval = max(1, int(
+            flush_interval if flush_interval is not None
+            else getattr(settings, 'LOCATION_FLUSH_INTERVAL', 30)
+        ))
+        self.clock = clock  # wall-clock seconds, shared by every process
+        self.prefix = prefix
+
+    def _key(self, *parts):
+        return ':'.join(str(part) for part in (self.prefix, *parts))
+
+    def _interval(self, at):
+        return int(at // self.flush_interval)
+
+    def last_location(self, customer):
+        """(lat, lon, city) for ``customer``, preferring a position not yet flushed."""
+        pending = cache.get(self._key('pending', customer.pk))
+        if pending is not None:
+            return pending
+        if customer.last_latitude is None or customer.last_longitude is None:
+            return None
+        return customer.last_latitude, customer.last_longitude, customer.last_city
+
+    def record(self, customer, latitude, longitude, city=''):
+        """Queue a ping; returns False if it was too close to the last known position."""
+        latitude = Decimal(str(latitude)).quantize(COORD_PLACES)
+        longitude = Decimal(str(longitude)).quantize(COORD_PLACES)
+        city = (city or '')[:100]
+        previous = self.last_location(customer)
+        if previous is not None:
+            moved = calculate_distance(previous[0], previous[1], latitude, longitude)
+            if moved < self.min_distance_km and (not city or city == previous[2]):
+                return False
+
+        now = self.clock()
+        interval = self._interval(now)
+        position = (latitude, longitude, city or (previous[2] if previous else ''))
+        cache.set(self._key('pending', customer.pk), position, PENDING_TIMEOUT)
+        if cache.add(self._key('queued', interval, customer.pk), 1, PENDING_TIMEOUT):
+            cache.add(self._key('flushed_through'), interval - 1, None)
+            count_key = self._key('count', interval)
+            cache.add(count_key, 0, PENDING_TIMEOUT)
+            # Claim a slot with add(): if two processes draw the same number, the loser draws again
+            while not cache.add(self._key('queue', interval, cache.incr(count_key)), customer.pk, PENDING_TIMEOUT):
+                pass
+        if now - cache.get(self._key('flushed_at'), 0) >= self.flush_interval:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Write the positions queued in every finished interval; returns the number of rows."""
+        lock_key = self._key('flush_lock')
+        if not cache.add(lock_key, 1, FLUSH_LOCK_TIMEOUT):
+            return 0  # another process is flushing
+        try:
+            now = self.clock()
+            cache.set(self._key('flushed_at'), now, PENDING_TIMEOUT)
+            end = self._interval(now - FLUSH_GRACE)
+            done = cache.get(self._key('flushed_through'))
+            if done is None:  # evicted; look back as far as queued pings can still be
+                done = end - PENDING_TIMEOUT // self.flush_interval
+            interval = done + 1
+            written = 0
+            try:
+                while interval < end:
+                    written += self._flush_interval(interval)
+                    interval += 1
+            finally:
+                # A failed interval is retried by the next flush
+                cache.set(self._key('flushed_through'), interval - 1, None)
+            return written
+        finally:
+            cache.delete(lock_key)
+
+    def _flush_interval(self, interval):
+        count = cache.get(self._key('count', interval), 0)
+        written = 0
+        for start in range(1, count + 1, BATCH_SIZE):
+            queued = cache.get_many([
+                self._key('queue', interval, n) for n in range(start, min(start + BATCH_SIZE, count + 1))
+            ])
+            positions = cache.get_many([self._key('pending', pk) for pk in set(queued.values())])
+            customers = [
+                Customer(pk=int(key.rsplit(':', 1)[1]), last_latitude=lat, last_longitude=lon, last_city=city)
+                for key, (lat, lon, city) in positions.items()
+            ]
+            Customer.objects.bulk_update(customers, LOCATION_FIELDS, batch_size=BATCH_SIZE)
+            written += len(customers)
+        return written
+
+
+location_buffer = LocationBuffer()
@@ -0,0 +1,99 @@
+"""
+Management command to benchmark the platform admin dashboard and member roster.
+
+All generated rows are created inside a transaction that is rolled back.
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from gym_app.members import MEMBER_SORTS, PAGE_SIZE, member_queryset, platform_stats
+from gym_app.models import Booking, Customer, Gym, GymOwner, GymPlan
+from gym_app.pagination import encode_cursor, keyset_page
+
+
+class Command(BaseCommand):
+    help = 'Benchmark admin dashboard stats and keyset-paginated member list on synthetic customers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000000, help='Number of synthetic customers')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            self._run(options['customers'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def _timed(self, label, fn, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(f'{label:<52}{statistics.median(samples):>10.1f} ms  (max {max(samples):.1f} ms)')
+
+    def _run(self, count, repeat):
+        prefix = f'bench{time.time_ns()}'
+        self.stdout.write(f'Creating {count} synthetic customers...')
+        owner = GymOwner.objects.create(user=User.objects.create(username=f'{prefix}_owner'), phone_number='0')
+        gym = Gym.objects.create(owner=owner, name='Bench Gym', address='-', city='Bench',
+                                 latitude=0, longitude=0, phone_number='0')
+        plans = [
+            GymPlan.objects.create(gym=gym, name=name, duration='month', price=price, features='Gym access')
+            for name, price in [('Basic', 999), ('Premium', 1999), ('Elite', 2999)]
+        ]
+
+        batch = 5000
+        today = timezone.now().date()
+        for start in range(0, count, batch):
+            size = min(batch, count - start)
+            users = User.objects.bulk_create([
+                User(username=f'{prefix}_{i:07d}', email=f'member{i}@example.com', first_name=f'Member{i}')
+                for i in range(start, start + size)
+            ])
+            customers = Customer.objects.bulk_create([
+                Customer(user=user, phone_number=f'9{i:09d}') for i, user in enumerate(users, start)
+            ])
+            bookings = []
+            for customer in customers:
+                if random.random() < 0.6:
+                    plan = random.choice(plans)
+                    begin = today - timedelta(days=random.randint(0, 120))
+                    bookings.append(Booking(
+                        customer=customer, gym=gym, plan=plan, amount=plan.price,
+                        payment_status='completed', start_date=begin, end_date=begin + timedelta(days=30),
+                        access_code=f'{prefix}-{customer.id}',
+                    ))
+            Booking.objects.bulk_create(bookings)
+
+        self.stdout.write('')
+        self._timed('platform_stats (one aggregate query)', platform_stats, repeat)
+
+        for sort, ordering in MEMBER_SORTS.items():
+            self._timed(f'member list first page (sort={sort})',
+                        lambda: keyset_page(member_queryset(), ordering, None, PAGE_SIZE), repeat)
+
+        ordering = MEMBER_SORTS['newest']
+        middle = Customer.objects.order_by('-created_at', '-id')[count // 2]
+        cursor = encode_cursor([middle.created_at, middle.id])
+        self._timed('member list middle page (keyset)',
+                    lambda: keyset_page(member_queryset(), ordering, cursor, PAGE_SIZE), repeat)
+        self._timed('member list middle page (OFFSET, for comparison)',
+                    lambda: list(member_queryset().order_by('-created_at', '-id')[count // 2:count // 2 + PAGE_SIZE]),
+                    repeat)
+        self._timed('member search (q=member12345)',
+                    lambda: keyset_page(member_queryset('member12345'), ordering, None, PAGE_SIZE), repeat)
+        self._timed('recent payments',
+                    lambda: list(Booking.objects.filter(payment_status__in=Booking.PAID_STATUSES)
+                                 .select_related('customer__user', 'gym', 'plan')
+                                 .order_by('-created_at', '-id')[:10]), repeat)
+        self.stdout.write(f'\nTotal revenue check: ₹{platform_stats()["total_revenue"] or Decimal(0)}')
@@ -0,0 +1,66 @@
+"""
+Management command to compare API authentication overhead.
+
+Calls ``/api/owner/bookings/`` as the same gym owner with Basic, session
+and signed-token credentials and reports latency and queries per request.
+All generated rows are created inside a transaction that is rolled back.
+"""
+import base64
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from gym_app.authentication import issue_token
+from gym_app.models import GymOwner
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-request API auth cost for basic, session and token auth'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Requests per auth method')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._run(options['requests'])
+            transaction.set_rollback(True)
+
+    def _run(self, count):
+        username, password = f'bench{time.time_ns()}_owner', 'bench-password-1'
+        user = User.objects.create_user(username=username, password=password)
+        GymOwner.objects.create(user=user, phone_number='0')
+        url = reverse('api_owner_bookings')
+
+        session_client = Client()
+        session_client.login(username=username, password=password)
+        basic = base64.b64encode(f'{username}:{password}'.encode()).decode()
+        methods = [
+            ('basic', Client(HTTP_AUTHORIZATION=f'Basic {basic}')),
+            ('session', session_client),
+            ('token', Client(HTTP_AUTHORIZATION=f'Bearer {issue_token(user)}')),
+        ]
+
+        self.stdout.write(f'{"auth":<10}{"median":>12}{"p95":>12}{"queries/req":>14}')
+        for label, client in methods:
+            samples, queries = [], 0
+            for _ in range(count):
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    samples.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    self.stderr.write(f'{label}: HTTP {response.status_code}')
+                    break
+                queries += len(ctx.captured_queries)
+            samples.sort()
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            self.stdout.write(
+                f'{label:<10}{statistics.median(samples):>9.2f} ms{p95:>9.2f} ms{queries / len(samples):>14.1f}'
+            )
+        self.stdout.write('\nThe endpoint itself runs one query (the empty bookings page); the rest is auth.')
@@ -0,0 +1,107 @@
+"""
+Management command to load-test location pings: per-ping saves vs the write-behind buffer.
+
+Replays the same simulated ping storm against both paths on a simulated
+clock and counts the UPDATE statements each one sends. All generated
+rows are created inside a transaction that is rolled back.
+"""
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from gym_app.locations import FLUSH_GRACE, LocationBuffer
+from gym_app.models import Customer
+
+
+class Command(BaseCommand):
+    help = 'Compare DB writes per second for per-ping saves and buffered location updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=2000)
+        parser.add_argument('--rate', type=int, default=500, help='Pings per simulated second')
+        parser.add_argument('--seconds', type=int, default=120, help='Simulated duration')
+        parser.add_argument('--min-distance', type=float, default=0.1, help='km')
+        parser.add_argument('--flush-interval', type=int, default=30, help='seconds')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            self._run(options)
+            transaction.set_rollback(True)
+
+    def _pings(self, customers, rate, seconds):
+        """(simulated time, customer, lat, lon): mostly GPS jitter, sometimes a real move."""
+        position = {c.pk: [17.40 + random.random() * 0.1, 78.40 + random.random() * 0.1] for c in customers}
+        for tick in range(seconds * rate):
+            customer = random.choice(customers)
+            pos = position[customer.pk]
+            step = 0.01 if random.random() < 0.1 else 0.0002  # ~1 km vs ~20 m
+            pos[0] += random.uniform(-step, step)
+            pos[1] += random.uniform(-step, step)
+            yield tick / rate, customer, round(pos[0], 6), round(pos[1], 6)
+
+    def _report(self, label, pings, updates, wall, seconds):
+        self.stdout.write(
+            f'{label:<12}{pings:>8} pings{updates:>9} UPDATEs'
+            f'{updates / seconds:>10.1f} writes/s{wall:>9.2f} s wall'
+        )
+
+    def _count_updates(self):
+        counter = {'updates': 0}
+
+        def wrapper(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('UPDATE'):
+                counter['updates'] += 1
+            return execute(sql, params, many, context)
+        return counter, connection.execute_wrapper(wrapper)
+
+    def _run(self, options):
+        prefix = f'bench{time.time_ns()}'
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}_{i}') for i in range(options['customers'])
+        ])
+        customers = Customer.objects.bulk_create([Customer(user=u, phone_number='0') for u in users])
+        rate, seconds = options['rate'], options['seconds']
+        self.stdout.write(
+            f'{options["customers"]} customers, {rate} pings/s for {seconds} simulated seconds\n'
+        )
+
+        random.seed(options['seed'])
+        counter, wrapper = self._count_updates()
+        with wrapper:
+            start = time.perf_counter()
+            pings = 0
+            for _, customer, lat, lon in self._pings(customers, rate, seconds):
+                customer.last_latitude, customer.last_longitude = lat, lon
+                customer.save()
+                pings += 1
+            wall = time.perf_counter() - start
+        self._report('save()', pings, counter['updates'], wall, seconds)
+
+        Customer.objects.filter(pk__in=[c.pk for c in customers]).update(last_latitude=None, last_longitude=None)
+        customers = list(Customer.objects.filter(pk__in=[c.pk for c in customers]).order_by('pk'))
+        now = [0.0]
+        buffer = LocationBuffer(
+            min_distance_km=options['min_distance'],
+            flush_interval=options['flush_interval'],
+            clock=lambda: now[0],
+            prefix=f'{prefix}:locations',
+        )
+        random.seed(options['seed'])
+        counter, wrapper = self._count_updates()
+        with wrapper:
+            start = time.perf_counter()
+            pings = queued = 0
+            for at, customer, lat, lon in self._pings(customers, rate, seconds):
+                now[0] = at
+                queued += buffer.record(customer, lat, lon)
+                pings += 1
+            now[0] += options['flush_interval'] + FLUSH_GRACE  # let the last interval finish
+            buffer.flush()
+            wall = time.perf_counter() - start
+        self._report('buffered', pings, counter['updates'], wall, seconds)
+        self.stdout.write(f'\n{pings - queued} of {pings} pings were under {options["min_distance"]} km and skipped')
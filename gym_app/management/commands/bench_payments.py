@@ -0,0 +1,130 @@
+"""
+Management command to replay a burst of payment webhooks from many threads.
+
+Each thread delivers signed fake-gateway events (every event twice, as
+providers retry) straight into ``receive_webhook``; the queue is then
+drained in batches and every booking is checked to be settled exactly
+once. Like ``bench_slots`` it commits its data, since threads can't see
+each other's transactions, and deletes it afterwards.
+"""
+import json
+import statistics
+import threading
+import time
+import uuid
+from datetime import time as dtime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Count
+
+from gym_app.lifecycle import create_booking
+from gym_app.models import Booking, Customer, Gym, GymOwner, GymPlan, PaymentEvent
+from gym_app.payments import FakeGateway, process_events, receive_webhook
+
+MAX_RETRIES = 20
+
+
+class Command(BaseCommand):
+    help = 'Burst benchmark: concurrent signed webhooks queued, then applied in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--bookings', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        prefix = f'benchpay{time.time_ns()}'
+        gym, bookings = self._setup(prefix, options['bookings'])
+        try:
+            self._run(bookings, options['threads'], options['batch_size'])
+        finally:
+            PaymentEvent.objects.filter(payment_id__startswith=prefix).delete()
+            gym.delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+    def _setup(self, prefix, count):
+        owner = GymOwner.objects.create(user=User.objects.create_user(username=f'{prefix}_owner'), phone_number='0')
+        gym = Gym.objects.create(owner=owner, name='Payment Bench Gym', address='-', city='-', latitude=0,
+                                 longitude=0, phone_number='0', opening_time=dtime(6), closing_time=dtime(22))
+        plan = GymPlan.objects.create(gym=gym, name='Bench', duration='month', price=1, features='')
+        customer = Customer.objects.create(user=User.objects.create_user(username=f'{prefix}_customer'))
+        bookings = []
+        for i in range(count):
+            booking = create_booking(customer, gym, plan, 1)
+            booking.payment_id = f'{prefix}_{i}'
+            bookings.append(booking)
+        Booking.objects.bulk_update(bookings, ['payment_id'], batch_size=500)
+        return gym, bookings
+
+    def _run(self, bookings, thread_count, batch_size):
+        gateway = FakeGateway()
+        deliveries = []
+        for i, booking in enumerate(bookings):
+            body = json.dumps({
+                'id': f'evt_{uuid.uuid4().hex}',
+                'type': 'payment.failed' if i % 10 == 0 else 'payment.succeeded',
+                'payment_id': booking.payment_id,
+                'amount': str(booking.amount),
+            })
+            deliveries += [body, body]  # providers retry, so every event arrives twice
+        lock = threading.Lock()
+        results = {'stored': 0, 'duplicate': 0, 'retries': 0, 'errors': 0}
+        latencies = []
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        if not deliveries:
+                            return
+                        body = deliveries.pop()
+                    started = time.perf_counter()
+                    for _ in range(MAX_RETRIES):
+                        try:
+                            outcome = 'stored' if receive_webhook(gateway, body, gateway.signed_headers(body)) else 'duplicate'
+                            break
+                        except OperationalError:  # SQLite: database is locked
+                            with lock:
+                                results['retries'] += 1
+                            time.sleep(0.01)
+                    else:
+                        outcome = 'errors'
+                    with lock:
+                        results[outcome] += 1
+                        latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+
+        total = len(deliveries)
+        threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        self.stdout.write(f'{total} deliveries from {thread_count} threads ({connection.vendor}) in {elapsed:.2f}s: '
+                          f'{total / elapsed:.0f}/s, median {statistics.median(latencies):.1f} ms, '
+                          f'p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms')
+        self.stdout.write(f'Stored {results["stored"]}  duplicates {results["duplicate"]}  '
+                          f'lock retries {results["retries"]}  gave up {results["errors"]}')
+
+        started = time.perf_counter()
+        batches = 0
+        while process_events(batch_size):
+            batches += 1
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Applied the queue in {batches} batches of up to {batch_size} in {elapsed:.2f}s')
+
+        ids = [booking.pk for booking in bookings]
+        statuses = dict(
+            Booking.objects.filter(pk__in=ids).order_by().values_list('payment_status').annotate(n=Count('id'))
+        )
+        self.stdout.write(f'Bookings: {statuses}')
+        expected_failed = (len(bookings) + 9) // 10
+        if results['errors'] or statuses != {'completed': len(bookings) - expected_failed, 'failed': expected_failed}:
+            raise CommandError('Some bookings were not settled exactly once')
+        self.stdout.write(self.style.SUCCESS('Every booking settled once; duplicate deliveries ignored'))
@@ -0,0 +1,110 @@
+"""
+Management command to benchmark gym search against a large synthetic catalogue.
+
+All generated rows are created inside a transaction that is rolled back.
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from gym_app.models import Gym, GymOwner, GymSearchDocument
+from gym_app.search import InvertedIndex, postgres_search
+
+NAME_WORDS = ['Iron', 'Titan', 'Pulse', 'Core', 'Flex', 'Alpha', 'Prime', 'Zen', 'Beast', 'Fit', 'Power', 'Urban']
+CITIES = ['Hyderabad', 'Bengaluru', 'Mumbai', 'Pune', 'Chennai', 'Delhi', 'Kolkata', 'Jaipur']
+AREAS = ['Jubilee Hills', 'Banjara Hills', 'Koramangala', 'Indiranagar', 'Andheri', 'Baner', 'Adyar', 'Saket']
+FEATURES = ['sauna', 'parking', 'steam room', 'crossfit', 'yoga', 'boxing', 'pool', 'personal trainer',
+            'locker', 'shower', 'protein bar', 'zumba', 'cardio', 'free weights', '24/7 access']
+QUERIES = ['sauna', 'park', 'iron koram', 'yoga pune', 'steam', 'cross', 'titan gym', 'pool parking']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark /api/gyms/search/ index build and query latency on synthetic gyms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--gyms', type=int, default=100000, help='Number of synthetic gyms')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            self._run(options['gyms'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def _timed(self, fn, repeat):
+        samples = []
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return result, statistics.median(samples), p95
+
+    def _run(self, count, repeat):
+        self.stdout.write(f'Creating {count} synthetic gyms...')
+        user = User.objects.create(username=f'bench_search_{time.time_ns()}')
+        owner = GymOwner.objects.create(user=user, phone_number='0')
+
+        gyms = []
+        for i in range(count):
+            gyms.append(Gym(
+                owner=owner,
+                name=f'{random.choice(NAME_WORDS)} {random.choice(NAME_WORDS)} Gym {i}',
+                description=f"Facilities include {', '.join(random.sample(FEATURES, 4))}.",
+                address=f'{random.randint(1, 999)} {random.choice(AREAS)}',
+                city=random.choice(CITIES),
+                latitude=0,
+                longitude=0,
+                phone_number='0',
+            ))
+        Gym.objects.bulk_create(gyms, batch_size=2000)
+        gyms = Gym.objects.filter(owner=owner)
+        GymSearchDocument.objects.bulk_create(
+            [
+                GymSearchDocument(gym=gym, document='\n'.join([
+                    gym.name, gym.city, gym.address, gym.description, ', '.join(random.sample(FEATURES, 3)),
+                ]))
+                for gym in gyms.iterator(chunk_size=2000)
+            ],
+            batch_size=2000,
+        )
+
+        if connection.vendor == 'postgresql':
+            backend = 'postgres tsvector'
+            search = lambda q: postgres_search(q, 20)  # noqa: E731
+        else:
+            backend = 'python inverted index'
+            index = InvertedIndex()
+            start = time.perf_counter()
+            index.sync()
+            self.stdout.write(f'Full index build: {(time.perf_counter() - start) * 1000:.0f} ms '
+                              f'({len(index)} docs, {len(index.postings)} terms)')
+
+            # Incremental refresh after touching 100 gyms
+            touched = list(gyms.values_list('pk', flat=True)[:100])
+            GymSearchDocument.objects.filter(gym_id__in=touched).update(
+                document='renamed sauna gym', updated_at=timezone.now()
+            )
+            start = time.perf_counter()
+            index.sync()
+            self.stdout.write(f'Incremental sync (100 changed): {(time.perf_counter() - start) * 1000:.1f} ms')
+            search = lambda q: [gym_id for gym_id, _ in index.search(q)[:20]]  # noqa: E731
+
+        self.stdout.write(f'\nBackend: {backend}')
+        self.stdout.write(f"{'query':<16}{'index p50':>12}{'index p95':>12}{'LIKE p50':>12}{'results':>10}")
+        for query in QUERIES:
+            ids, p50, p95 = self._timed(lambda: search(query), repeat)
+            like = Q()
+            for token in query.split():
+                like &= Q(name__icontains=token) | Q(description__icontains=token) | Q(address__icontains=token)
+            _, like_p50, _ = self._timed(lambda: list(gyms.filter(like).values_list('pk', flat=True)[:20]), 3)
+            self.stdout.write(f'{query:<16}{p50:>10.2f}ms{p95:>10.2f}ms{like_p50:>10.2f}ms{len(ids):>10}')
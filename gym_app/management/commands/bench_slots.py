@@ -0,0 +1,124 @@
+"""
+Management command to hammer a single visit slot from many threads.
+
+Every thread reserves the same slot for its own customers through
+``reserve_slot``, then the slot's counter and reservation rows are
+checked against its capacity. Threads need their own connections and
+can't see each other's uncommitted rows, so unlike the other benches
+this one commits its data and deletes it afterwards. SQLite serializes
+writers, so "database is locked" retries are counted separately; run it
+against Postgres for meaningful contention numbers.
+"""
+import statistics
+import threading
+import time
+from datetime import time as dtime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from gym_app.models import Booking, Customer, Gym, GymOwner, GymPlan, Slot, SlotReservation
+from gym_app.slots import SlotFull, reserve_slot, slot_times
+
+MAX_RETRIES = 20
+
+
+class Command(BaseCommand):
+    help = 'Concurrency benchmark: many threads reserving one slot; checks it is never overbooked'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--customers', type=int, default=200, help='Reservation attempts, one per customer')
+        parser.add_argument('--capacity', type=int, default=50)
+
+    def handle(self, *args, **options):
+        prefix = f'benchslot{time.time_ns()}'
+        gym, customers = self._setup(prefix, options['customers'], options['capacity'])
+        try:
+            self._run(gym, customers, options['threads'])
+        finally:
+            gym.delete()
+            User.objects.filter(username__startswith=prefix).delete()
+
+    def _setup(self, prefix, count, capacity):
+        owner_user = User.objects.create_user(username=f'{prefix}_owner')
+        owner = GymOwner.objects.create(user=owner_user, phone_number='0')
+        gym = Gym.objects.create(
+            owner=owner, name='Slot Bench Gym', address='-', city='-', latitude=0, longitude=0,
+            phone_number='0', opening_time=dtime(0), closing_time=dtime(0), slot_minutes=60, slot_capacity=capacity,
+        )
+        plan = GymPlan.objects.create(gym=gym, name='Bench', duration='month', price=1, features='')
+        User.objects.bulk_create(User(username=f'{prefix}_{i}') for i in range(count))
+        Customer.objects.bulk_create(
+            Customer(user=user) for user in User.objects.filter(username__startswith=f'{prefix}_').exclude(pk=owner_user.pk)
+        )
+        customers = list(Customer.objects.filter(user__username__startswith=prefix))
+        today = timezone.localdate()
+        Booking.objects.bulk_create(
+            Booking(customer=c, gym=gym, plan=plan, amount=1, payment_status='completed',
+                    start_date=today, end_date=today + timedelta(days=30), access_code=f'{prefix}-{c.pk}')
+            for c in customers
+        )
+        return gym, customers
+
+    def _run(self, gym, customers, thread_count):
+        day = timezone.localdate() + timedelta(days=1)
+        start_time = slot_times(gym, day)[9]
+        lock = threading.Lock()
+        results = {'reserved': 0, 'full': 0, 'retries': 0, 'errors': 0}
+        latencies = []
+        queue = list(customers)
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        if not queue:
+                            return
+                        customer = queue.pop()
+                    started = time.perf_counter()
+                    for _ in range(MAX_RETRIES):
+                        try:
+                            reserve_slot(customer, gym, day, start_time)
+                            outcome = 'reserved'
+                            break
+                        except SlotFull:
+                            outcome = 'full'
+                            break
+                        except OperationalError:  # SQLite: database is locked
+                            with lock:
+                                results['retries'] += 1
+                            time.sleep(0.01)
+                    else:
+                        outcome = 'errors'
+                    with lock:
+                        results[outcome] += 1
+                        latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        slot = Slot.objects.get(gym=gym, date=day, start_time=start_time)
+        rows = SlotReservation.objects.filter(slot=slot).count()
+        self.stdout.write(f'{len(customers)} attempts on one slot from {thread_count} threads '
+                          f'({connection.vendor}) in {elapsed:.2f}s: {len(customers) / elapsed:.0f} attempts/s')
+        self.stdout.write(f'Reserved: {results["reserved"]}  full: {results["full"]}  '
+                          f'lock retries: {results["retries"]}  gave up: {results["errors"]}')
+        latencies.sort()
+        self.stdout.write(f'Latency: median {statistics.median(latencies):.1f} ms, '
+                          f'p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms')
+        self.stdout.write(f'Slot counter {slot.reserved}/{slot.capacity}, reservation rows {rows}')
+
+        expected = min(slot.capacity, len(customers) - results['errors'])
+        if not (slot.reserved == rows == results['reserved'] == expected):
+            raise CommandError('Slot counter, reservations and successes disagree')
+        self.stdout.write(self.style.SUCCESS('Never overbooked; counter matches reservations'))
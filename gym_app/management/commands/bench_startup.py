@@ -0,0 +1,82 @@
+"""
+Management command to measure worker start-up import cost.
+
+Starts fresh interpreters with ``python -X importtime`` that load the WSGI
+application and the URLconf (what a worker does before its first
+request), then reports wall time, the slowest imports, and whether any of
+the heavy optional dependencies that should load lazily were imported.
+With ``--budget-ms`` or ``--strict`` it fails, so CI can track it.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BOOT = (
+    'from musclemeter.wsgi import application; '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+# Only needed by a few endpoints; they should not load at start-up
+LAZY_MODULES = ('qrcode', 'PIL', 'firebase_admin', 'jwt', 'cryptography', 'google.auth')
+
+
+def parse_importtime(stderr):
+    """{module: cumulative microseconds} from ``-X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Benchmark worker start-up: import time of the WSGI app and URLconf'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start')
+        parser.add_argument('--top', type=int, default=15, help='Slowest imports to list')
+        parser.add_argument('--budget-ms', type=float, help='Fail if the median start-up exceeds this')
+        parser.add_argument('--strict', action='store_true',
+                            help='Fail if any lazily loaded dependency is imported at start-up')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'musclemeter.settings')}
+        walls, runs = [], []
+        for _ in range(options['runs']):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', BOOT],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            walls.append((time.perf_counter() - start) * 1000)
+            if result.returncode != 0:
+                raise CommandError(f'Start-up failed:\n{result.stderr[-2000:]}')
+            runs.append(parse_importtime(result.stderr))
+
+        # Per-module medians across runs; top-level entries sum to the total
+        modules = {name: statistics.median(run.get(name, 0) for run in runs) for name in runs[-1]}
+        self.stdout.write(f'Start-up wall time: median {statistics.median(walls):.0f} ms, '
+                          f'min {min(walls):.0f} ms over {len(walls)} runs')
+        self.stdout.write(f'Modules imported:   {len(modules)}')
+        self.stdout.write(f'\n{"cumulative ms":>14}  module')
+        for name, micros in sorted(modules.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'{micros / 1000:>14.1f}  {name}')
+
+        loaded = [name for name in LAZY_MODULES if name in modules]
+        self.stdout.write('')
+        if loaded:
+            self.stdout.write(self.style.WARNING(f'Imported at start-up but meant to be lazy: {", ".join(loaded)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'None of {", ".join(LAZY_MODULES)} imported at start-up'))
+
+        if options['strict'] and loaded:
+            raise CommandError('Lazy dependencies were imported at start-up')
+        if options['budget_ms'] is not None and statistics.median(walls) > options['budget_ms']:
+            raise CommandError(f'Median start-up {statistics.median(walls):.0f} ms is over the '
+                               f'{options["budget_ms"]:.0f} ms budget')
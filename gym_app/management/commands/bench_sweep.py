@@ -0,0 +1,66 @@
+"""
+Management command to benchmark the booking expiry/renewal sweep.
+
+All generated rows are created inside a transaction that is rolled back.
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from gym_app.lifecycle import SWEEP_BATCH_SIZE, sweep
+from gym_app.models import Booking, BookingEvent, Customer, Gym, GymOwner, GymPlan
+
+
+class Command(BaseCommand):
+    help = 'Benchmark expiring and auto-renewing synthetic lapsed passes in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=1000000, help='Number of lapsed passes')
+        parser.add_argument('--renew-share', type=float, default=0.1, help='Share of passes set to auto-renew')
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            self._run(options['bookings'], options['renew_share'], options['batch_size'])
+            transaction.set_rollback(True)
+
+    def _run(self, count, renew_share, batch_size):
+        prefix = f'benchsweep{time.time_ns()}'
+        owner = GymOwner.objects.create(user=User.objects.create(username=f'{prefix}_owner'), phone_number='0')
+        gym = Gym.objects.create(owner=owner, name='Sweep Bench Gym', address='-', city='Bench',
+                                 latitude=0, longitude=0, phone_number='0')
+        plan = GymPlan.objects.create(gym=gym, name='Monthly', duration='month', price=999, features='')
+        users = User.objects.bulk_create(User(username=f'{prefix}_{i}') for i in range(1000))
+        customers = Customer.objects.bulk_create(Customer(user=user) for user in users)
+
+        self.stdout.write(f'Creating {count} lapsed passes...')
+        today = timezone.localdate()
+        for start in range(0, count, 5000):
+            Booking.objects.bulk_create(
+                Booking(customer=random.choice(customers), gym=gym, plan=plan, amount=999,
+                        payment_status='completed', start_date=today - timedelta(days=40),
+                        end_date=today - timedelta(days=random.randint(1, 10)),
+                        access_code=f'{prefix}-{i}', auto_renew=random.random() < renew_share)
+                for i in range(start, min(start + 5000, count))
+            )
+        renewable = Booking.objects.filter(gym=gym, auto_renew=True).count()
+
+        started = time.perf_counter()
+        result = sweep(today, batch_size)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Renewed {result["renewed"]}, expired {result["expired"]} in {elapsed:.1f}s '
+                          f'({(result["renewed"] + result["expired"]) / elapsed:.0f} rows/s, batches of {batch_size})')
+
+        events = BookingEvent.objects.filter(booking__gym=gym).count()
+        if not (result['expired'] == count and result['renewed'] == renewable
+                and events == count + renewable
+                and not Booking.objects.filter(gym=gym, payment_status='completed', end_date__lt=today).exists()):
+            raise CommandError('Sweep left lapsed passes behind or missed audit events')
+        self.stdout.write(self.style.SUCCESS('Every lapsed pass expired, renewals created, one event each'))
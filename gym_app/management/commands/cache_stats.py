@@ -0,0 +1,35 @@
+"""
+Management command to report tiered cache hit, miss and eviction counters.
+"""
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from gym_app.cache import NAMESPACES, TieredCache, namespace_version
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss/eviction counters of the tiered default cache, summed over all workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing')
+
+    def handle(self, *args, **options):
+        default = caches['default']
+        if not isinstance(default, TieredCache):
+            raise CommandError(f'The default cache is {type(default).__name__}, not TieredCache')
+
+        stats = default.get_stats()
+        self.stdout.write(f"Shared backend: {type(default.shared).__name__}")
+        self.stdout.write(f"Lookups:        {stats['lookups']}")
+        self.stdout.write(f"Local hits:     {stats['local_hit']}")
+        self.stdout.write(f"Shared hits:    {stats['shared_hit']}")
+        self.stdout.write(f"Misses:         {stats['miss']}")
+        self.stdout.write(f"Sets:           {stats['set']}")
+        self.stdout.write(f"Evictions:      {stats['eviction']}")
+        self.stdout.write(self.style.SUCCESS(f"Hit rate:       {stats['hit_rate']:.1%}"))
+        versions = ', '.join(f'{name}={namespace_version(name)}' for name in NAMESPACES)
+        self.stdout.write(f"Namespaces:     {versions}")
+
+        if options['reset']:
+            default.reset_stats()
+            self.stdout.write('Counters reset.')
@@ -0,0 +1,27 @@
+"""
+Management command to report explore page cache hit rates.
+"""
+from django.core.management.base import BaseCommand
+
+from gym_app.explore_cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Show explore page cache hit/miss counters (use them to tune EXPLORE_CACHE_CELL_SIZE)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing')
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        self.stdout.write(f"Cell size:   {stats['cell_size']} deg")
+        self.stdout.write(f"Lookups:     {stats['lookups']}")
+        self.stdout.write(f"Fresh hits:  {stats['hit']}")
+        self.stdout.write(f"Stale hits:  {stats['stale']}")
+        self.stdout.write(f"Misses:      {stats['miss']}")
+        self.stdout.write(f"Revalidated: {stats['revalidate']}")
+        self.stdout.write(self.style.SUCCESS(f"Hit rate:    {stats['hit_rate']:.1%}"))
+
+        if options['reset']:
+            reset_stats()
+            self.stdout.write('Counters reset.')
@@ -0,0 +1,32 @@
+"""
+Management command to export an owner's bookings as CSV or NDJSON.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from gym_app.exports import FORMATS, iter_export, owner_booking_rows
+from gym_app.models import GymOwner
+
+
+class Command(BaseCommand):
+    help = "Stream a gym owner's booking history to a file or stdout"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Username of the gym owner')
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+        parser.add_argument('--gym', type=int, help='Only export bookings for this gym id')
+        parser.add_argument('--output', help='File to write (defaults to stdout)')
+
+    def handle(self, *args, **options):
+        owner = GymOwner.objects.filter(user__username=options['username']).first()
+        if owner is None:
+            raise CommandError(f"No gym owner with username '{options['username']}'")
+
+        chunks = iter_export(owner_booking_rows(owner, options['gym']), options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                for chunk in chunks:
+                    out.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,32 @@
+"""
+Management command to write buffered customer location pings.
+
+Pings are only queued in the shared cache until an interval is flushed.
+Busy sites flush from the pings themselves; run this with ``--loop``
+next to the web processes (or from cron without it) so the last pings
+before a quiet spell are written too.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from gym_app.locations import location_buffer
+
+
+class Command(BaseCommand):
+    help = 'Write the customer locations queued by the location buffer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep flushing every interval')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Seconds between flushes with --loop (default LOCATION_FLUSH_INTERVAL)')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or location_buffer.flush_interval
+        while True:
+            written = location_buffer.flush()
+            if written:
+                self.stdout.write(f'Wrote {written} customer locations')
+            if not options['loop']:
+                break
+            time.sleep(interval)
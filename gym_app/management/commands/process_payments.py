@@ -0,0 +1,36 @@
+"""
+Management command to apply queued payment webhook events.
+
+Run it with ``--loop`` as a worker next to the web processes; webhooks
+are only queued until it applies them. Without ``--loop``, one pass
+drains whatever is queued and exits, which suits a cron job.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gym_app.payments import process_events
+
+
+class Command(BaseCommand):
+    help = 'Settle pending bookings from queued payment webhook events, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'PAYMENT_BATCH_SIZE', 500))
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            handled = 0
+            while True:
+                done = process_events(options['batch_size'])
+                if not done:
+                    break
+                handled += done
+            if handled:
+                self.stdout.write(f'Handled {handled} payment events')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,21 @@
+"""
+Management command to queue reminders for passes that are about to end.
+
+Run it once a day; running it again the same day queues nothing new.
+``send_notifications`` delivers what it queues.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gym_app.notifications import queue_expiry_reminders
+
+
+class Command(BaseCommand):
+    help = 'Queue a digest for each customer whose passes end in N days'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'EXPIRY_REMINDER_DAYS', 3))
+
+    def handle(self, *args, **options):
+        queued = queue_expiry_reminders(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} reminders for passes ending in {options['days']} days"))
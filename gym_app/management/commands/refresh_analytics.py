@@ -0,0 +1,35 @@
+"""
+Management command to bring the owner analytics tables up to date.
+
+Run it every few minutes from a scheduler. Each run only reads booking
+events since the previous one (see ``gym_app.analytics``), so its cost
+follows recent activity, not the size of the booking history.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from gym_app.analytics import BATCH_SIZE, refresh
+
+
+class Command(BaseCommand):
+    help = 'Fold new booking events into the owner analytics tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--max-seconds', type=float, default=None,
+                            help='Stop starting new batches after this long')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recompute everything from the booking table first')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = refresh(options['batch_size'], options['max_seconds'], options['rebuild'])
+        elapsed = time.perf_counter() - started
+        if result['rebuilt']:
+            self.stdout.write(f'Rebuilt from {result["bookings"]} bookings')
+        self.stdout.write(f'Read {result["events"]} booking events in {elapsed:.1f}s')
+        if result['finished']:
+            self.stdout.write(self.style.SUCCESS('Analytics are up to date'))
+        else:
+            self.stdout.write(self.style.WARNING('Time budget reached; run again to continue'))
@@ -0,0 +1,53 @@
+"""
+Management command to recompute cached "gyms near me" lists.
+
+Meant to run every few minutes from a scheduler. Without ``--all`` it
+only touches customers within ``NEARBY_REFRESH_RADIUS_KM`` of gyms
+changed since the previous run. The lists live in the Django cache, so
+this needs a cache backend shared with the web processes.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gym_app.models import Customer, Gym
+from gym_app.nearby import KEY_PREFIX, customers_near, refresh_nearby
+
+LAST_RUN_KEY = f'{KEY_PREFIX}:last_refresh'
+
+
+class Command(BaseCommand):
+    help = 'Recompute nearby-gym lists for customers around recently changed gyms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute every customer with a location')
+        parser.add_argument('--minutes', type=int, default=15,
+                            help='Look-back window when there is no record of a previous run')
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        located = Customer.objects.filter(last_latitude__isnull=False, last_longitude__isnull=False)
+
+        if options['all']:
+            customers = located
+            self.stdout.write(f'Refreshing all {customers.count()} located customers...')
+        else:
+            since = cache.get(LAST_RUN_KEY) or started - timedelta(minutes=options['minutes'])
+            changed = Gym.objects.filter(updated_at__gte=since).values_list('latitude', 'longitude')
+            radius = getattr(settings, 'NEARBY_REFRESH_RADIUS_KM', 20)
+            ids = set()
+            for lat, lon in changed:
+                ids.update(customers_near(lat, lon, radius).values_list('id', flat=True))
+            customers = located.filter(id__in=ids)
+            self.stdout.write(f'{len(changed)} gyms changed since {since:%Y-%m-%d %H:%M:%S}; '
+                              f'{len(ids)} customers within {radius} km')
+
+        refreshed = 0
+        for customer_id, lat, lon in customers.values_list('id', 'last_latitude', 'last_longitude').iterator():
+            refresh_nearby(customer_id, lat, lon)
+            refreshed += 1
+        cache.set(LAST_RUN_KEY, started, None)
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {refreshed} nearby lists'))
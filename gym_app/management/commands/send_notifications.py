@@ -0,0 +1,39 @@
+"""
+Management command to send queued notifications.
+
+Run it with ``--loop`` as a worker; without it, one pass sends whatever
+is due and exits, which suits a cron job. Several workers can run at
+once: each claims its own batches.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gym_app.notifications import send_batch
+
+
+class Command(BaseCommand):
+    help = 'Send due notifications from the outbox, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'NOTIFICATION_BATCH_SIZE', 200))
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'NOTIFICATION_CONCURRENCY', 4),
+                            help='Sends in flight at once')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new notifications')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = failed = 0
+            while True:
+                batch_sent, batch_failed = send_batch(options['batch_size'], options['concurrency'])
+                if not batch_sent and not batch_failed:
+                    break
+                sent += batch_sent
+                failed += batch_failed
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} notifications, {failed} failed (will retry)')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,51 @@
+"""
+Management command to expire lapsed passes and auto-renew them.
+
+Meant to run daily (or more often) from a scheduler. Work is done in
+set-based batches (see ``gym_app.lifecycle.sweep``), so a backlog of a
+million passes costs a few hundred queries; ``--max-seconds`` bounds a
+run and the next one picks up the rest. Renewals are then charged
+through the payment gateway and complete when its webhook arrives.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gym_app.lifecycle import SWEEP_BATCH_SIZE, lapsed, sweep
+from gym_app.payments import charge_renewals
+
+
+class Command(BaseCommand):
+    help = 'Auto-renew, then expire, passes whose end date has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+        parser.add_argument('--max-seconds', type=float, default=None,
+                            help='Stop starting new batches after this long')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what a sweep would touch')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['dry_run']:
+            pending = lapsed(today)
+            self.stdout.write(f'{pending.count()} lapsed passes, '
+                              f'{pending.filter(auto_renew=True, renewal__isnull=True).count()} set to auto-renew')
+            return
+
+        started = time.perf_counter()
+
+        def progress(result):
+            self.stdout.write(f'  renewed {result["renewed"]}, expired {result["expired"]} '
+                              f'({time.perf_counter() - started:.1f}s)')
+
+        result = sweep(today, options['batch_size'], options['max_seconds'], progress)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'Renewed {result["renewed"]} and expired {result["expired"]} passes in {elapsed:.1f}s')
+        charged = charge_renewals()
+        if charged:
+            self.stdout.write(f'Started {charged} renewal charges')
+        if result['finished']:
+            self.stdout.write(self.style.SUCCESS('Nothing left to sweep'))
+        else:
+            self.stdout.write(self.style.WARNING('Time budget reached; run again to continue'))
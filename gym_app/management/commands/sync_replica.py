@@ -0,0 +1,35 @@
+"""
+Management command to copy the primary SQLite database onto the replica file.
+
+Only for the local two-SQLite stand-in (DATABASE_REPLICA_URL pointing at a
+second SQLite file); a real replica is kept in sync by the database.
+"""
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from gym_app.routers import REPLICA_ALIAS, replica_configured
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database to the replica SQLite file (local stand-in only)'
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError('No replica configured; set DATABASE_REPLICA_URL.')
+        primary, replica = connections['default'], connections[REPLICA_ALIAS]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('sync_replica only handles the SQLite stand-in.')
+
+        replica.close()
+        source = sqlite3.connect(primary.settings_dict['NAME'])
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Copied {primary.settings_dict["NAME"]} -> {replica.settings_dict["NAME"]}'
+        ))
@@ -0,0 +1,57 @@
+# Generated by Django 6.0.1 on 2026-10-19 03:04
+
+import django.db.models.deletion
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+def build_documents(apps, schema_editor):
+    Gym = apps.get_model('gym_app', 'Gym')
+    GymSearchDocument = apps.get_model('gym_app', 'GymSearchDocument')
+    documents = []
+    for gym in Gym.objects.prefetch_related('plans').iterator(chunk_size=500):
+        parts = [gym.name, gym.city, gym.address, gym.description]
+        for plan in gym.plans.all():
+            if plan.is_active:
+                parts.extend([plan.name, plan.features])
+        documents.append(GymSearchDocument(gym=gym, document='\n'.join(p for p in parts if p)))
+    GymSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+def gin_index():
+    # The index gym_app.search.search_gin_index() described when this migration was written
+    return GinIndex(SearchVector('document', config='simple'), name='gym_search_document_gin')
+
+
+def add_gin_index(apps, schema_editor):
+    # tsvector/GIN only exist on Postgres; other databases use the in-process index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('gym_app', 'GymSearchDocument'), gin_index())
+
+
+def remove_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('gym_app', 'GymSearchDocument'), gin_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0003_remove_payment_member_customer_gymowner_gym_gymphoto_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GymSearchDocument',
+            fields=[
+                ('gym', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='gym_app.gym')),
+                ('document', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+        migrations.RunPython(build_documents, migrations.RunPython.noop),
+        migrations.RunPython(add_gin_index, remove_gin_index),
+    ]
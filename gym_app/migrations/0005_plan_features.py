@@ -0,0 +1,78 @@
+# Generated by Django 6.0.1 on 2026-10-19 03:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def feature_slug(label):
+    return slugify(label)[:100]
+
+
+def parse_features(text):
+    # gym_app.models.parse_features as of this migration; Feature.slug and name hold 100 characters
+    labels = []
+    seen = set()
+    for label in (text or '').split(','):
+        label = label.strip()[:100]
+        slug = feature_slug(label)
+        if slug and slug not in seen:
+            seen.add(slug)
+            labels.append(label)
+    return labels
+
+
+def parse_plan_features(apps, schema_editor):
+    GymPlan = apps.get_model('gym_app', 'GymPlan')
+    Feature = apps.get_model('gym_app', 'Feature')
+    PlanFeature = apps.get_model('gym_app', 'PlanFeature')
+
+    features = {}
+    links = []
+    for plan in GymPlan.objects.iterator(chunk_size=500):
+        plan.feature_list = parse_features(plan.features)
+        plan.save(update_fields=['feature_list'])
+        for label in plan.feature_list:
+            slug = feature_slug(label)
+            if slug not in features:
+                features[slug] = Feature.objects.create(slug=slug, name=label)
+            links.append(PlanFeature(plan=plan, feature=features[slug]))
+    PlanFeature.objects.bulk_create(links, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0004_gymsearchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='gymplan',
+            name='feature_list',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.CreateModel(
+            name='PlanFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_features', to='gym_app.feature')),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_features', to='gym_app.gymplan')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('feature', 'plan'), name='unique_plan_feature')],
+            },
+        ),
+        migrations.RunPython(parse_plan_features, migrations.RunPython.noop),
+    ]
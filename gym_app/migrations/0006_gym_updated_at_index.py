@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0005_plan_features'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gym',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
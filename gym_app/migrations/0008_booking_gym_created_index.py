@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0007_member_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['gym', 'created_at', 'id'], name='booking_gym_created_idx'),
+        ),
+    ]
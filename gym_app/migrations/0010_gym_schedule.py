@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0009_slots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GymSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('opens', models.TimeField()),
+                ('closes', models.TimeField(help_text='At or before the opening time means closing after midnight')),
+                ('start_minute', models.PositiveIntegerField(editable=False)),
+                ('end_minute', models.PositiveIntegerField(editable=False)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule', to='gym_app.gym')),
+            ],
+            options={
+                'ordering': ['weekday', 'opens'],
+                'indexes': [models.Index(fields=['gym', 'start_minute', 'end_minute'], name='schedule_gym_minute_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:20
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0010_gym_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('off_peak', 'Off-peak discount'), ('promo', 'Promo code'), ('bundle', 'Multi-month bundle')], max_length=10)),
+                ('label', models.CharField(blank=True, max_length=100)),
+                ('percent_off', models.DecimalField(decimal_places=2, max_digits=5, validators=[django.core.validators.MinValueValidator(Decimal('0.01')), django.core.validators.MaxValueValidator(100)])),
+                ('code', models.CharField(blank=True, max_length=30)),
+                ('min_months', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('weekdays', models.CharField(blank=True, default='0123456', max_length=7)),
+                ('starts', models.TimeField(blank=True, null=True)),
+                ('ends', models.TimeField(blank=True, null=True)),
+                ('valid_from', models.DateTimeField(blank=True, null=True)),
+                ('valid_until', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_rules', to='gym_app.gym')),
+                ('plan', models.ForeignKey(blank=True, help_text='Leave empty to apply to every plan', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='price_rules', to='gym_app.gymplan')),
+            ],
+            options={
+                'ordering': ['kind', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0014_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GymStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_hours', models.JSONField(default=list)),
+                ('gym', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='gym_app.gym')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlanStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkouts', models.PositiveIntegerField(default=0)),
+                ('paid', models.PositiveIntegerField(default=0)),
+                ('renewals', models.PositiveIntegerField(default=0)),
+                ('lapsed', models.PositiveIntegerField(default=0)),
+                ('refunds', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_stats', to='gym_app.gym')),
+                ('plan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='gym_app.gymplan')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CohortMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort', models.DateField()),
+                ('active_months', models.BigIntegerField(default=0)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gym_app.customer')),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gym_app.gym')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('gym', 'customer'), name='unique_cohort_member')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CohortStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort', models.DateField()),
+                ('offset', models.PositiveSmallIntegerField()),
+                ('customers', models.PositiveIntegerField(default=0)),
+                ('gym', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cohort_stats', to='gym_app.gym')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('gym', 'cohort', 'offset'), name='unique_cohort_cell')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-20 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0015_analytics'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='paymentevent',
+            name='payment_event_queue_idx',
+        ),
+        migrations.AddField(
+            model_name='paymentevent',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='paymentevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='paymentevent',
+            index=models.Index(fields=['processed_at', 'next_attempt_at', 'id'], name='payment_event_queue_idx'),
+        ),
+    ]
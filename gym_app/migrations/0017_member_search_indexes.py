@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-20 09:40
+
+from django.conf import settings
+from django.db import migrations
+
+# Postgres compiles istartswith to UPPER("col"::text) LIKE UPPER(%s); these
+# expression indexes match it. The pattern opclasses let LIKE 'x%' use them
+# under any collation.
+USER_COLUMNS = ['username', 'email', 'first_name', 'last_name']
+
+
+def _indexes(apps, schema_editor):
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    customer_table = apps.get_model('gym_app', 'Customer')._meta.db_table
+    quote = schema_editor.quote_name
+    for column in USER_COLUMNS:
+        yield f'member_{column}_prefix_idx', f'{quote(user_table)} ((UPPER({quote(column)}::text)) text_pattern_ops)'
+    yield 'member_phone_prefix_idx', f'{quote(customer_table)} ({quote("phone_number")} varchar_pattern_ops)'
+
+
+def add_prefix_indexes(apps, schema_editor):
+    # Other databases have no such opclasses; SQLite's LIKE scans either way
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, target in _indexes(apps, schema_editor):
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {schema_editor.quote_name(name)} ON {target}')
+
+
+def remove_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in _indexes(apps, schema_editor):
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gym_app', '0016_payment_event_retry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(add_prefix_indexes, remove_prefix_indexes),
+    ]
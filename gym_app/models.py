@@ -1,7 +1,54 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+from django.utils.text import slugify
+import secrets
 import uuid
+from decimal import Decimal
+
+
+FEATURE_MAX_LENGTH = 100  # Feature.slug and Feature.name
+
+
+def feature_slug(label):
+    return slugify(label)[:FEATURE_MAX_LENGTH]
+
+
+def parse_features(text):
+    """Split a comma-separated features string into trimmed, de-duplicated labels.
+
+    Labels are cut to ``FEATURE_MAX_LENGTH`` and ones with no slug (e.g. "!!!") are skipped.
+    """
+    labels = []
+    seen = set()
+    for label in (text or '').split(','):
+        label = label.strip()[:FEATURE_MAX_LENGTH]
+        slug = feature_slug(label)
+        if slug and slug not in seen:
+            seen.add(slug)
+            labels.append(label)
+    return labels
+
+
+def new_access_code():
+    """A pass's gate code; 128 random bits, so codes don't collide even across millions of bookings."""
+    return f"MM-{secrets.token_hex(16).upper()}"
+
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def week_minutes(weekday, opens, closes):
+    """(start, end) minute-of-week of an opening interval, Monday 00:00 being 0.
+
+    ``closes`` at or before ``opens`` means the interval runs past
+    midnight, so ``end`` may be past the end of the week.
+    """
+    start = weekday * MINUTES_PER_DAY + opens.hour * 60 + opens.minute
+    length = (closes.hour * 60 + closes.minute - opens.hour * 60 - opens.minute) % MINUTES_PER_DAY
+    return start, start + (length or MINUTES_PER_DAY)
 
 
 class GymOwner(models.Model):
@@ -35,12 +82,16 @@ class Gym(models.Model):
     opening_time = models.TimeField(default='06:00')
     closing_time = models.TimeField(default='22:00')
     
+    # Visit slots between opening and closing time (see slots.py)
+    slot_minutes = models.PositiveSmallIntegerField(default=60, validators=[MinValueValidator(15), MaxValueValidator(240)])
+    slot_capacity = models.PositiveIntegerField(default=30, validators=[MinValueValidator(1)])
+    
     # Ratings and status
     rating = models.DecimalField(max_digits=2, decimal_places=1, default=4.0,
                                   validators=[MinValueValidator(1.0), MaxValueValidator(5.0)])
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -80,6 +131,8 @@ class GymPlan(models.Model):
     duration = models.CharField(max_length=20, choices=DURATION_CHOICES)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     features = models.TextField(help_text="Comma-separated list of features")
+    # Parsed once on save so templates and serializers don't re-split the text
+    feature_list = models.JSONField(default=list, blank=True, editable=False)
     is_popular = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
 
@@ -89,8 +142,60 @@ class GymPlan(models.Model):
     def __str__(self):
         return f"{self.gym.name} - {self.name} (₹{self.price})"
 
+    def save(self, *args, **kwargs):
+        self.feature_list = parse_features(self.features)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'features' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'feature_list'}
+        super().save(*args, **kwargs)
+        if update_fields is None or 'features' in update_fields:
+            self.sync_plan_features()
+
     def get_features_list(self):
-        return [f.strip() for f in self.features.split(',') if f.strip()]
+        return self.feature_list
+
+    def sync_plan_features(self):
+        """Point this plan's PlanFeature rows at the canonical Feature ids for its labels."""
+        wanted = {feature_slug(label): label[:FEATURE_MAX_LENGTH] for label in self.feature_list}
+        wanted.pop('', None)
+        existing = {f.slug: f for f in Feature.objects.filter(slug__in=wanted)}
+        missing = [Feature(slug=slug, name=label) for slug, label in wanted.items() if slug not in existing]
+        if missing:
+            Feature.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = {f.slug: f for f in Feature.objects.filter(slug__in=wanted)}
+
+        self.plan_features.exclude(feature__slug__in=wanted).delete()
+        current = set(self.plan_features.values_list('feature__slug', flat=True))
+        PlanFeature.objects.bulk_create(
+            [PlanFeature(plan=self, feature=existing[slug]) for slug in wanted if slug not in current],
+            ignore_conflicts=True,
+        )
+
+
+class Feature(models.Model):
+    """Canonical plan feature (e.g. "sauna") shared across all gyms."""
+    slug = models.SlugField(max_length=FEATURE_MAX_LENGTH, unique=True)
+    name = models.CharField(max_length=FEATURE_MAX_LENGTH)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class PlanFeature(models.Model):
+    """Normalized plan -> feature link, so "plans with feature X" is an index lookup."""
+    plan = models.ForeignKey(GymPlan, on_delete=models.CASCADE, related_name='plan_features')
+    feature = models.ForeignKey(Feature, on_delete=models.CASCADE, related_name='plan_features')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['feature', 'plan'], name='unique_plan_feature'),
+        ]
+
+    def __str__(self):
+        return f"{self.plan} - {self.feature}"
 
 
 class Customer(models.Model):
@@ -105,6 +210,11 @@ class Customer(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='customer_joined_idx'),
+        ]
+
     def __str__(self):
         return f"Customer: {self.user.get_full_name() or self.user.username}"
 
@@ -116,7 +226,10 @@ class Booking(models.Model):
         ('completed', 'Completed'),
         ('failed', 'Failed'),
         ('refunded', 'Refunded'),
+        ('expired', 'Expired'),
     ]
+    # Paid for, whether or not the pass has run out (revenue counts both)
+    PAID_STATUSES = ('completed', 'expired')
 
     booking_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='bookings')
@@ -126,7 +239,7 @@ class Booking(models.Model):
     # Payment details (simulated)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
-    payment_id = models.CharField(max_length=100, blank=True)  # Simulated payment reference
+    payment_id = models.CharField(max_length=100, blank=True, db_index=True)  # Reference at the payment provider
     
     # Booking period
     start_date = models.DateField()
@@ -135,15 +248,280 @@ class Booking(models.Model):
     # QR code for gym access
     access_code = models.CharField(max_length=50, unique=True)
     
+    # Renewal (see lifecycle.py): a renewed pass points at the one it continues
+    auto_renew = models.BooleanField(default=False)
+    renewal_of = models.OneToOneField('self', on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='renewal')
+    
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', 'end_date'], name='booking_customer_end_idx'),
+            models.Index(fields=['payment_status', 'end_date'], name='booking_status_end_idx'),
+            models.Index(fields=['created_at', 'id'], name='booking_created_idx'),
+            models.Index(fields=['gym', 'created_at', 'id'], name='booking_gym_created_idx'),
+        ]
 
     def __str__(self):
         return f"Booking {self.booking_id} - {self.customer.user.username} at {self.gym.name}"
 
     def save(self, *args, **kwargs):
         if not self.access_code:
-            self.access_code = f"MM-{uuid.uuid4().hex[:8].upper()}"
+            self.access_code = new_access_code()
+        super().save(*args, **kwargs)
+
+
+class BookingEvent(models.Model):
+    """Audit trail: one status change of a booking."""
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='events')
+    from_status = models.CharField(max_length=20, blank=True)  # empty when the booking was created
+    to_status = models.CharField(max_length=20)
+    reason = models.CharField(max_length=50, blank=True)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['booking', 'created_at'], name='booking_event_idx'),
+        ]
+
+    def __str__(self):
+        return f"Booking {self.booking_id}: {self.from_status or 'new'} -> {self.to_status} ({self.reason})"
+
+
+class PaymentEvent(models.Model):
+    """A webhook event from the payment provider, queued until it is applied (see payments.py)."""
+    provider = models.CharField(max_length=30)
+    event_id = models.CharField(max_length=100)
+    kind = models.CharField(max_length=50)
+    payment_id = models.CharField(max_length=100)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    outcome = models.CharField(max_length=20, blank=True)  # applied / rejected (amount mismatch) / ignored
+    # An event for a payment we don't know yet is retried later, behind newer events
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # Providers retry deliveries; each event is stored once
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='unique_payment_event'),
+        ]
+        indexes = [
+            models.Index(fields=['processed_at', 'next_attempt_at', 'id'], name='payment_event_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.kind} {self.event_id}"
+
+
+class Notification(models.Model):
+    """Outbox row: a message to a user, sent in batches by ``manage.py send_notifications``."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    channel = models.CharField(max_length=20, default='email')
+    template = models.CharField(max_length=50)  # gym_app/notifications/<template>.txt
+    context = models.JSONField(default=dict)
+    dedupe_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at', 'id'], name='notification_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.template} to {self.user_id} ({self.status})"
+
+
+class GymSearchDocument(models.Model):
+    """Denormalized searchable text for a gym (name, area, description, plans)."""
+    gym = models.OneToOneField(Gym, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    document = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"Search document for gym {self.gym_id}"
+
+
+class PriceRule(models.Model):
+    """A discount on a gym's plans, applied by the pricing engine (see pricing.py)."""
+    KIND_CHOICES = [
+        ('off_peak', 'Off-peak discount'),
+        ('promo', 'Promo code'),
+        ('bundle', 'Multi-month bundle'),
+    ]
+
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='price_rules')
+    plan = models.ForeignKey(GymPlan, on_delete=models.CASCADE, null=True, blank=True, related_name='price_rules',
+                             help_text="Leave empty to apply to every plan")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    label = models.CharField(max_length=100, blank=True)
+    percent_off = models.DecimalField(max_digits=5, decimal_places=2,
+                                      validators=[MinValueValidator(Decimal('0.01')), MaxValueValidator(100)])
+
+    # promo: the code customers enter (case-insensitive)
+    code = models.CharField(max_length=30, blank=True)
+    # bundle: plans covering at least this many months
+    min_months = models.PositiveSmallIntegerField(null=True, blank=True)
+    # off_peak: bought on these weekdays (Monday=0) between these times; ends <= starts wraps midnight
+    weekdays = models.CharField(max_length=7, blank=True, default='0123456')
+    starts = models.TimeField(null=True, blank=True)
+    ends = models.TimeField(null=True, blank=True)
+
+    valid_from = models.DateTimeField(null=True, blank=True)
+    valid_until = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['kind', 'id']
+
+    def __str__(self):
+        return f"{self.gym.name}: {self.label or self.get_kind_display()} (-{self.percent_off}%)"
+
+
+class GymSchedule(models.Model):
+    """One weekly opening interval; gyms without any use opening/closing time every day."""
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'),
+        (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday'),
+    ]
+
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='schedule')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    opens = models.TimeField()
+    closes = models.TimeField(help_text="At or before the opening time means closing after midnight")
+    # Normalized by save() (see week_minutes) so "open at" is an indexed range lookup
+    start_minute = models.PositiveIntegerField(editable=False)
+    end_minute = models.PositiveIntegerField(editable=False)
+
+    class Meta:
+        ordering = ['weekday', 'opens']
+        indexes = [
+            models.Index(fields=['gym', 'start_minute', 'end_minute'], name='schedule_gym_minute_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.gym.name}: {self.get_weekday_display()} {self.opens:%H:%M}-{self.closes:%H:%M}"
+
+    def save(self, *args, **kwargs):
+        self.normalize()
         super().save(*args, **kwargs)
+
+    def normalize(self):
+        """Fill the minute-of-week range; call before bulk_create, which skips save()."""
+        self.start_minute, self.end_minute = week_minutes(self.weekday, self.opens, self.closes)
+
+
+class Slot(models.Model):
+    """Occupancy counter for one visit slot; rows exist only once someone has reserved."""
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='slots')
+    date = models.DateField()
+    start_time = models.TimeField()
+    capacity = models.PositiveIntegerField()
+    reserved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['gym', 'date', 'start_time'], name='unique_gym_slot'),
+            models.CheckConstraint(condition=models.Q(reserved__lte=models.F('capacity')), name='slot_not_overbooked'),
+        ]
+
+    def __str__(self):
+        return f"{self.gym.name} {self.date} {self.start_time:%H:%M} ({self.reserved}/{self.capacity})"
+
+
+class SlotReservation(models.Model):
+    """A customer's place in a slot."""
+    slot = models.ForeignKey(Slot, on_delete=models.CASCADE, related_name='reservations')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='slot_reservations')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['slot', 'customer'], name='unique_slot_reservation'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer} - {self.slot}"
+
+
+class PlanStats(models.Model):
+    """Running totals for one plan, maintained by ``analytics.refresh()``."""
+    plan = models.OneToOneField(GymPlan, on_delete=models.CASCADE, related_name='stats')
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='plan_stats')
+    checkouts = models.PositiveIntegerField(default=0)  # bookings started by customers
+    paid = models.PositiveIntegerField(default=0)  # of those, paid for
+    renewals = models.PositiveIntegerField(default=0)  # automatic renewals, once paid for
+    lapsed = models.PositiveIntegerField(default=0)  # passes that ran out
+    refunds = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"Stats for plan {self.plan_id}"
+
+
+class CohortStats(models.Model):
+    """Customers of a gym who joined in ``cohort`` and held a pass ``offset`` months later."""
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='cohort_stats')
+    cohort = models.DateField()  # first day of the month of the customer's first paid pass
+    offset = models.PositiveSmallIntegerField()
+    customers = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['gym', 'cohort', 'offset'], name='unique_cohort_cell'),
+        ]
+
+    def __str__(self):
+        return f"Gym {self.gym_id} {self.cohort:%Y-%m} +{self.offset}: {self.customers}"
+
+
+class CohortMember(models.Model):
+    """Which months a customer held a pass at a gym, so each counts once in ``CohortStats``."""
+    gym = models.ForeignKey(Gym, on_delete=models.CASCADE, related_name='+')
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    cohort = models.DateField()
+    active_months = models.BigIntegerField(default=0)  # bit n: held a pass in month cohort + n
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['gym', 'customer'], name='unique_cohort_member'),
+        ]
+
+    def __str__(self):
+        return f"Customer {self.customer_id} at gym {self.gym_id} since {self.cohort:%Y-%m}"
+
+
+class GymStats(models.Model):
+    """Per-gym counters that don't belong to a plan."""
+    gym = models.OneToOneField(Gym, on_delete=models.CASCADE, related_name='stats')
+    booking_hours = models.JSONField(default=list)  # 168 checkout counts, Monday 00:00 first
+
+    def __str__(self):
+        return f"Stats for gym {self.gym_id}"
+
+
+class AnalyticsCheckpoint(models.Model):
+    """How far ``analytics.refresh()`` has read the booking event log."""
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at event {self.last_event_id}"
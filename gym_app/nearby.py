@@ -0,0 +1,128 @@
+"""
+Precomputed "gyms near me" lists for logged-in customers.
+
+Each customer's nearest gyms are cached as ready-to-render explore cards
+keyed by customer, computed from their last known location. A list is
+recomputed on read once the customer has moved more than
+``NEARBY_RECOMPUTE_KM`` from where it was built, and ``manage.py
+refresh_nearby`` recomputes the lists of customers around gyms that
+changed, so the explore page and ``/api/gyms/`` can answer without a
+location in the URL.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import bump_version, get_version
+from .explore_cache import gym_items
+from .geo import calculate_distance
+from .locations import location_buffer
+from .models import Customer, Gym
+from .pricing import price_items
+
+KEY_PREFIX = 'nearby'
+GENERATION_KEY = f'{KEY_PREFIX}:generation'
+KM_PER_DEGREE = 111.32
+SEARCH_RADIUS_KM = 10  # first bounding box tried; grows 4x until it holds enough gyms
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _key(customer_id):
+    return f'{KEY_PREFIX}:{customer_id}'
+
+
+def _generation():
+    return get_version(GENERATION_KEY)
+
+
+def invalidate_all():
+    """Make every cached list recompute on its next read (e.g. after a gym is deleted)."""
+    bump_version(GENERATION_KEY)
+
+
+def bounding_box(lat, lon, radius_km):
+    """(lat range, lon range) enclosing a circle of ``radius_km`` around a point."""
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return (lat - d_lat, lat + d_lat), (lon - d_lon, lon + d_lon)
+
+
+def nearest_gym_ids(lat, lon, limit):
+    """Ids of the ``limit`` nearest active gyms, searching outward in growing boxes."""
+    active = Gym.objects.filter(is_active=True)
+    radius = SEARCH_RADIUS_KM
+    while True:
+        if radius >= 20000:  # the box covers the globe
+            rows = active.values_list('id', 'latitude', 'longitude')
+        else:
+            lat_range, lon_range = bounding_box(lat, lon, radius)
+            rows = active.filter(
+                latitude__range=lat_range, longitude__range=lon_range
+            ).values_list('id', 'latitude', 'longitude')
+        ranked = sorted(
+            (calculate_distance(lat, lon, g_lat, g_lon), gym_id) for gym_id, g_lat, g_lon in rows
+        )[:limit]
+        # Exact once the box's inscribed circle holds the whole answer
+        if radius >= 20000 or (len(ranked) == limit and ranked[-1][0] <= radius):
+            return [gym_id for _, gym_id in ranked]
+        radius *= 4
+
+
+def customer_location(customer):
+    """(lat, lon, city) for a customer, or None if we've never had one."""
+    location = location_buffer.last_location(customer)
+    if location is None and customer.pk:
+        # API token users carry a bare profile, so read the stored position
+        row = Customer.objects.filter(pk=customer.pk).values_list(
+            'last_latitude', 'last_longitude', 'last_city'
+        ).first()
+        if row and row[0] is not None and row[1] is not None:
+            location = row
+    return location
+
+
+def refresh_nearby(customer_id, lat, lon):
+    """Compute and cache one customer's nearest gyms from (lat, lon)."""
+    lat, lon = float(lat), float(lon)
+    generation = _generation()
+    ids = nearest_gym_ids(lat, lon, _setting('NEARBY_LIMIT', 50))
+    entry = {
+        'lat': lat,
+        'lon': lon,
+        'generation': generation,
+        'computed_at': time.time(),
+        'items': gym_items(Gym.objects.filter(id__in=ids), (lat, lon)),
+    }
+    cache.set(_key(customer_id), entry, _setting('NEARBY_CACHE_TTL', 60 * 60 * 24))
+    return entry
+
+
+def get_nearby(customer):
+    """The customer's cached nearby entry (``lat``, ``lon``, ``items``), or None without a location."""
+    location = customer_location(customer)
+    if location is None:
+        return None
+    lat, lon = float(location[0]), float(location[1])
+
+    entry = cache.get(_key(customer.pk))
+    if (
+        entry is None
+        or entry['generation'] != _generation()
+        or calculate_distance(entry['lat'], entry['lon'], lat, lon) > _setting('NEARBY_RECOMPUTE_KM', 1.0)
+    ):
+        entry = refresh_nearby(customer.pk, lat, lon)
+    else:
+        # Lists live for a day; prices are redone on read so discounts stay current
+        price_items(entry['items'])
+    return entry
+
+
+def customers_near(lat, lon, radius_km):
+    """Customers whose stored location is inside the box around a point."""
+    lat_range, lon_range = bounding_box(float(lat), float(lon), radius_km)
+    return Customer.objects.filter(last_latitude__range=lat_range, last_longitude__range=lon_range)
@@ -0,0 +1,205 @@
+"""
+Notifications through a transactional outbox.
+
+Nothing is sent from a request. Code that wants to tell a user something
+adds ``Notification`` rows, in the same transaction as the change they
+describe (a booking confirmation is queued by the lifecycle transition
+that completes the booking). ``manage.py send_notifications`` then
+claims due rows in batches, renders them from
+``templates/gym_app/notifications/<template>_subject.txt`` and
+``<template>.txt``, and hands them to the channel named on the row,
+with at most ``NOTIFICATION_CONCURRENCY`` sends in flight.
+
+Channels are configured in ``NOTIFICATION_CHANNELS``. The email channel
+uses Django's ``EMAIL_BACKEND``: console or file backends locally, SMTP
+in production. Failed sends are retried with backoff until
+``MAX_ATTEMPTS``. A ``dedupe_key`` keeps a reminder job that runs twice
+from queueing twice.
+"""
+import abc
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Booking, Notification
+
+MAX_ATTEMPTS = 5
+CLAIM_LEASE = timedelta(minutes=5)  # a claimed row is retried after this if its worker died
+
+_channels = {}
+_lock = threading.Lock()
+
+
+class NotificationChannel(abc.ABC):
+    """Delivers rendered notifications; subclass per medium."""
+
+    @abc.abstractmethod
+    def send(self, items):
+        """Send ``[(notification, subject, body)]``; returns ``{notification.pk: error}`` for failures."""
+
+
+class EmailChannel(NotificationChannel):
+
+    def send(self, items):
+        errors = {}
+        # One connection per batch; each message separately so one bad address doesn't sink the rest
+        with get_connection() as connection:
+            for notification, subject, body in items:
+                if not notification.user.email:
+                    errors[notification.pk] = 'User has no email address'
+                    continue
+                try:
+                    EmailMessage(subject, body, to=[notification.user.email], connection=connection).send()
+                except Exception as e:
+                    errors[notification.pk] = str(e) or e.__class__.__name__
+        return errors
+
+
+def get_channel(name):
+    with _lock:
+        if name not in _channels:
+            _channels[name] = import_string(settings.NOTIFICATION_CHANNELS[name])()
+        return _channels[name]
+
+
+def render(notification):
+    """(subject, body) for a notification."""
+    context = {**notification.context, 'user': notification.user}
+    name = f'gym_app/notifications/{notification.template}'
+    subject = ' '.join(render_to_string(f'{name}_subject.txt', context).split())
+    return subject, render_to_string(f'{name}.txt', context)
+
+
+# -- queueing ---------------------------------------------------------------
+
+def _booking_context(booking):
+    return {
+        'booking_id': str(booking.booking_id),
+        'gym': booking.gym.name,
+        'plan': booking.plan.name,
+        'start_date': booking.start_date.isoformat(),
+        'end_date': booking.end_date.isoformat(),
+        'amount': str(booking.amount),
+        'access_code': booking.access_code,
+        'auto_renew': booking.auto_renew,
+    }
+
+
+def queue_booking_confirmations(booking_ids):
+    """Queue a confirmation for each newly paid booking; one query plus one insert."""
+    bookings = Booking.objects.filter(id__in=booking_ids).exclude(customer__user__email='').select_related(
+        'customer', 'gym', 'plan',
+    )
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=booking.customer.user_id, template='booking_confirmed',
+            context={**_booking_context(booking), 'renewal': booking.renewal_of_id is not None},
+            dedupe_key=f'confirmed:{booking.pk}',
+        )
+        for booking in bookings
+    ], batch_size=500, ignore_conflicts=True)
+
+
+def queue_expiry_reminders(days, today=None, chunk_size=2000):
+    """One digest per customer whose passes end in ``days`` days; returns how many were queued.
+
+    Uses the (payment_status, end_date) index, so the cost follows the
+    number of passes ending that day rather than the size of the table.
+    Auto-renewing passes are left out. Running it twice on the same day
+    queues nothing new.
+    """
+    today = today or timezone.localdate()
+    end_date = today + timedelta(days=days)
+    passes = defaultdict(list)
+    rows = Booking.objects.filter(
+        payment_status='completed', end_date=end_date, auto_renew=False,
+    ).exclude(customer__user__email='').order_by().select_related('customer', 'gym', 'plan')
+    for booking in rows.iterator(chunk_size=chunk_size):
+        passes[booking.customer.user_id].append(_booking_context(booking))
+
+    keys = {user_id: f'expiring:{user_id}:{end_date.isoformat()}' for user_id in passes}
+    queued = set(Notification.objects.filter(dedupe_key__in=keys.values()).values_list('dedupe_key', flat=True))
+    reminders = [
+        Notification(
+            user_id=user_id, template='passes_expiring', dedupe_key=keys[user_id],
+            context={'days': days, 'end_date': end_date.isoformat(), 'passes': user_passes},
+        )
+        for user_id, user_passes in passes.items() if keys[user_id] not in queued
+    ]
+    Notification.objects.bulk_create(reminders, batch_size=500, ignore_conflicts=True)
+    return len(reminders)
+
+
+# -- sending ----------------------------------------------------------------
+
+def claim(batch_size):
+    """Lease up to ``batch_size`` due notifications to this worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            Notification.objects.filter(status='pending', next_attempt_at__lte=now).select_related('user')
+            .select_for_update(skip_locked=True, of=('self',)).order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        for notification in batch:
+            notification.attempts += 1
+            notification.next_attempt_at = now + CLAIM_LEASE
+        Notification.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+    return batch
+
+
+def _send_chunk(channel_name, chunk):
+    items, errors = [], {}
+    for notification in chunk:
+        try:
+            items.append((notification, *render(notification)))
+        except Exception as e:
+            errors[notification.pk] = f'Could not render: {e}'
+    try:
+        errors.update(get_channel(channel_name).send(items))
+    except Exception as e:
+        errors.update({notification.pk: str(e) for notification, _, _ in items})
+    return errors
+
+
+def send_batch(batch_size=None, concurrency=None):
+    """Claim and send one batch; returns ``(sent, failed)``."""
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 200)
+    concurrency = concurrency or getattr(settings, 'NOTIFICATION_CONCURRENCY', 4)
+    batch = claim(batch_size)
+    if not batch:
+        return 0, 0
+    by_channel = defaultdict(list)
+    for notification in batch:
+        by_channel[notification.channel].append(notification)
+
+    # Split each channel's share into ``concurrency`` chunks, one connection each
+    chunks = [
+        (channel, items[i::concurrency])
+        for channel, items in by_channel.items() for i in range(min(concurrency, len(items)))
+    ]
+    errors = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for chunk_errors in pool.map(lambda args: _send_chunk(*args), chunks):
+            errors.update(chunk_errors)
+
+    now = timezone.now()
+    for notification in batch:
+        error = errors.get(notification.pk)
+        if error is None:
+            notification.status, notification.sent_at, notification.last_error = 'sent', now, ''
+        else:
+            notification.last_error = error[:1000]
+            if notification.attempts >= MAX_ATTEMPTS:
+                notification.status = 'failed'
+            else:
+                notification.next_attempt_at = now + timedelta(minutes=2 ** notification.attempts)
+    Notification.objects.bulk_update(batch, ['status', 'sent_at', 'last_error', 'next_attempt_at'])
+    return len(batch) - len(errors), len(errors)
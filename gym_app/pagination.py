@@ -0,0 +1,85 @@
+"""
+Keyset (seek) pagination helpers.
+
+Pages are addressed by an opaque cursor holding the sort key of the last
+row shown, so fetching page N costs the same as page 1: the database
+seeks to the cursor through the index instead of counting past an
+OFFSET.
+"""
+import base64
+import json
+from datetime import date, time
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    # isoformat() keeps microseconds, which DjangoJSONEncoder would round to milliseconds
+    values = [v.isoformat() if isinstance(v, (date, time)) else v for v in values]
+    raw = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """Return the cursor's key values converted for ``fields``, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(fields):
+        return None
+    try:
+        values = [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValidationError, TypeError, ValueError):
+        return None
+    # Sort keys are never NULL, and None can't be compared against
+    return None if None in values else values
+
+
+def _field(model, path):
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _value(obj, path):
+    for attr in path.split('__'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _after(ordering, values):
+    """Rows strictly after ``values`` in ``ordering`` (a list of (field, descending) pairs)."""
+    condition = Q()
+    for i, (field, descending) in enumerate(ordering):
+        step = Q(**{f'{field}__{"lt" if descending else "gt"}': values[i]})
+        for j in range(i):
+            step &= Q(**{ordering[j][0]: values[j]})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=50):
+    """Return ``(rows, next_cursor)`` for one page of ``queryset``.
+
+    ``ordering`` must end in a unique field (normally ``id``) so the
+    cursor identifies exactly one row. A cursor that doesn't decode to
+    values of the ordering's fields gives the first page.
+    """
+    values = decode_cursor(cursor, [_field(queryset.model, field) for field, _ in ordering])
+    if values is not None:
+        queryset = queryset.filter(_after(ordering, values))
+    queryset = queryset.order_by(*[f'-{field}' if desc else field for field, desc in ordering])
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor([_value(rows[-1], field) for field, _ in ordering])
+    return rows, next_cursor
@@ -0,0 +1,255 @@
+"""
+Payment gateways and asynchronous settlement through webhooks.
+
+Checkout creates a pending booking and asks the gateway
+(``PAYMENT_GATEWAY``) for a payment, without waiting for it to settle.
+The provider later calls ``/api/payments/webhook/<provider>/``. That
+view checks the signature and stores the event as a ``PaymentEvent``
+row, once per provider event id, so retried deliveries are harmless.
+The webhook never touches ``Booking``.
+
+``process_events()`` drains the stored events in batches: it marks every
+booking settled by the batch with one ``UPDATE`` per outcome (see
+``lifecycle.bulk_transition``), so a burst of webhooks becomes a few
+writes from one worker instead of many requests fighting over booking
+rows. A success event that captured a different amount than the
+booking's fails the booking instead of completing it.
+``manage.py process_payments --loop`` is the worker. For local
+development without one, ``PAYMENT_INLINE_DRAIN`` lets the pages that
+poll a pending booking drain a batch, at most once per
+``PAYMENT_DRAIN_INTERVAL`` across all workers; the webhook itself never
+does.
+
+Renewals created by the expiry sweep are charged the same way, by
+``charge_renewals()``.
+
+``FakeGateway`` stands in for a provider locally. It "delivers" its
+signed webhook to the same handler when the checkout transaction
+commits, and declines cards ending in 0002.
+"""
+import abc
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .lifecycle import bulk_transition
+from .models import Booking, PaymentEvent
+
+PaymentIntent = namedtuple('PaymentIntent', ['payment_id', 'redirect_url'])
+OUTCOMES = {'payment.succeeded': 'completed', 'payment.failed': 'failed'}
+DRAIN_LOCK_KEY = 'payments:drain'
+UNMATCHED_GRACE = 600  # seconds an event for an unknown payment waits before it is ignored
+UNMATCHED_RETRY_MAX = 60  # longest pause, in seconds, between looks for an unknown payment
+RENEWAL_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+_gateway = None
+_lock = threading.Lock()
+
+
+class InvalidSignature(Exception):
+    pass
+
+
+class PaymentGateway(abc.ABC):
+    """What a payment provider has to offer; subclass per provider."""
+
+    name = ''
+
+    @abc.abstractmethod
+    def create_payment(self, booking, **details):
+        """Start collecting ``booking.amount``; returns a PaymentIntent.
+
+        ``redirect_url`` is where to send the customer to pay, or None when
+        nothing more is needed from them.
+        """
+
+    @abc.abstractmethod
+    def verify_webhook(self, body, headers):
+        """The event in a webhook request as ``{'id', 'type', 'payment_id', ...}``; raises InvalidSignature."""
+
+
+class FakeGateway(PaymentGateway):
+    name = 'fake'
+    SIGNATURE_HEADER = 'X-Fake-Signature'
+    TOLERANCE = 300  # seconds a signed delivery stays valid
+    DECLINED_SUFFIX = '0002'
+
+    def __init__(self, secret=None):
+        self.secret = (secret or settings.PAYMENT_WEBHOOK_SECRET).encode()
+
+    def sign(self, body, timestamp):
+        return hmac.new(self.secret, f'{timestamp}.{body}'.encode(), hashlib.sha256).hexdigest()
+
+    def signed_headers(self, body):
+        timestamp = int(time.time())
+        return {self.SIGNATURE_HEADER: f't={timestamp},v1={self.sign(body, timestamp)}'}
+
+    def create_payment(self, booking, card_number='', **details):
+        payment_id = f'fake_{uuid.uuid4().hex[:16]}'
+        declined = str(card_number).replace(' ', '').endswith(self.DECLINED_SUFFIX)
+        body = json.dumps({
+            'id': f'evt_{uuid.uuid4().hex}',
+            'type': 'payment.failed' if declined else 'payment.succeeded',
+            'payment_id': payment_id,
+            'amount': str(booking.amount),
+        })
+        # A real provider would POST this to the webhook URL some time later
+        transaction.on_commit(lambda: receive_webhook(self, body, self.signed_headers(body)))
+        return PaymentIntent(payment_id, None)
+
+    def verify_webhook(self, body, headers):
+        try:
+            parts = dict(part.split('=', 1) for part in headers.get(self.SIGNATURE_HEADER, '').split(','))
+            timestamp = int(parts['t'])
+            signature = parts['v1']
+        except (KeyError, ValueError):
+            raise InvalidSignature('Missing or malformed signature')
+        if abs(time.time() - timestamp) > self.TOLERANCE:
+            raise InvalidSignature('Signature timestamp out of tolerance')
+        if not hmac.compare_digest(signature, self.sign(body, timestamp)):
+            raise InvalidSignature('Signature mismatch')
+        try:
+            event = json.loads(body)
+            event['id'], event['type'], event['payment_id']
+        except (ValueError, KeyError, TypeError):
+            raise InvalidSignature('Malformed event')
+        return event
+
+
+def get_gateway():
+    """The configured gateway, created on first use."""
+    global _gateway
+    if _gateway is None:
+        with _lock:
+            if _gateway is None:
+                _gateway = import_string(settings.PAYMENT_GATEWAY)()
+    return _gateway
+
+
+def start_payment(booking, **details):
+    """Ask the gateway to collect a pending booking and remember its payment id."""
+    with transaction.atomic():
+        intent = get_gateway().create_payment(booking, **details)
+        Booking.objects.filter(pk=booking.pk).update(payment_id=intent.payment_id)
+    booking.payment_id = intent.payment_id
+    return intent
+
+
+def charge_renewals(batch_size=RENEWAL_BATCH_SIZE):
+    """Start collecting the renewals ``lifecycle.sweep()`` created; returns how many were started.
+
+    Renewals are charged off-session, to the payment method the customer
+    used at checkout; the webhook then completes or fails them like any
+    other booking. A renewal whose charge could not be started keeps an
+    empty ``payment_id`` and is tried again on the next run.
+    """
+    started, last_id = 0, 0
+    while True:
+        batch = list(
+            Booking.objects.filter(payment_status='pending', payment_id='', renewal_of__isnull=False, id__gt=last_id)
+            .select_related('customer__user', 'gym', 'plan').order_by('id')[:batch_size]
+        )
+        if not batch:
+            return started
+        for booking in batch:
+            try:
+                start_payment(booking, off_session=True)
+                started += 1
+            except Exception:
+                logger.exception('Could not start the renewal charge for booking %s', booking.booking_id)
+        last_id = batch[-1].id
+
+
+def receive_webhook(gateway, body, headers):
+    """Verify and queue one webhook event; returns False for a repeat delivery."""
+    event = gateway.verify_webhook(body, headers)
+    _, created = PaymentEvent.objects.get_or_create(
+        provider=gateway.name, event_id=event['id'],
+        defaults={'kind': event['type'], 'payment_id': event['payment_id'], 'payload': event},
+    )
+    return created
+
+
+def process_events(batch_size=None):
+    """Apply up to ``batch_size`` due events; returns how many were looked at, including ones put back."""
+    batch_size = batch_size or getattr(settings, 'PAYMENT_BATCH_SIZE', 500)
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            PaymentEvent.objects.filter(processed_at__isnull=True, next_attempt_at__lte=now)
+            .select_for_update(skip_locked=True).order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not events:
+            return 0
+        events.sort(key=lambda event: event.pk)
+        bookings = {
+            payment_id: (booking_id, amount)
+            for payment_id, booking_id, amount in Booking.objects.filter(
+                payment_id__in={event.payment_id for event in events}
+            ).values_list('payment_id', 'id', 'amount')
+        }
+        booking_ids = {payment_id: booking_id for payment_id, (booking_id, _) in bookings.items()}
+        # The first event to settle a payment wins; later ones for it are ignored
+        settled = {}
+        for event in events:
+            outcome = OUTCOMES.get(event.kind)
+            if not outcome or event.payment_id not in bookings:
+                continue
+            reason = 'webhook'
+            if outcome == 'completed' and not _amount_matches(event.payload, bookings[event.payment_id][1]):
+                outcome, reason = 'failed', 'amount_mismatch'
+            settled.setdefault(event.payment_id, (outcome, reason, event.pk))
+
+        applied, rejected = set(), set()
+        for outcome, reason in {(outcome, reason) for outcome, reason, _ in settled.values()}:
+            group = {pid: event_pk for pid, (o, r, event_pk) in settled.items() if (o, r) == (outcome, reason)}
+            moved = set(bulk_transition([booking_ids[pid] for pid in group], 'pending', outcome, reason=reason))
+            done_events = {event_pk for pid, event_pk in group.items() if booking_ids[pid] in moved}
+            (rejected if reason == 'amount_mismatch' else applied).update(done_events)
+
+        # A webhook can beat the commit that stored its payment id; such events are
+        # retried with backoff for a while, moving behind newer ones so they can't block the queue
+        wait_until = now - timedelta(seconds=UNMATCHED_GRACE)
+        done = 0
+        for event in events:
+            if event.payment_id in booking_ids or event.received_at < wait_until:
+                event.processed_at = now
+                event.outcome = 'applied' if event.pk in applied else 'rejected' if event.pk in rejected else 'ignored'
+                done += 1
+            else:
+                event.attempts += 1
+                event.next_attempt_at = now + timedelta(seconds=min(2 ** event.attempts, UNMATCHED_RETRY_MAX))
+        PaymentEvent.objects.bulk_update(events, ['processed_at', 'outcome', 'attempts', 'next_attempt_at'])
+    return len(events)
+
+
+def _amount_matches(payload, amount):
+    """Whether a success event captured exactly the booking's amount."""
+    try:
+        return Decimal(str(payload['amount'])) == amount
+    except (KeyError, TypeError, InvalidOperation):
+        return False
+
+
+def drain_if_due():
+    """With ``PAYMENT_INLINE_DRAIN``, process one batch unless another process did so within the interval."""
+    if not getattr(settings, 'PAYMENT_INLINE_DRAIN', False):
+        return 0
+    if not cache.add(DRAIN_LOCK_KEY, 1, getattr(settings, 'PAYMENT_DRAIN_INTERVAL', 1)):
+        return 0
+    return process_events()
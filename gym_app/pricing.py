@@ -0,0 +1,168 @@
+"""
+Plan pricing: off-peak discounts, promo codes and multi-month bundles.
+
+A gym's active ``PriceRule`` rows are compiled into a ``RuleSet`` of
+plain tuples kept in each process, so quoting is arithmetic rather than
+queries. Every rule change stamps a per-gym version in the shared cache
+(see signals); a process recompiles a gym when its stamp moves, and
+``rule_sets()`` loads all stale gyms of a page with one query.
+
+Discounts of different kinds stack: the best matching bundle, the best
+off-peak window and the promo code each take their percentage off the
+running price, in that order.
+"""
+import threading
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .cache import bump_version, get_version
+from .models import PriceRule
+
+PLAN_MONTHS = {'day': 0, 'week': 0, 'month': 1, 'quarter': 3, 'half_year': 6, 'year': 12}
+VERSION_PREFIX = 'pricing:version'
+HUNDRED = Decimal('100')
+PAISE = Decimal('0.01')
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+class InvalidPromoCode(Exception):
+    pass
+
+
+def _minute(t):
+    return t.hour * 60 + t.minute
+
+
+class RuleSet:
+    """One gym's rules, pre-sorted into lookups by kind."""
+
+    def __init__(self, rules, version=0):
+        self.version = version
+        self.bundles = []   # (plan_id, min_months, percent, label, valid_from, valid_until)
+        self.off_peak = []  # (plan_id, weekdays, start, end, percent, label, valid_from, valid_until)
+        self.promos = defaultdict(list)  # CODE -> [(plan_id, percent, label, valid_from, valid_until)]
+        for rule in rules:
+            label = rule.label or rule.get_kind_display()
+            window = (rule.valid_from, rule.valid_until)
+            if rule.kind == 'bundle' and rule.min_months:
+                self.bundles.append((rule.plan_id, rule.min_months, rule.percent_off, label, *window))
+            elif rule.kind == 'off_peak' and rule.starts and rule.ends:
+                weekdays = frozenset(int(d) for d in rule.weekdays if d.isdigit())
+                self.off_peak.append((rule.plan_id, weekdays, _minute(rule.starts), _minute(rule.ends),
+                                      rule.percent_off, label, *window))
+            elif rule.kind == 'promo' and rule.code:
+                self.promos[rule.code.strip().upper()].append((rule.plan_id, rule.percent_off, label, *window))
+
+    @staticmethod
+    def _valid(plan_id, rule_plan_id, at, valid_from, valid_until):
+        return (
+            (rule_plan_id is None or rule_plan_id == plan_id)
+            and (valid_from is None or valid_from <= at)
+            and (valid_until is None or at < valid_until)
+        )
+
+    def _off_peak_now(self, start, end, weekdays, local):
+        # A window ending at or before its start runs past midnight into the next day
+        minute = local.hour * 60 + local.minute
+        if start < end:
+            return local.weekday() in weekdays and start <= minute < end
+        if minute >= start:
+            return local.weekday() in weekdays
+        return minute < end and (local.weekday() - 1) % 7 in weekdays
+
+    def quote(self, plan_id, duration, list_price, at=None, code=''):
+        """Price of one plan at ``at`` (default now), with the discounts that were applied."""
+        at = at or timezone.now()
+        local = timezone.localtime(at) if timezone.is_aware(at) else at
+        months = PLAN_MONTHS.get(duration, 0)
+        best = []
+
+        bundles = [
+            (percent, label) for rule_plan, min_months, percent, label, *window in self.bundles
+            if months >= min_months and self._valid(plan_id, rule_plan, at, *window)
+        ]
+        off_peak = [
+            (percent, label) for rule_plan, weekdays, start, end, percent, label, *window in self.off_peak
+            if self._valid(plan_id, rule_plan, at, *window) and self._off_peak_now(start, end, weekdays, local)
+        ]
+        promos = [
+            (percent, label) for rule_plan, percent, label, *window in self.promos.get(code.strip().upper(), ())
+            if self._valid(plan_id, rule_plan, at, *window)
+        ] if code else []
+        for kind, matches in (('bundle', bundles), ('off_peak', off_peak), ('promo', promos)):
+            if matches:
+                percent, label = max(matches)
+                best.append({'kind': kind, 'label': label, 'percent_off': percent})
+
+        price = Decimal(list_price)
+        for discount in best:
+            price -= price * discount['percent_off'] / HUNDRED
+        return {
+            'plan_id': plan_id,
+            'list_price': Decimal(list_price),
+            'price': max(price, Decimal(0)).quantize(PAISE, ROUND_HALF_UP),
+            'discounts': best,
+        }
+
+
+def _version_key(gym_id):
+    return f'{VERSION_PREFIX}:{gym_id}'
+
+
+def rules_changed(gym_id):
+    """Make every process recompile this gym's rules on next use."""
+    bump_version(_version_key(gym_id))
+
+
+def rule_sets(gym_ids):
+    """{gym_id: RuleSet}, recompiling stale gyms with a single query."""
+    gym_ids = list(dict.fromkeys(gym_ids))
+    keys = {gym_id: _version_key(gym_id) for gym_id in gym_ids}
+    stamps = cache.get_many(list(keys.values()))
+    versions = {gym_id: stamps.get(key) or get_version(key) for gym_id, key in keys.items()}
+    with _lock:
+        stale = [
+            gym_id for gym_id in gym_ids
+            if gym_id not in _compiled or _compiled[gym_id].version != versions[gym_id]
+        ]
+    if stale:
+        rules = defaultdict(list)
+        for rule in PriceRule.objects.filter(gym_id__in=stale, is_active=True):
+            rules[rule.gym_id].append(rule)
+        with _lock:
+            for gym_id in stale:
+                _compiled[gym_id] = RuleSet(rules[gym_id], versions[gym_id])
+    with _lock:
+        return {gym_id: _compiled[gym_id] for gym_id in gym_ids}
+
+
+def quote_plans(gym, plans, code='', at=None):
+    """Quotes for a gym's plans in one pass; a promo code that matches none of them is an error."""
+    rule_set = rule_sets([gym.id])[gym.id]
+    quotes = [rule_set.quote(plan.id, plan.duration, plan.price, at, code) for plan in plans]
+    if code and not any(d['kind'] == 'promo' for q in quotes for d in q['discounts']):
+        raise InvalidPromoCode('That promo code is not valid for this gym')
+    return quotes
+
+
+def quote_plan(plan, code='', at=None):
+    return quote_plans(plan.gym, [plan], code, at)[0]
+
+
+def price_items(items, at=None):
+    """Set ``min_price``/``min_list_price`` on explore cards from their ``plans`` (no promo codes)."""
+    sets = rule_sets(item['id'] for item in items)
+    for item in items:
+        if 'plans' not in item:  # cached before cards carried their plans
+            continue
+        rule_set = sets[item['id']]
+        quotes = [rule_set.quote(plan_id, duration, price, at) for plan_id, duration, price in item['plans']]
+        cheapest = min(quotes, key=lambda q: q['price'], default=None)
+        item['min_price'] = cheapest['price'] if cheapest else None
+        item['min_list_price'] = cheapest['list_price'] if cheapest else None
+    return items
@@ -0,0 +1,21 @@
+"""
+QR code images for gym passes and member cards.
+
+``qrcode`` pulls in PIL, so it is imported on the first QR rendered rather
+than when the views load.
+"""
+import base64
+from io import BytesIO
+
+
+def qr_png_base64(data, fill_color='black', back_color='white'):
+    """PNG of a QR code for ``data``, base64-encoded for an ``<img src="data:...">``."""
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, box_size=10, border=4)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color=fill_color, back_color=back_color)
+    buffer = BytesIO()
+    img.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode()
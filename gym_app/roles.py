@@ -0,0 +1,73 @@
+"""
+Per-request role resolution.
+
+Users are loaded with both role profiles joined in, so the
+``hasattr(user, 'gym_owner_profile')`` / ``hasattr(user,
+'customer_profile')`` checks used across the views read the relation
+cache instead of issuing a query each. ``RoleMiddleware`` then exposes
+the resolved role as ``request.role``.
+"""
+from django.contrib.auth import BACKEND_SESSION_KEY, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.utils.functional import SimpleLazyObject
+
+PROFILE_BACKEND = 'gym_app.roles.ProfileModelBackend'
+# Sessions created before this backend existed still name the stock one
+LEGACY_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+
+def with_profiles(queryset):
+    return queryset.select_related('gym_owner_profile', 'customer_profile')
+
+
+def user_role(user):
+    """'owner', 'customer' or '' (anonymous, or no profile). Owners win for users with both."""
+    if not user.is_authenticated:
+        return ''
+    if hasattr(user, 'gym_owner_profile'):
+        return 'owner'
+    if hasattr(user, 'customer_profile'):
+        return 'customer'
+    return ''
+
+
+class ProfileModelBackend(ModelBackend):
+    """``ModelBackend`` that fetches users together with their role profiles."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = with_profiles(UserModel._default_manager).get(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            # Run the hasher anyway so response time doesn't reveal whether the user exists
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        user = with_profiles(UserModel._default_manager).filter(pk=user_id).first()
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+
+class RoleMiddleware:
+    """Sets ``request.role`` (see ``user_role``); must come after AuthenticationMiddleware.
+
+    The role is resolved lazily, on first use, so for API views it
+    reflects the user DRF authenticated rather than the session user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.session.get(BACKEND_SESSION_KEY) == LEGACY_BACKEND:
+            request.session[BACKEND_SESSION_KEY] = PROFILE_BACKEND
+        request.role = SimpleLazyObject(lambda: user_role(request.user))
+        return self.get_response(request)
@@ -0,0 +1,112 @@
+"""
+Read-replica routing.
+
+Views wrapped with ``replica_reads`` (or using ``ReplicaReadMixin``) read
+gym data from the ``replica`` database alias when one is configured.
+Everything else, including auth and sessions, stays on ``default``.
+The first write in a request pins the rest of that request to the
+primary, and ``ReplicaPinMiddleware`` keeps the same browser on the
+primary for ``REPLICA_PIN_SECONDS`` afterwards, so a redirect after a
+POST doesn't read from a replica that hasn't caught up yet.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'db_pin'
+REPLICA_APPS = {'gym_app'}
+
+_routing = ContextVar('db_routing', default=None)
+
+
+def _state():
+    state = _routing.get()
+    if state is None:
+        state = {'replica': False, 'pinned': False, 'wrote': False}
+        _routing.set(state)
+    return state
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def use_replica():
+    state = _state()
+    previous, state['replica'] = state['replica'], True
+    try:
+        yield
+    finally:
+        state['replica'] = previous
+
+
+def replica_reads(view):
+    """Let a read-heavy function view read gym data from the replica."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with use_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """``replica_reads`` for class-based (DRF) views."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with use_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state()
+        if (
+            state['replica'] and not state['pinned']
+            and model._meta.app_label in REPLICA_APPS
+            and replica_configured()
+            # Reads inside a transaction (e.g. select_for_update) belong with its writes
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in REPLICA_APPS:
+            state = _state()
+            state['pinned'] = state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """Fresh routing state per request, plus a short primary pin after writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = PIN_COOKIE in request.COOKIES
+        token = _routing.set({'replica': False, 'pinned': pinned, 'wrote': False})
+        try:
+            response = self.get_response(request)
+            if _state()['wrote'] and replica_configured():
+                response.set_cookie(
+                    PIN_COOKIE, '1',
+                    max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10),
+                    httponly=True, samesite='Lax',
+                )
+            return response
+        finally:
+            _routing.reset(token)
@@ -0,0 +1,179 @@
+"""
+Full-text gym search.
+
+Every gym has a ``GymSearchDocument`` holding its searchable text, which
+is refreshed whenever the gym or one of its plans is saved. On Postgres
+the documents are matched with ``tsvector``/``tsquery`` through a GIN
+expression index. Other databases (SQLite in development) use an
+in-process inverted index that pulls only the documents changed since its
+last sync, with prefix matching on every query term.
+"""
+import bisect
+import re
+import threading
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+
+from .models import Gym, GymSearchDocument
+
+SEARCH_CONFIG = 'simple'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def build_document(gym, plans=None):
+    """Text indexed for a gym: name, area, description and active plan names/features."""
+    if plans is None:
+        plans = gym.plans.filter(is_active=True)
+    parts = [gym.name, gym.city, gym.address, gym.description]
+    for plan in plans:
+        parts.append(plan.name)
+        parts.append(plan.features)
+    return '\n'.join(part for part in parts if part)
+
+
+def refresh_document(gym):
+    """Rebuild the search document for a gym or gym id (no-op if the gym is gone)."""
+    if not isinstance(gym, Gym):
+        gym = Gym.objects.filter(pk=gym).first()
+        if gym is None:
+            return
+    GymSearchDocument.objects.update_or_create(gym=gym, defaults={'document': build_document(gym)})
+
+
+def search_vector():
+    return SearchVector('document', config=SEARCH_CONFIG)
+
+
+def search_gin_index():
+    """GIN index over the exact expression ``postgres_search`` filters on."""
+    return GinIndex(search_vector(), name='gym_search_document_gin')
+
+
+class InvertedIndex:
+    """Pure-Python term -> gym id postings with prefix lookups.
+
+    ``sync()`` pulls documents whose ``updated_at`` moved since the last
+    sync, so each process keeps itself current with one indexed query.
+    Deleted or deactivated gyms may linger in the postings; callers
+    re-check results against the database.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_terms = {}
+        self.synced_at = None
+        self._sorted_terms = []
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def add(self, gym_id, text):
+        terms = set(tokenize(text))
+        old_terms = self.doc_terms.get(gym_id, set())
+        for term in old_terms - terms:
+            ids = self.postings.get(term)
+            if ids is not None:
+                ids.discard(gym_id)
+                if not ids:
+                    del self.postings[term]
+                    self._dirty = True
+        for term in terms - old_terms:
+            if term not in self.postings:
+                self.postings[term] = set()
+                self._dirty = True
+            self.postings[term].add(gym_id)
+        self.doc_terms[gym_id] = terms
+
+    def sync(self):
+        documents = GymSearchDocument.objects.all()
+        if self.synced_at is not None:
+            # >= so rows saved in the same instant as the last sync are not missed
+            documents = documents.filter(updated_at__gte=self.synced_at)
+        with self._lock:
+            for gym_id, text, updated_at in documents.values_list('gym_id', 'document', 'updated_at').iterator(chunk_size=2000):
+                self.add(gym_id, text)
+                if self.synced_at is None or updated_at > self.synced_at:
+                    self.synced_at = updated_at
+
+    def _terms_with_prefix(self, prefix):
+        if self._dirty:
+            self._sorted_terms = sorted(self.postings)
+            self._dirty = False
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        for term in self._sorted_terms[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def search(self, query):
+        """Return ``[(gym_id, score)]`` for gyms matching every query term (as a prefix)."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        scores = None
+        with self._lock:
+            for token in tokens:
+                token_scores = {}
+                for term in self._terms_with_prefix(token):
+                    # Whole-word matches outrank prefix matches
+                    weight = 2 if term == token else 1
+                    for gym_id in self.postings[term]:
+                        if token_scores.get(gym_id, 0) < weight:
+                            token_scores[gym_id] = weight
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {gym_id: scores[gym_id] + s for gym_id, s in token_scores.items() if gym_id in scores}
+                if not scores:
+                    return []
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+_index = InvertedIndex()
+
+
+def get_python_index():
+    _index.sync()
+    return _index
+
+
+def postgres_search(query, limit):
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    tsquery = SearchQuery(
+        ' & '.join(f'{token}:*' for token in tokens), config=SEARCH_CONFIG, search_type='raw'
+    )
+    vector = search_vector()
+    return list(
+        GymSearchDocument.objects.annotate(rank=SearchRank(vector, tsquery))
+        .filter(gym__is_active=True)
+        .alias(vector=vector).filter(vector=tsquery)
+        .order_by('-rank', 'gym_id')
+        .values_list('gym_id', flat=True)[:limit]
+    )
+
+
+def search_gym_ids(query, limit=20):
+    """Ranked ids of active gyms matching ``query``."""
+    if connection.vendor == 'postgresql':
+        return postgres_search(query, limit)
+
+    ids = []
+    matches = get_python_index().search(query)
+    # Walk the ranked matches in batches, keeping only gyms that are still active
+    for start in range(0, len(matches), limit * 2):
+        batch = [gym_id for gym_id, _ in matches[start:start + limit * 2]]
+        active = set(Gym.objects.filter(pk__in=batch, is_active=True).values_list('pk', flat=True))
+        ids.extend(gym_id for gym_id in batch if gym_id in active)
+        if len(ids) >= limit:
+            break
+    return ids[:limit]
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Gym, GymPhoto, GymPlan, Booking, Customer, GymOwner
+from .models import Gym, GymPhoto, GymPlan, GymSchedule, Booking, Customer, GymOwner, PriceRule
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,9 +13,44 @@ class GymPhotoSerializer(serializers.ModelSerializer):
         fields = ['id', 'image', 'caption', 'is_primary']
 
 class GymPlanSerializer(serializers.ModelSerializer):
+    feature_list = serializers.ListField(child=serializers.CharField(), read_only=True)
+
     class Meta:
         model = GymPlan
-        fields = ['id', 'name', 'duration', 'price', 'features', 'is_popular']
+        fields = ['id', 'name', 'duration', 'price', 'features', 'feature_list', 'is_popular']
+
+class GymScheduleSerializer(serializers.ModelSerializer):
+    opens = serializers.TimeField(format='%H:%M')
+    closes = serializers.TimeField(format='%H:%M')
+
+    class Meta:
+        model = GymSchedule
+        fields = ['weekday', 'opens', 'closes']
+
+class PriceRuleSerializer(serializers.ModelSerializer):
+    starts = serializers.TimeField(format='%H:%M', required=False, allow_null=True)
+    ends = serializers.TimeField(format='%H:%M', required=False, allow_null=True)
+
+    class Meta:
+        model = PriceRule
+        fields = ['id', 'plan', 'kind', 'label', 'percent_off', 'code', 'min_months', 'weekdays',
+                  'starts', 'ends', 'valid_from', 'valid_until', 'is_active']
+
+    def validate(self, data):
+        gym = self.context['gym']
+        if data.get('plan') and data['plan'].gym_id != gym.id:
+            raise serializers.ValidationError({'plan': 'Plan belongs to another gym'})
+        kind = data.get('kind')
+        if kind == 'promo' and not data.get('code', '').strip():
+            raise serializers.ValidationError({'code': 'Promo rules need a code'})
+        if kind == 'bundle' and not data.get('min_months'):
+            raise serializers.ValidationError({'min_months': 'Bundle rules need min_months'})
+        if kind == 'off_peak':
+            if not (data.get('starts') and data.get('ends')):
+                raise serializers.ValidationError({'starts': 'Off-peak rules need starts and ends'})
+            if not set(data.get('weekdays', '0123456')) <= set('0123456'):
+                raise serializers.ValidationError({'weekdays': 'Use digits 0 (Monday) to 6'})
+        return data
 
 class GymOwnerSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
@@ -49,3 +84,13 @@ class BookingSerializer(serializers.ModelSerializer):
             'booking_id', 'gym_name', 'plan_name', 'amount', 
             'payment_status', 'start_date', 'end_date', 'access_code', 'created_at'
         ]
+
+class OwnerBookingSerializer(BookingSerializer):
+    customer_name = serializers.SerializerMethodField()
+    payment_status_display = serializers.CharField(source='get_payment_status_display', read_only=True)
+
+    class Meta(BookingSerializer.Meta):
+        fields = BookingSerializer.Meta.fields + ['customer_name', 'payment_status_display']
+
+    def get_customer_name(self, obj):
+        return obj.customer.user.get_full_name() or obj.customer.user.username
@@ -0,0 +1,91 @@
+"""
+Model signal handlers that keep cached data in step with the database.
+"""
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_namespace
+from .explore_cache import invalidate_grids
+from .nearby import invalidate_all as invalidate_nearby_lists
+from .pricing import rules_changed
+from .search import refresh_document
+from .snapshot import gym_removed
+from .models import Booking, Gym, GymPhoto, GymPlan, GymSchedule, PriceRule, Slot
+
+
+@receiver([post_save, post_delete], sender=Gym)
+@receiver([post_save, post_delete], sender=GymPlan)
+@receiver([post_save, post_delete], sender=GymPhoto)
+@receiver([post_save, post_delete], sender=GymSchedule)
+@receiver([post_save, post_delete], sender=PriceRule)
+def invalidate_explore_grids(sender, instance, **kwargs):
+    invalidate_grids()
+
+
+@receiver(post_save, sender=Gym)
+def refresh_gym_search_document(sender, instance, **kwargs):
+    refresh_document(instance)
+
+
+@receiver([post_save, post_delete], sender=GymPlan)
+def refresh_plan_search_document(sender, instance, **kwargs):
+    # After commit: when the gym itself is being deleted, its plans go first
+    # and rebuilding the document here would re-insert a row pointing at it
+    gym_id = instance.gym_id
+    transaction.on_commit(lambda: refresh_document(gym_id))
+
+
+@receiver([post_save, post_delete], sender=GymPlan)
+@receiver([post_save, post_delete], sender=GymPhoto)
+@receiver([post_save, post_delete], sender=GymSchedule)
+def touch_gym(sender, instance, **kwargs):
+    # Plans, photos and opening hours are part of a gym's data, so they bump its updated_at
+    Gym.objects.filter(pk=instance.gym_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Gym)
+def invalidate_nearby(sender, instance, **kwargs):
+    # Deletes don't bump updated_at, so refresh_nearby can't find the affected customers
+    invalidate_nearby_lists()
+
+
+@receiver(post_delete, sender=Gym)
+def expire_snapshot_deltas(sender, instance, **kwargs):
+    # Nor can the snapshot delta list them
+    gym_removed()
+
+
+@receiver([post_save, post_delete], sender=Gym)
+@receiver([post_save, post_delete], sender=GymPhoto)
+@receiver([post_save, post_delete], sender=GymSchedule)
+def bump_gyms_namespace(sender, instance, **kwargs):
+    # Replaces the cached gym snapshot (see snapshot.py)
+    bump_namespace('gyms')
+
+
+@receiver([post_save, post_delete], sender=GymPlan)
+def bump_plans_namespace(sender, instance, **kwargs):
+    bump_namespace('plans')
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def bump_bookings_namespace(sender, instance, **kwargs):
+    bump_namespace('bookings')
+
+
+@receiver([post_save, post_delete], sender=PriceRule)
+def recompile_price_rules(sender, instance, **kwargs):
+    rules_changed(instance.gym_id)
+
+
+@receiver(post_save, sender=Gym)
+def update_slot_capacity(sender, instance, created, **kwargs):
+    # Upcoming slots follow a capacity change, but never drop below places already taken
+    if not created:
+        Slot.objects.filter(gym=instance, date__gte=timezone.localdate()).exclude(
+            capacity=instance.slot_capacity
+        ).update(capacity=Greatest(Value(instance.slot_capacity), F('reserved')))
@@ -0,0 +1,142 @@
+"""
+Visit slots and contention-safe reservations.
+
+Each opening interval of a gym - its weekly ``GymSchedule``, or
+``opening_time`` to ``closing_time`` every day - is cut into
+``slot_minutes`` slots (running past midnight for overnight hours), each
+holding at most ``slot_capacity`` people. A slot belongs to the date it
+starts on.
+
+A ``Slot`` row is created on the first reservation and its ``reserved``
+counter only ever changes through a single conditional ``UPDATE ... SET
+reserved = reserved + 1 WHERE reserved < capacity``, so concurrent
+reservations can't overbook and no row lock is held while Python runs.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MINUTES_PER_DAY, MINUTES_PER_WEEK, Booking, Slot, SlotReservation, week_minutes
+
+DAYS_AHEAD = 14  # how far ahead customers may reserve
+
+
+class SlotUnavailable(Exception):
+    """The slot can't be reserved (not a slot, in the past, no pass...)."""
+
+
+class SlotFull(SlotUnavailable):
+    pass
+
+
+def opening_ranges(gym, schedule=None):
+    """Minute-of-week (start, end) ranges the gym is open."""
+    if schedule is None:
+        schedule = list(gym.schedule.all())
+    if schedule:
+        return [(row.start_minute, row.end_minute) for row in schedule]
+    return [week_minutes(weekday, gym.opening_time, gym.closing_time) for weekday in range(7)]
+
+
+def slot_times(gym, day, schedule=None):
+    """Start times of the slots beginning on ``day``, in order."""
+    times = set()
+    for start, end in opening_ranges(gym, schedule):
+        for minute in range(start, end - gym.slot_minutes + 1, gym.slot_minutes):
+            minute %= MINUTES_PER_WEEK
+            if minute // MINUTES_PER_DAY == day.weekday():
+                minute %= MINUTES_PER_DAY
+                times.add(time(minute // 60, minute % 60))
+    return sorted(times)
+
+
+def slot_start(day, start_time):
+    return timezone.make_aware(datetime.combine(day, start_time))
+
+
+def week_availability(gym, start=None, days=7):
+    """Per-day slot availability from ``start`` (default today): one query for the schedule, one for the counters."""
+    start = start or timezone.localdate()
+    end = start + timedelta(days=days - 1)
+    counters = {
+        (row_date, row_time): (capacity, reserved)
+        for row_date, row_time, capacity, reserved in Slot.objects.filter(
+            gym=gym, date__range=(start, end)
+        ).values_list('date', 'start_time', 'capacity', 'reserved')
+    }
+    schedule = list(gym.schedule.all())
+    now = timezone.now()
+    ends_after = timedelta(minutes=gym.slot_minutes)
+
+    result = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        slots = []
+        for start_time in slot_times(gym, day, schedule):
+            capacity, reserved = counters.get((day, start_time), (gym.slot_capacity, 0))
+            slots.append({
+                'start': start_time.strftime('%H:%M'),
+                'capacity': capacity,
+                'reserved': reserved,
+                'available': max(capacity - reserved, 0),
+                'past': slot_start(day, start_time) + ends_after <= now,
+            })
+        result.append({'date': day.isoformat(), 'slots': slots})
+    return result
+
+
+def has_pass(customer, gym, day):
+    return Booking.objects.filter(
+        customer=customer, gym=gym, payment_status='completed',
+        start_date__lte=day, end_date__gte=day,
+    ).exists()
+
+
+def reserve_slot(customer, gym, day, start_time):
+    """Reserve a place for ``customer``; returns the reservation (the existing one if already booked).
+
+    Raises ``SlotFull`` when the slot has no room and ``SlotUnavailable``
+    for anything else that rules it out.
+    """
+    if start_time not in slot_times(gym, day):
+        raise SlotUnavailable('Not a slot at this gym')
+    if slot_start(day, start_time) + timedelta(minutes=gym.slot_minutes) <= timezone.now():
+        raise SlotUnavailable('This slot has already ended')
+    if day > timezone.localdate() + timedelta(days=DAYS_AHEAD):
+        raise SlotUnavailable(f'Slots can be reserved up to {DAYS_AHEAD} days ahead')
+    if not has_pass(customer, gym, day):
+        raise SlotUnavailable('You need an active pass for this gym on that day')
+
+    try:
+        with transaction.atomic():
+            slot, _ = Slot.objects.get_or_create(
+                gym=gym, date=day, start_time=start_time, defaults={'capacity': gym.slot_capacity},
+            )
+            existing = SlotReservation.objects.filter(slot=slot, customer=customer).first()
+            if existing is not None:
+                return existing
+            taken = Slot.objects.filter(pk=slot.pk, reserved__lt=F('capacity')).update(reserved=F('reserved') + 1)
+            if not taken:
+                raise SlotFull('This slot is full')
+            return SlotReservation.objects.create(slot=slot, customer=customer)
+    except IntegrityError:
+        # The same customer reserved concurrently; their other request won and ours rolled back
+        return SlotReservation.objects.get(
+            slot__gym=gym, slot__date=day, slot__start_time=start_time, customer=customer,
+        )
+
+
+def cancel_reservation(reservation):
+    """Give the place back; a no-op if it was already cancelled."""
+    with transaction.atomic():
+        deleted, _ = SlotReservation.objects.filter(pk=reservation.pk).delete()
+        if deleted:
+            Slot.objects.filter(pk=reservation.slot_id, reserved__gt=0).update(reserved=F('reserved') - 1)
+    return bool(deleted)
+
+
+def parse_slot(day, start):
+    """(date, time) from ``YYYY-MM-DD`` and ``HH:MM`` strings; raises ValueError."""
+    return date.fromisoformat(day), time.fromisoformat(start).replace(second=0, microsecond=0)
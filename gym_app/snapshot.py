@@ -0,0 +1,163 @@
+"""
+Compact gym snapshot for mobile clients.
+
+All active gyms are serialized as columnar JSON (parallel arrays, one per
+field) instead of the nested ``/api/gyms/`` payload. The snapshot is
+built once per change, stored in the cache pre-compressed and versioned
+by the newest ``Gym.updated_at`` (or the last hard delete, if later) so
+clients can revalidate with an ETag or ask for a delta of the gyms
+changed since their version. Deltas can't list deleted rows, so a
+version older than the last delete gets the full snapshot. The cached
+copy is keyed under the ``gyms`` and ``plans`` cache namespaces, which
+the model signals bump on every change to a gym or its plans, photos or
+opening hours.
+"""
+import gzip
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+from .cache import namespaced_key
+from .filters import with_min_price
+from .models import Gym
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+CACHE_KEY = 'gym_snapshot:v1'
+REMOVED_KEY = 'gym_snapshot:removed_at'
+SNAPSHOT_TTL = 60 * 60 * 24
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+COLUMNS = ['id', 'name', 'city', 'lat', 'lon', 'min_price', 'rating', 'photo']
+
+
+def to_version(moment):
+    """Snapshot version for a timestamp: microseconds since the epoch."""
+    return (moment - EPOCH) // timedelta(microseconds=1) if moment else 0
+
+
+def from_version(version):
+    return EPOCH + timedelta(microseconds=version)
+
+
+def _columns(queryset):
+    gyms = with_min_price(queryset).prefetch_related('photos').order_by('id')
+    columns = {name: [] for name in COLUMNS}
+    for gym in gyms:
+        photos = list(gym.photos.all())
+        columns['id'].append(gym.id)
+        columns['name'].append(gym.name)
+        columns['city'].append(gym.city)
+        columns['lat'].append(float(gym.latitude))
+        columns['lon'].append(float(gym.longitude))
+        columns['min_price'].append(float(gym.min_price) if gym.min_price is not None else None)
+        columns['rating'].append(float(gym.rating))
+        columns['photo'].append(photos[0].image.url if photos else None)
+    return columns
+
+
+def _encode(payload):
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def _key():
+    return namespaced_key('gyms', namespaced_key('plans', CACHE_KEY))
+
+
+def build_snapshot(store=True):
+    """Build the full snapshot: body plus gzip/brotli variants, cached until the next change."""
+    # Read the key first so a build racing with a gym save is stored under the old version
+    key = _key()
+    active = Gym.objects.filter(is_active=True)
+    version = current_version()
+    columns = _columns(active)
+    body = _encode({'version': version, 'count': len(columns['id']), 'columns': columns})
+    snapshot = {
+        'version': version,
+        'etag': f'"{version}-{len(columns["id"])}"',
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=9),
+    }
+    if brotli is not None:
+        snapshot['br'] = brotli.compress(body)
+    if store:
+        cache.set(key, snapshot, SNAPSHOT_TTL)
+    return snapshot
+
+
+def get_snapshot():
+    key = _key()
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        return snapshot
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, 30):
+        # Another request is rebuilding; answer this one without storing a second copy
+        return cache.get(key) or build_snapshot(store=False)
+    try:
+        return build_snapshot()
+    finally:
+        cache.delete(lock_key)
+
+
+def gym_removed():
+    cache.set(REMOVED_KEY, to_version(timezone.now()), None)
+
+
+def removed_version():
+    """Version of the last hard delete; now if that was lost with the cache."""
+    removed_at = cache.get(REMOVED_KEY)
+    if removed_at is None:
+        removed_at = to_version(timezone.now())
+        cache.add(REMOVED_KEY, removed_at, None)
+        removed_at = cache.get(REMOVED_KEY, removed_at)
+    return removed_at
+
+
+def current_version():
+    latest = Gym.objects.aggregate(latest=Max('updated_at'))['latest']
+    return max(to_version(latest), removed_version())
+
+
+def delta_available(since):
+    """Whether a delta from version ``since`` is complete, i.e. no gym was deleted after it."""
+    return since >= removed_version()
+
+
+def build_delta(since):
+    """Gyms changed after version ``since``: changed rows as columns plus deactivated ids.
+
+    Only complete when ``delta_available(since)``; check that first.
+    """
+    changed = Gym.objects.filter(updated_at__gt=from_version(since))
+    return _encode({
+        'version': max(current_version(), since),
+        'since': since,
+        'count': Gym.objects.filter(is_active=True).count(),
+        'columns': _columns(changed.filter(is_active=True)),
+        'removed': list(changed.filter(is_active=False).order_by('id').values_list('id', flat=True)),
+    })
+
+
+def pick_encoding(accept_encoding, available):
+    """Best content coding the client accepts among ``available`` (brotli, then gzip)."""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    for coding in ('br', 'gzip'):
+        if coding in available and accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return 'identity'
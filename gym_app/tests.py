@@ -1,3 +1,1433 @@
-from django.test import TestCase
+import csv
+import base64
+import importlib
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, authenticate
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import mail, signing
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .analytics import owner_analytics, refresh
+from .authentication import TOKEN_SALT, SignedTokenAuthentication, issue_token, token_claims
+from .cache import bump_namespace, get_or_compute, namespace_version, namespaced_key
+from .checks import shared_cache_check, webhook_secret_check
+from .firebase_tokens import (
+    RETRY_AFTER, InvalidIdToken, KeySet, LocalKeySet, firebase_project_id, set_key_set, verify_id_token,
+)
+from .explore_cache import _entry_key, build_explore_items, geo_cell, get_explore_grid
+from .exports import iter_export, owner_booking_rows
+from .filters import filter_gyms, gym_facets, parse_gym_filters
+from .lifecycle import InvalidTransition, complete, create_booking, fail, refund, sweep
+from .locations import FLUSH_GRACE, LocationBuffer
+from .models import (
+    Booking, BookingEvent, Customer, Feature, Gym, GymOwner, GymPlan, GymSchedule, Notification, PaymentEvent,
+    PlanFeature, PlanStats, PriceRule, Slot, SlotReservation, week_minutes,
+)
+from .nearby import KM_PER_DEGREE, get_nearby, invalidate_all, nearest_gym_ids, refresh_nearby
+from .notifications import MAX_ATTEMPTS, NotificationChannel, queue_expiry_reminders, send_batch
+from .payments import FakeGateway, PaymentGateway, InvalidSignature, charge_renewals, process_events, receive_webhook
+from .pricing import RuleSet
+from .roles import LEGACY_BACKEND, PROFILE_BACKEND, ProfileModelBackend, user_role
+from .routers import PIN_COOKIE, REPLICA_ALIAS, ReplicaPinMiddleware, _routing, use_replica
+from .search import InvertedIndex, search_gym_ids
+from .slots import SlotFull, SlotUnavailable, cancel_reservation, reserve_slot, slot_times
+from .snapshot import get_snapshot
+
+# 2026-10-19 is a Monday
+FRIDAY, SATURDAY, SUNDAY, MONDAY, WEDNESDAY = 4, 5, 6, 0, 2
+
+
+def at(day, hh_mm):
+    return datetime.combine(date(2026, 10, 19 + (day - MONDAY) % 7), time.fromisoformat(hh_mm))
+
+
+class WeekMinutesTests(SimpleTestCase):
+
+    def test_same_day_interval(self):
+        self.assertEqual(week_minutes(MONDAY, time(6), time(22)), (360, 1320))
+
+    def test_overnight_interval_runs_into_next_day(self):
+        start, end = week_minutes(FRIDAY, time(22), time(2))
+        self.assertEqual(start, 4 * 1440 + 22 * 60)
+        self.assertEqual(end - start, 4 * 60)
+
+    def test_sunday_overnight_runs_past_end_of_week(self):
+        start, end = week_minutes(SUNDAY, time(20), time(4))
+        self.assertEqual(start, 6 * 1440 + 20 * 60)
+        self.assertEqual(end, 7 * 1440 + 4 * 60)
+
+    def test_equal_times_mean_open_all_day(self):
+        start, end = week_minutes(WEDNESDAY, time(0), time(0))
+        self.assertEqual(end - start, 1440)
+
+
+class OpenAtTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+
+        def gym(name, opening, closing):
+            return Gym.objects.create(
+                owner=owner, name=name, address='-', city='Hyderabad', latitude=17.4, longitude=78.4,
+                phone_number='0', opening_time=opening, closing_time=closing,
+            )
+
+        cls.daily = gym('Daily', time(6), time(22))
+        cls.overnight = gym('Overnight', time(22), time(6))
+        cls.scheduled = gym('Scheduled', time(6), time(22))  # daily hours ignored once it has a schedule
+        GymSchedule.objects.create(gym=cls.scheduled, weekday=FRIDAY, opens=time(22), closes=time(2))
+        GymSchedule.objects.create(gym=cls.scheduled, weekday=SUNDAY, opens=time(20), closes=time(4))
+
+    def open_at(self, moment):
+        filters = parse_gym_filters({'open_at': moment.isoformat()})
+        return set(filter_gyms(Gym.objects.all(), filters).values_list('name', flat=True))
+
+    def test_before_midnight(self):
+        self.assertEqual(self.open_at(at(FRIDAY, '23:30')), {'Overnight', 'Scheduled'})
+
+    def test_after_midnight_belongs_to_previous_days_interval(self):
+        self.assertEqual(self.open_at(at(SATURDAY, '01:30')), {'Overnight', 'Scheduled'})
+
+    def test_closing_time_is_exclusive(self):
+        self.assertEqual(self.open_at(at(SATURDAY, '02:00')), {'Overnight'})
+        self.assertEqual(self.open_at(at(SATURDAY, '06:00')), {'Daily'})
+
+    def test_unscheduled_day_is_closed(self):
+        self.assertEqual(self.open_at(at(SATURDAY, '23:30')), {'Overnight'})
+        self.assertEqual(self.open_at(at(WEDNESDAY, '12:00')), {'Daily'})
+
+    def test_sunday_night_wraps_into_monday(self):
+        self.assertEqual(self.open_at(at(SUNDAY, '23:59')), {'Overnight', 'Scheduled'})
+        self.assertEqual(self.open_at(at(MONDAY, '03:00')), {'Overnight', 'Scheduled'})
+        self.assertEqual(self.open_at(at(MONDAY, '04:00')), {'Overnight'})
+
+    def test_open_now_uses_the_clock(self):
+        now = timezone.make_aware(at(MONDAY, '03:00'))
+        names = set(filter_gyms(Gym.objects.all(), {'open_now': True}, now=now).values_list('name', flat=True))
+        self.assertEqual(names, {'Overnight', 'Scheduled'})
+
+    def test_invalid_open_at_is_dropped(self):
+        self.assertNotIn('open_at', parse_gym_filters({'open_at': 'tonight'}))
+
+    def test_list_api_filters_by_open_at(self):
+        response = self.client.get('/api/gyms/', {'open_at': '2026-10-24T01:30'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({gym['name'] for gym in response.json()}, {'Overnight', 'Scheduled'})
+
+    def test_slots_follow_the_schedule_across_midnight(self):
+        self.assertEqual(slot_times(self.scheduled, at(FRIDAY, '00:00').date()), [time(22), time(23)])
+        self.assertEqual(slot_times(self.scheduled, at(SATURDAY, '00:00').date()), [time(0), time(1)])
+        self.assertEqual(slot_times(self.scheduled, at(MONDAY, '00:00').date()), [time(h) for h in range(4)])
+        self.assertEqual(slot_times(self.overnight, at(WEDNESDAY, '00:00').date())[:2], [time(0), time(1)])
+
+    def test_schedule_changes_clear_the_gym_caches(self):
+        cache.clear()
+        cell = geo_cell(17.4, 78.4)
+        version = get_snapshot()['version']
+        get_explore_grid(cell)
+        with mock.patch('gym_app.explore_cache.build_explore_items', wraps=build_explore_items) as build:
+            get_explore_grid(cell)
+            row = GymSchedule.objects.create(gym=self.daily, weekday=MONDAY, opens=time(5), closes=time(23))
+            get_explore_grid(cell)
+            self.assertEqual(build.call_count, 1)
+            changed = get_snapshot()['version']
+            self.assertGreater(changed, version)
+            row.delete()
+            get_explore_grid(cell)
+            self.assertEqual(build.call_count, 2)
+            self.assertGreater(get_snapshot()['version'], changed)
+
+    def test_owner_replaces_the_schedule_over_the_api(self):
+        owner = Client(HTTP_AUTHORIZATION=f'Bearer {issue_token(self.scheduled.owner.user)}')
+        url = f'/api/gyms/{self.scheduled.pk}/schedule/'
+        response = owner.put(url, {'intervals': [{'weekday': MONDAY, 'opens': '06:00', 'closes': '10:00'}]},
+                             content_type='application/json')
+        self.assertEqual(response.json()['intervals'], [{'weekday': MONDAY, 'opens': '06:00', 'closes': '10:00'}])
+        for body in ([], [{'weekday': MONDAY}], 'text', {'intervals': 'text'}):
+            response = owner.put(url, body, content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertEqual(self.scheduled.schedule.count(), 1)
+
+
+class RuleSetTests(SimpleTestCase):
+
+    rules = RuleSet([
+        PriceRule(kind='bundle', label='Bundle', percent_off=10, min_months=3),
+        PriceRule(kind='off_peak', label='Night', percent_off=20, weekdays='4', starts=time(22), ends=time(6)),
+        PriceRule(kind='promo', label='Welcome', percent_off=50, code='Welcome', plan_id=2),
+    ])
+
+    def quote(self, plan_id, duration, moment, code=''):
+        return self.rules.quote(plan_id, duration, Decimal('1000'), moment, code)
+
+    def test_no_discount_outside_rules(self):
+        self.assertEqual(self.quote(1, 'month', at(WEDNESDAY, '12:00'))['price'], Decimal('1000.00'))
+
+    def test_bundle_and_off_peak_stack(self):
+        self.assertEqual(self.quote(1, 'quarter', at(FRIDAY, '23:00'))['price'], Decimal('720.00'))
+
+    def test_off_peak_window_runs_past_midnight_from_its_weekday(self):
+        self.assertEqual(self.quote(1, 'day', at(SATURDAY, '05:59'))['price'], Decimal('800.00'))
+        self.assertEqual(self.quote(1, 'day', at(SATURDAY, '06:00'))['price'], Decimal('1000.00'))
+        self.assertEqual(self.quote(1, 'day', at(SUNDAY, '01:00'))['price'], Decimal('1000.00'))
+
+    def test_promo_code_is_case_insensitive_and_plan_specific(self):
+        self.assertEqual(self.quote(2, 'day', at(WEDNESDAY, '12:00'), ' WELCOME ')['price'], Decimal('500.00'))
+        self.assertEqual(self.quote(1, 'day', at(WEDNESDAY, '12:00'), 'welcome')['discounts'], [])
+
+
+class SweepTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        cls.gym = Gym.objects.create(owner=owner, name='Gym', address='-', city='-', latitude=0, longitude=0,
+                                     phone_number='0')
+        cls.plan = GymPlan.objects.create(gym=cls.gym, name='Monthly', duration='month', price=1000, features='')
+        cls.customer = Customer.objects.create(user=User.objects.create_user('customer'))
+        cls.today = date(2026, 10, 19)
+
+    def booking(self, end_date, **fields):
+        return Booking.objects.create(customer=self.customer, gym=self.gym, plan=self.plan, amount=1000,
+                                      payment_status='completed', start_date=end_date - timedelta(days=30),
+                                      end_date=end_date, **fields)
+
+    def test_expires_lapsed_passes_only(self):
+        lapsed = self.booking(self.today - timedelta(days=1))
+        current = self.booking(self.today)
+        result = sweep(self.today, batch_size=1)
+        self.assertEqual((result['expired'], result['renewed'], result['finished']), (1, 0, True))
+        lapsed.refresh_from_db()
+        current.refresh_from_db()
+        self.assertEqual((lapsed.payment_status, current.payment_status), ('expired', 'completed'))
+        self.assertEqual(list(lapsed.events.values_list('from_status', 'to_status')), [('completed', 'expired')])
+
+    def test_auto_renew_continues_the_pass_once(self):
+        lapsed = self.booking(self.today - timedelta(days=1), auto_renew=True)
+        self.assertEqual(sweep(self.today)['renewed'], 1)
+        renewal = lapsed.renewal
+        self.assertEqual((renewal.start_date, renewal.payment_status, renewal.payment_id), (self.today, 'pending', ''))
+        self.assertEqual(sweep(self.today)['renewed'], 0)
+
+    @override_settings(PAYMENT_INLINE_DRAIN=False)
+    def test_renewals_are_charged_through_the_gateway(self):
+        lapsed = self.booking(self.today - timedelta(days=1), auto_renew=True)
+        sweep(self.today)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(charge_renewals(), 1)
+        self.assertEqual(charge_renewals(), 0)
+        renewal = Booking.objects.get(renewal_of=lapsed)
+        self.assertTrue(renewal.payment_id)
+        self.assertEqual(renewal.payment_status, 'pending')
+        process_events()
+        renewal.refresh_from_db()
+        self.assertEqual(renewal.payment_status, 'completed')
+
+    def test_long_lapsed_renewal_starts_today(self):
+        lapsed = self.booking(self.today - timedelta(days=40), auto_renew=True)
+        sweep(self.today)
+        self.assertEqual(lapsed.renewal.start_date, self.today)
+
+    def test_invalid_transition(self):
+        booking = self.booking(self.today)
+        refund(booking)
+        with self.assertRaises(InvalidTransition):
+            refund(booking)
+
+
+@override_settings(PAYMENT_INLINE_DRAIN=False)
+class PaymentWebhookTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        gym = Gym.objects.create(owner=owner, name='Gym', address='-', city='-', latitude=0, longitude=0,
+                                 phone_number='0')
+        plan = GymPlan.objects.create(gym=gym, name='Monthly', duration='month', price=1000, features='')
+        customer = Customer.objects.create(user=User.objects.create_user('customer'))
+        cls.booking = create_booking(customer, gym, plan, 1000)
+        Booking.objects.filter(pk=cls.booking.pk).update(payment_id='pay_1')
+        cls.gateway = FakeGateway(secret='test-secret')
+
+    def deliver(self, event_id, kind='payment.succeeded', payment_id='pay_1', amount='1000.00'):
+        body = json.dumps({'id': event_id, 'type': kind, 'payment_id': payment_id, 'amount': amount})
+        return receive_webhook(self.gateway, body, self.gateway.signed_headers(body))
+
+    def status(self):
+        return Booking.objects.get(pk=self.booking.pk).payment_status
+
+    def test_incomplete_gateway_fails_when_created(self):
+        class NoWebhooks(PaymentGateway):
+            def create_payment(self, booking, **details):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoWebhooks()
+
+    def test_deploy_check_rejects_the_development_secret(self):
+        with override_settings(DEBUG=False, PAYMENT_WEBHOOK_SECRET='insecure-dev-webhook-secret'):
+            self.assertEqual([e.id for e in webhook_secret_check(None)], ['gym_app.E002'])
+        with override_settings(DEBUG=True, PAYMENT_WEBHOOK_SECRET='insecure-dev-webhook-secret'):
+            self.assertEqual(webhook_secret_check(None), [])
+        with override_settings(DEBUG=False, PAYMENT_WEBHOOK_SECRET='whsec_live'):
+            self.assertEqual(webhook_secret_check(None), [])
+
+    def test_rejects_bad_signatures(self):
+        body = json.dumps({'id': 'evt_1', 'type': 'payment.succeeded', 'payment_id': 'pay_1'})
+        headers = FakeGateway(secret='other-secret').signed_headers(body)
+        with self.assertRaises(InvalidSignature):
+            receive_webhook(self.gateway, body, headers)
+        with self.assertRaises(InvalidSignature):
+            receive_webhook(self.gateway, body, {})
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_webhook_only_queues_until_processed(self):
+        self.assertTrue(self.deliver('evt_1'))
+        self.assertEqual(self.status(), 'pending')
+        self.assertEqual(process_events(), 1)
+        self.assertEqual(self.status(), 'completed')
+
+    @override_settings(PAYMENT_INLINE_DRAIN=True)
+    def test_webhook_never_settles_inline(self):
+        self.deliver('evt_1')
+        self.assertEqual(self.status(), 'pending')
+
+    def test_repeat_deliveries_are_stored_once(self):
+        self.assertTrue(self.deliver('evt_1'))
+        self.assertFalse(self.deliver('evt_1'))
+        self.assertEqual(process_events(), 1)
+        self.assertEqual(process_events(), 0)
+
+    def test_first_settling_event_wins(self):
+        self.deliver('evt_1', 'payment.failed')
+        self.deliver('evt_2', 'payment.succeeded')
+        process_events()
+        self.assertEqual(self.status(), 'failed')
+        self.assertEqual(dict(PaymentEvent.objects.values_list('event_id', 'outcome')),
+                         {'evt_1': 'applied', 'evt_2': 'ignored'})
+
+    def test_success_for_the_wrong_amount_fails_the_booking(self):
+        self.deliver('evt_1', amount='1.00')
+        process_events()
+        self.assertEqual(self.status(), 'failed')
+        self.assertEqual(PaymentEvent.objects.get().outcome, 'rejected')
+        self.assertEqual(self.booking.events.last().reason, 'amount_mismatch')
+
+    def test_unknown_payment_waits_for_its_booking(self):
+        self.deliver('evt_1', payment_id='pay_unknown')
+        self.assertEqual(process_events(), 1)
+        event = PaymentEvent.objects.get()
+        self.assertFalse(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(process_events(), 0)  # not due again yet
+
+    def test_unknown_payments_cannot_block_the_queue(self):
+        for i in range(3):
+            self.deliver(f'evt_unknown_{i}', payment_id=f'pay_unknown_{i}')
+        self.deliver('evt_1')
+        while process_events(batch_size=2):
+            pass
+        self.assertEqual(self.status(), 'completed')
+
+
+class NotificationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        cls.gym = Gym.objects.create(owner=owner, name='Gym', address='-', city='-', latitude=0, longitude=0,
+                                     phone_number='0')
+        cls.plan = GymPlan.objects.create(gym=cls.gym, name='Monthly', duration='month', price=1000, features='')
+        cls.customer = Customer.objects.create(user=User.objects.create_user('customer', 'customer@example.com'))
+        cls.today = date(2026, 10, 19)
+
+    def booking(self, end_date, customer=None, **fields):
+        return Booking.objects.create(customer=customer or self.customer, gym=self.gym, plan=self.plan,
+                                      amount=1000, payment_status='completed',
+                                      start_date=end_date - timedelta(days=30), end_date=end_date, **fields)
+
+    def test_completing_a_booking_queues_one_confirmation(self):
+        booking = create_booking(self.customer, self.gym, self.plan, 1000)
+        self.assertFalse(Notification.objects.exists())
+        complete(booking, 'pay_1')
+        self.assertEqual(send_batch(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(booking.access_code, mail.outbox[0].body)
+        self.assertEqual(mail.outbox[0].to, ['customer@example.com'])
+        self.assertEqual(send_batch(), (0, 0))
+
+    def test_incomplete_channel_fails_when_created(self):
+        class Silent(NotificationChannel):
+            pass
+
+        with self.assertRaises(TypeError):
+            Silent()
+
+    def test_plain_text_is_not_html_escaped(self):
+        Gym.objects.filter(pk=self.gym.pk).update(name="Gold's Gym & Spa")
+        complete(create_booking(self.customer, Gym.objects.get(pk=self.gym.pk), self.plan, 1000), 'pay_1')
+        send_batch()
+        self.assertEqual(mail.outbox[0].subject, "Booking confirmed: Monthly at Gold's Gym & Spa")
+        self.assertIn("Gold's Gym & Spa", mail.outbox[0].body)
+
+    def test_expiry_digest_covers_only_passes_ending_that_day(self):
+        ending = self.today + timedelta(days=3)
+        self.booking(ending)
+        self.booking(ending)
+        self.booking(ending, auto_renew=True)
+        self.booking(ending + timedelta(days=1))
+        no_email = Customer.objects.create(user=User.objects.create_user('silent'))
+        self.booking(ending, customer=no_email)
+
+        self.assertEqual(queue_expiry_reminders(3, self.today), 1)
+        self.assertEqual(queue_expiry_reminders(3, self.today), 0)
+        self.assertEqual(len(Notification.objects.get().context['passes']), 2)
+        send_batch()
+        self.assertIn('2 of your passes', mail.outbox[0].subject)
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST='127.0.0.1',
+                       EMAIL_PORT=1, EMAIL_TIMEOUT=1)
+    def test_failed_sends_back_off_then_give_up(self):
+        self.booking(self.today + timedelta(days=3))
+        queue_expiry_reminders(3, self.today)
+        self.assertEqual(send_batch(), (0, 1))
+        notification = Notification.objects.get()
+        self.assertEqual((notification.status, notification.attempts), ('pending', 1))
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        self.assertTrue(notification.last_error)
+
+        Notification.objects.update(attempts=MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+        send_batch()
+        self.assertEqual(Notification.objects.get().status, 'failed')
+
+
+class AnalyticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        cls.gym = Gym.objects.create(owner=cls.owner, name='Gym', address='-', city='-', latitude=0, longitude=0,
+                                     phone_number='0')
+        cls.plan = GymPlan.objects.create(gym=cls.gym, name='Monthly', duration='month', price=1000, features='')
+        cls.customers = [Customer.objects.create(user=User.objects.create_user(f'customer{i}')) for i in range(3)]
+
+    def refresh_later(self, **options):
+        # Events younger than EVENT_LAG are left for the next run
+        BookingEvent.objects.update(created_at=F('created_at') - timedelta(minutes=5))
+        return refresh(**options)
+
+    def plan_stats(self):
+        return PlanStats.objects.values('checkouts', 'paid', 'renewals', 'lapsed', 'refunds', 'revenue').get()
+
+    def test_incremental_refresh_matches_rebuild(self):
+        self.assertTrue(refresh()['rebuilt'])
+        first, second, third = self.customers
+        complete(create_booking(first, self.gym, self.plan, 1000), 'pay_1')
+        fail(create_booking(second, self.gym, self.plan, 1000))
+        refund(complete(create_booking(third, self.gym, self.plan, 800), 'pay_3'))
+        renewing = complete(create_booking(second, self.gym, self.plan, 900, auto_renew=True), 'pay_4')
+        Booking.objects.filter(pk=renewing.pk).update(end_date=timezone.localdate() - timedelta(days=1))
+        sweep()
+        with self.captureOnCommitCallbacks(execute=True):
+            charge_renewals()
+        process_events()
+
+        result = self.refresh_later()
+        self.assertFalse(result['rebuilt'])
+        self.assertTrue(result['finished'])
+        incremental = self.plan_stats()
+        self.assertEqual(incremental, {'checkouts': 4, 'paid': 3, 'renewals': 1, 'lapsed': 1, 'refunds': 1,
+                                       'revenue': Decimal('2900')})
+        self.assertEqual(self.refresh_later()['events'], 0)
+
+        self.assertTrue(refresh(force_rebuild=True)['rebuilt'])
+        self.assertEqual(self.plan_stats(), incremental)
+        self.assertEqual(sum(sum(day) for day in owner_analytics(self.owner)['booking_hours']), 4)
+
+    def test_cohorts_count_each_member_month_once(self):
+        first, second, third = self.customers
+        for customer, start in ((first, date(2026, 8, 3)), (first, date(2026, 8, 20)), (first, date(2026, 10, 1)),
+                                (second, date(2026, 8, 9)), (third, date(2026, 9, 12))):
+            Booking.objects.create(customer=customer, gym=self.gym, plan=self.plan, amount=1000,
+                                   payment_status='expired', start_date=start, end_date=start + timedelta(days=30))
+        refresh()
+        cohorts = owner_analytics(self.owner, months=3, today=date(2026, 10, 19))['cohorts']
+        self.assertEqual(cohorts, [
+            {'cohort': '2026-08', 'customers': 2, 'retention': [1.0, 0.0, 0.5]},
+            {'cohort': '2026-09', 'customers': 1, 'retention': [1.0, 0.0]},
+        ])
+
+    def test_endpoint_is_for_owners(self):
+        customer = Client(HTTP_AUTHORIZATION=f'Bearer {issue_token(self.customers[0].user)}')
+        self.assertEqual(customer.get('/api/owner/analytics/').status_code, 403)
+        owner = Client(HTTP_AUTHORIZATION=f'Bearer {issue_token(self.owner.user)}')
+        response = owner.get('/api/owner/analytics/', {'gym': self.gym.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([plan['plan_id'] for plan in response.json()['plans']], [self.plan.id])
+
+
+class RotatingKeySet(KeySet):
+    """A KeySet whose "fetch" returns the public keys of the given LocalKeySets."""
+
+    def __init__(self, *local_key_sets):
+        super().__init__(url=None)
+        self.published = list(local_key_sets)
+        self.fetches = 0
+
+    def _fetch(self):
+        self.fetches += 1
+        return {key_set.kid: key_set.get(key_set.kid) for key_set in self.published}, 3600
+
+
+@override_settings(FIREBASE_PROJECT_ID='musclemeter-test')
+class FirebaseTokenTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.keys = LocalKeySet()
+        cls.rotated = LocalKeySet(kid='rotated-key')
+
+    def setUp(self):
+        previous = set_key_set(self.keys)
+        self.addCleanup(set_key_set, previous)
+
+    def assertRejected(self, token, message):
+        with self.assertRaisesMessage(InvalidIdToken, message):
+            verify_id_token(token)
+
+    def test_accepts_a_valid_token(self):
+        claims = verify_id_token(self.keys.sign({'email': 'a@example.com', 'email_verified': True}))
+        self.assertEqual((claims['sub'], claims['email_verified']), ('a@example.com', True))
+
+    def test_rejects_wrong_audience_and_issuer(self):
+        self.assertRejected(self.keys.sign({'aud': 'another-project'}), 'Audience')
+        self.assertRejected(self.keys.sign({'iss': 'https://securetoken.google.com/another-project'}), 'issuer')
+
+    def test_rejects_expired_token(self):
+        past = int(timezone.now().timestamp()) - 7200  # well beyond the clock skew leeway
+        self.assertRejected(self.keys.sign({'iat': past, 'auth_time': past, 'exp': past + 3600}), 'expired')
+
+    def test_rejects_unknown_key_and_tampering(self):
+        self.assertRejected(self.rotated.sign({}), 'Unknown signing key')
+        header, payload, signature = self.keys.sign({'email': 'a@example.com'}).split('.')
+        forged = self.keys.sign({'email': 'b@example.com'}).split('.')[1]
+        self.assertRejected('.'.join([header, forged, signature]), 'Signature verification failed')
+
+    def test_picks_up_rotated_keys(self):
+        key_set = RotatingKeySet(self.keys)
+        set_key_set(key_set)
+        verify_id_token(self.keys.sign({}))
+        self.assertEqual(key_set.fetches, 1)
+
+        # A new kid shortly after a fetch doesn't trigger another one...
+        key_set.published.append(self.rotated)
+        self.assertRejected(self.rotated.sign({}), 'Unknown signing key')
+        self.assertEqual(key_set.fetches, 1)
+        # ...but once RETRY_AFTER has passed it does, and the rotated key verifies
+        key_set._checked_at -= RETRY_AFTER
+        verify_id_token(self.rotated.sign({}))
+        self.assertEqual(key_set.fetches, 2)
+        verify_id_token(self.keys.sign({}))
+
+    @override_settings(FIREBASE_PROJECT_ID='')
+    def test_project_falls_back_to_google_credentials(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({'type': 'service_account', 'project_id': 'from-file'}, f)
+        self.addCleanup(os.remove, f.name)
+        with mock.patch.dict(os.environ, {'GOOGLE_APPLICATION_CREDENTIALS': f.name}):
+            self.assertEqual(firebase_project_id(include_default_credentials=False), 'from-file')
+        with mock.patch.dict(os.environ, {'GOOGLE_CLOUD_PROJECT': 'from-env'}):
+            os.environ.pop('GOOGLE_APPLICATION_CREDENTIALS', None)
+            self.assertEqual(firebase_project_id(include_default_credentials=False), 'from-env')
+        with override_settings(FIREBASE_PROJECT_ID='explicit'):
+            self.assertEqual(firebase_project_id(), 'explicit')
+
+
+@override_settings(FIREBASE_PROJECT_ID='musclemeter-test')
+class GoogleLoginTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.keys = LocalKeySet()
+
+    def setUp(self):
+        previous = set_key_set(self.keys)
+        self.addCleanup(set_key_set, previous)
+
+    def login(self, **claims):
+        return self.client.post('/api/auth/google/', {'token': self.keys.sign(claims)},
+                                content_type='application/json')
+
+    def test_requires_a_verified_email(self):
+        self.assertEqual(self.login(email='a@example.com').status_code, 400)
+        self.assertEqual(self.login(email='a@example.com', email_verified=False).status_code, 400)
+        self.assertFalse(User.objects.exists())
+        response = self.login(email='a@example.com', email_verified=True, name='Asha Rao')
+        self.assertEqual((response.status_code, response.json()['role']), (200, 'customer'))
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Routing against a second SQLite file standing in for the replica, as ``sync_replica`` sets up locally."""
+
+    # The replica alias only exists while this class runs, so the runner sets up just the primary
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        replica = {**connections.settings['default'], 'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3')}
+        connections.settings[REPLICA_ALIAS] = settings.DATABASES[REPLICA_ALIAS] = replica
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA_ALIAS].close()
+        del connections[REPLICA_ALIAS]
+        connections.settings.pop(REPLICA_ALIAS, None)
+        settings.DATABASES.pop(REPLICA_ALIAS, None)
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        self.gym = Gym.objects.create(owner=owner, name='Synced', address='-', city='-', latitude=0, longitude=0,
+                                      phone_number='0')
+        replica = connections[REPLICA_ALIAS]
+        replica.ensure_connection()
+        connections['default'].connection.backup(replica.connection)
+        # From here on the primary is ahead of the replica
+        Gym.objects.filter(pk=self.gym.pk).update(name='Primary')
+        # Start unpinned, as a request does
+        self.addCleanup(_routing.reset, _routing.set(None))
+
+    def name(self):
+        return Gym.objects.get(pk=self.gym.pk).name
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.name(), 'Primary')
+        with use_replica():
+            self.assertEqual(self.name(), 'Synced')
+            self.assertEqual(User.objects.get(username='owner').pk, self.gym.owner.user_id)  # auth stays on default
+
+    def test_writes_go_to_the_primary_and_pin_reads_to_it(self):
+        with use_replica():
+            self.assertEqual(self.name(), 'Synced')
+            Gym.objects.filter(pk=self.gym.pk).update(name='Written')
+            self.assertEqual(self.name(), 'Written')
+        self.assertEqual(Gym.objects.using(REPLICA_ALIAS).get(pk=self.gym.pk).name, 'Synced')
+
+    def test_client_stays_on_the_primary_after_a_write(self):
+        def view(request):
+            with use_replica():
+                if request.method == 'POST':
+                    Gym.objects.filter(pk=self.gym.pk).update(name='Posted')
+                return HttpResponse(self.name())
+
+        middleware, factory = ReplicaPinMiddleware(view), RequestFactory()
+        self.assertEqual(middleware(factory.get('/')).content, b'Synced')
+        response = middleware(factory.post('/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(middleware(factory.get('/')).content, b'Synced')
+        pinned = factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        self.assertEqual(middleware(pinned).content, b'Posted')
+
+
+class LocationBufferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asha = Customer.objects.create(user=User.objects.create_user('asha'))
+        cls.ravi = Customer.objects.create(user=User.objects.create_user('ravi'))
+
+    def setUp(self):
+        cache.clear()
+        self.now = 3000.0  # the start of an interval
+        self.buffer = self.worker()
+
+    def worker(self):
+        return LocationBuffer(min_distance_km=0.1, flush_interval=30, clock=lambda: self.now)
+
+    def position(self, customer):
+        customer.refresh_from_db()
+        return customer.last_latitude, customer.last_longitude, customer.last_city
+
+    def test_writes_the_newest_ping_once_its_interval_ends(self):
+        self.assertTrue(self.buffer.record(self.asha, 17.4, 78.4, 'Hyderabad'))
+        self.now += 10
+        self.assertTrue(self.buffer.record(self.asha, 17.5, 78.5))
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.position(self.asha), (None, None, ''))
+        self.assertEqual(self.buffer.last_location(self.asha), (Decimal('17.5'), Decimal('78.5'), 'Hyderabad'))
+
+        self.now += 20 + FLUSH_GRACE
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.position(self.asha), (Decimal('17.5'), Decimal('78.5'), 'Hyderabad'))
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_drops_small_moves(self):
+        self.buffer.record(self.asha, 17.4, 78.4)
+        self.assertFalse(self.buffer.record(self.asha, 17.4001, 78.4001))
+        self.assertTrue(self.buffer.record(self.asha, 17.41, 78.4))
+
+    def test_pings_outlive_the_worker_that_took_them(self):
+        self.worker().record(self.asha, 17.4, 78.4)
+        self.now += 60
+        self.assertEqual(self.worker().flush(), 1)
+        self.assertEqual(self.position(self.asha)[:2], (Decimal('17.4'), Decimal('78.4')))
+
+    def test_a_later_ping_flushes_finished_intervals(self):
+        self.buffer.record(self.asha, 17.4, 78.4)
+        self.now += 30 + FLUSH_GRACE
+        self.buffer.record(self.ravi, 12.9, 77.6)
+        self.assertEqual(self.position(self.asha)[:2], (Decimal('17.4'), Decimal('78.4')))
+        self.assertEqual(self.position(self.ravi)[:2], (None, None))
+
+    def test_interleaved_pings_keep_every_customer(self):
+        meera = Customer.objects.create(user=User.objects.create_user('meera'))
+        incr, drawn = cache.incr, []
+
+        def racing_incr(key, delta=1, version=None):
+            # The first two pings read the counter before either writes it back
+            if len(drawn) < 2:
+                drawn.append(key)
+                cache.set(key, 1)
+                return 1
+            return incr(key, delta, version=version)
+
+        with mock.patch.object(cache, 'incr', racing_incr):
+            for step, customer in enumerate([self.asha, self.ravi, meera, self.asha, self.ravi]):
+                self.worker().record(customer, 17 + step, 78)
+                self.now += 1
+        self.now += 30 + FLUSH_GRACE
+        self.assertEqual(self.buffer.flush(), 3)
+        self.assertEqual(self.position(self.asha)[0], Decimal('20'))
+        self.assertEqual(self.position(self.ravi)[0], Decimal('21'))
+        self.assertEqual(self.position(meera)[0], Decimal('19'))
+
+
+class CacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_serves_its_local_copy_until_it_is_dropped(self):
+        cache.set('greeting', 'hello')
+        caches['shared'].set('greeting', 'changed by another worker')
+        self.assertEqual(cache.get('greeting'), 'hello')
+        cache.clear_local()
+        self.assertEqual(cache.get('greeting'), 'changed by another worker')
+        cache.delete('greeting')
+        self.assertIsNone(cache.get('greeting'))
+        self.assertIsNone(caches['shared'].get('greeting'))
+
+    def test_locks_and_counters_use_the_shared_tier(self):
+        cache.set('counter', 1)
+        self.assertFalse(cache.add('counter', 5))
+        cache.incr('counter')
+        caches['shared'].incr('counter')
+        self.assertEqual(cache.get('counter'), 3)
+
+    def test_concurrent_misses_compute_once(self):
+        calls, started, release = [], threading.Event(), threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute('answer', compute, 60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((len(calls), results), (1, ['value'] * 5))
+        self.assertEqual(cache.get('answer'), 'value')
+
+    def test_computes_itself_when_another_process_takes_too_long(self):
+        cache.add('answer:lock', 1, 30)
+        self.assertEqual(get_or_compute('answer', lambda: 'mine', wait=0.1), 'mine')
+
+    def test_bumping_a_namespace_orphans_its_keys(self):
+        gyms, plans = namespaced_key('gyms', 'list'), namespaced_key('plans', 'list')
+        bump_namespace('gyms')
+        self.assertNotEqual(namespaced_key('gyms', 'list'), gyms)
+        self.assertEqual(namespaced_key('plans', 'list'), plans)
+
+    def test_an_evicted_version_does_not_go_back(self):
+        version = namespace_version('gyms')
+        bump_namespace('gyms')
+        cache.delete('ns:gyms')  # as a full file cache culls it
+        self.assertGreater(namespace_version('gyms'), version + 1)
+
+    def test_plan_and_gym_changes_replace_the_snapshot(self):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        gym = Gym.objects.create(owner=owner, name='Gym', address='-', city='-', latitude=0, longitude=0,
+                                 phone_number='0')
+        plan = GymPlan.objects.create(gym=gym, name='Monthly', duration='month', price=1000, features='')
+
+        def columns():
+            return json.loads(get_snapshot()['identity'])['columns']
+
+        self.assertEqual(columns()['min_price'], [1000.0])
+        plan.price = 800
+        plan.save()
+        self.assertEqual(columns()['min_price'], [800.0])
+        gym.name = 'Renamed'
+        gym.save()
+        self.assertEqual(columns()['name'], ['Renamed'])
+
+    def test_deploy_check_requires_an_atomic_shared_cache(self):
+        self.assertEqual([e.id for e in shared_cache_check(None)], ['gym_app.E001'])
+        redis = {**settings.CACHES, 'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(shared_cache_check(None), [])
+
+
+class ApiTokenTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret-pass')
+        GymOwner.objects.create(user=cls.owner, phone_number='0')
+        cls.customer = User.objects.create_user('customer')
+        Customer.objects.create(user=cls.customer)
+
+    def bookings(self, token):
+        return Client(HTTP_AUTHORIZATION=f'Bearer {token}').get('/api/owner/bookings/')
+
+    def test_login_token_authenticates_without_queries(self):
+        response = self.client.post('/api/auth/token/', {'username': 'owner', 'password': 'secret-pass'},
+                                    content_type='application/json')
+        token = response.json()['token']
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.assertNumQueries(0):
+            user, claims = SignedTokenAuthentication().authenticate(request)
+            self.assertTrue(hasattr(user, 'gym_owner_profile'))
+            self.assertFalse(hasattr(user, 'customer_profile'))
+        self.assertEqual((user.pk, claims['owner']), (self.owner.pk, self.owner.gym_owner_profile.pk))
+        self.assertEqual(self.bookings(token).status_code, 200)
+
+    def test_rejects_tampered_tokens(self):
+        token = issue_token(self.customer)
+        self.assertEqual(self.bookings(token).status_code, 403)  # a customer, not an owner
+
+        forged = signing.dumps({**token_claims(self.customer), 'owner': 1}, key='not-the-secret-key',
+                               salt=TOKEN_SALT, compress=True)
+        other_salt = signing.dumps(token_claims(self.owner), compress=True)
+        edited = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        for bad in (forged, other_salt, edited, 'not-a-token'):
+            response = self.bookings(bad)
+            self.assertEqual((response.status_code, response.json()['detail']), (401, 'Invalid token.'))
+
+    @override_settings(API_TOKEN_MAX_AGE=-1)
+    def test_rejects_expired_tokens(self):
+        response = self.bookings(issue_token(self.owner))
+        self.assertEqual((response.status_code, response.json()['detail']), (401, 'Token expired.'))
+
+
+class RoleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', password='secret-pass')
+        GymOwner.objects.create(user=cls.owner, phone_number='0')
+        Customer.objects.create(user=cls.owner)  # owners who also train are treated as owners
+        cls.customer = User.objects.create_user('customer', password='secret-pass')
+        Customer.objects.create(user=cls.customer)
+        cls.nobody = User.objects.create_user('nobody', password='secret-pass')
+
+    def test_backend_loads_the_profiles_with_the_user(self):
+        for username, role in (('owner', 'owner'), ('customer', 'customer'), ('nobody', '')):
+            user = authenticate(username=username, password='secret-pass')
+            with self.assertNumQueries(0):
+                self.assertEqual(user_role(user), role)
+        with self.assertNumQueries(1):
+            self.assertEqual(user_role(ProfileModelBackend().get_user(self.customer.pk)), 'customer')
+        self.assertIsNone(authenticate(username='owner', password='wrong'))
+        self.assertIsNone(authenticate(username='missing', password='secret-pass'))
+        self.assertEqual(user_role(AnonymousUser()), '')
+
+    def test_middleware_sets_the_request_role(self):
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get('/api/owner/bookings/').status_code, 200)
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get('/api/owner/bookings/').status_code, 403)
+
+    def test_sessions_from_the_stock_backend_keep_working(self):
+        self.client.force_login(self.owner, backend=LEGACY_BACKEND)
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], LEGACY_BACKEND)
+        self.assertEqual(self.client.get('/api/owner/bookings/').status_code, 200)
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], PROFILE_BACKEND)
+
+
+class SlotReservationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        cls.gym = Gym.objects.create(owner=owner, name='Gym', address='-', city='-', latitude=0, longitude=0,
+                                     phone_number='0', opening_time=time(6), closing_time=time(22), slot_capacity=2)
+        plan = GymPlan.objects.create(gym=cls.gym, name='Monthly', duration='month', price=1000, features='')
+        today = timezone.localdate()
+        cls.day, cls.start = today + timedelta(days=1), time(10)
+        cls.customers = []
+        for name in ('asha', 'ravi', 'meera'):
+            customer = Customer.objects.create(user=User.objects.create_user(name))
+            Booking.objects.create(customer=customer, gym=cls.gym, plan=plan, amount=1000,
+                                   payment_status='completed', start_date=today, end_date=today + timedelta(days=30))
+            cls.customers.append(customer)
+        cls.visitor = Customer.objects.create(user=User.objects.create_user('visitor'))
+
+    def reserve(self, customer):
+        return reserve_slot(customer, self.gym, self.day, self.start)
+
+    def reserved(self):
+        return Slot.objects.get(gym=self.gym, date=self.day, start_time=self.start).reserved
+
+    def test_fills_up_to_capacity(self):
+        asha, ravi, meera = self.customers
+        self.reserve(asha)
+        self.reserve(ravi)
+        with self.assertRaisesMessage(SlotFull, 'This slot is full'):
+            self.reserve(meera)
+        self.assertEqual(self.reserved(), 2)
+
+    def test_reserving_again_returns_the_same_place(self):
+        first = self.reserve(self.customers[0])
+        self.assertEqual(self.reserve(self.customers[0]), first)
+        self.assertEqual(self.reserved(), 1)
+
+    def test_concurrent_duplicate_returns_the_winning_reservation(self):
+        first = self.reserve(self.customers[0])
+        # The other request's reservation isn't visible yet, so this one inserts a duplicate and loses
+        with mock.patch('gym_app.slots.SlotReservation.objects.filter', return_value=SlotReservation.objects.none()):
+            self.assertEqual(self.reserve(self.customers[0]), first)
+        self.assertEqual(self.reserved(), 1)
+
+    def test_cancelling_gives_the_place_back_once(self):
+        asha, ravi, meera = self.customers
+        reservation = self.reserve(asha)
+        self.reserve(ravi)
+        self.assertTrue(cancel_reservation(reservation))
+        self.assertFalse(cancel_reservation(reservation))
+        self.reserve(meera)
+        self.assertEqual(self.reserved(), 2)
+
+    def test_rules_out_other_slots(self):
+        with self.assertRaisesMessage(SlotUnavailable, 'You need an active pass'):
+            self.reserve(self.visitor)
+        with self.assertRaisesMessage(SlotUnavailable, 'Not a slot'):
+            reserve_slot(self.customers[0], self.gym, self.day, time(10, 30))
+        with self.assertRaisesMessage(SlotUnavailable, 'already ended'):
+            reserve_slot(self.customers[0], self.gym, self.day - timedelta(days=2), self.start)
+        self.assertFalse(Slot.objects.exists())
+
+
+class BookingExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        gym = Gym.objects.create(owner=cls.owner, name='Gym', address='-', city='-', latitude=0, longitude=0,
+                                 phone_number='0')
+        plan = GymPlan.objects.create(gym=gym, name='Monthly', duration='month', price=1000, features='')
+        user = User.objects.create_user('customer', first_name='=HYPERLINK("http://evil.example")',
+                                        last_name='-2+3', email='@sum@example.com')
+        customer = Customer.objects.create(user=user, phone_number='+919876543210')
+        create_booking(customer, gym, plan, 1000)
+
+    def export(self, export_format):
+        return ''.join(iter_export(owner_booking_rows(self.owner), export_format))
+
+    def test_csv_cells_cannot_run_as_formulas(self):
+        [row] = csv.DictReader(io.StringIO(self.export('csv')))
+        self.assertEqual(row['customer_first_name'], '\'=HYPERLINK("http://evil.example")')
+        self.assertEqual(row['customer_last_name'], "'-2+3")
+        self.assertEqual(row['customer_email'], "'@sum@example.com")
+        self.assertEqual(row['customer_phone'], "'+919876543210")
+        self.assertEqual((row['customer_username'], row['amount']), ('customer', '1000.00'))
+
+    def test_ndjson_keeps_the_raw_values(self):
+        row = json.loads(self.export('ndjson'))
+        self.assertEqual(row['customer_first_name'], '=HYPERLINK("http://evil.example")')
+
+
+class GymFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+
+        def gym(name, city, rating, price, features):
+            gym = Gym.objects.create(owner=owner, name=name, address='-', city=city, latitude=17.4, longitude=78.4,
+                                     phone_number='0', rating=rating)
+            GymPlan.objects.create(gym=gym, name='Monthly', duration='month', price=price, features=features)
+            return gym
+
+        gym('Budget', 'Hyderabad', Decimal('3.5'), 400, 'Cardio')
+        gym('Premium', 'Hyderabad', Decimal('4.7'), 3000, 'Sauna, Pool')
+        gym('Spa', 'Pune', Decimal('4.2'), 1500, 'Sauna')
+
+    def names(self, **params):
+        return set(filter_gyms(Gym.objects.all(), parse_gym_filters(params)).values_list('name', flat=True))
+
+    def test_filters(self):
+        self.assertEqual(self.names(city='hyderabad'), {'Budget', 'Premium'})
+        self.assertEqual(self.names(max_price='1500'), {'Budget', 'Spa'})
+        self.assertEqual(self.names(min_rating='4'), {'Premium', 'Spa'})
+        self.assertEqual(self.names(feature='sauna'), {'Premium', 'Spa'})
+        self.assertEqual(self.names(feature='sauna,pool', city='Hyderabad'), {'Premium'})
+
+    def test_drops_values_that_are_not_finite_numbers(self):
+        for value in ('nan', 'NaN', 'sNaN', 'Infinity', '-Infinity', 'cheap'):
+            filters = parse_gym_filters({'max_price': value, 'min_rating': value})
+            self.assertNotIn('max_price', filters, value)
+            self.assertNotIn('min_rating', filters, value)
+        for params in ({'max_price': 'nan'}, {'max_price': 'Infinity'}, {'min_rating': 'sNaN'},
+                       {'min_rating': 'nan', 'facets': '1'}):
+            self.assertEqual(self.client.get('/api/gyms/', params).status_code, 200, params)
+        self.assertEqual(self.client.get('/explore/', {'max_price': 'nan'}).status_code, 200)
+
+    def test_facets_ignore_their_own_filter(self):
+        facets = gym_facets(parse_gym_filters({'city': 'Hyderabad', 'max_price': '500'}))
+        self.assertEqual(facets['city'], [{'value': 'Hyderabad', 'count': 1}])
+        self.assertEqual([(row['value'], row['count']) for row in facets['price']],
+                         [('0-500', 1), ('2000-5000', 1)])
+        self.assertEqual([(row['value'], row['count']) for row in facets['feature']], [('cardio', 1)])
+
+
+def forged_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+TAMPERED_CURSORS = [forged_cursor(values) for values in (['x', 'y'], [None, None], [1, 'abc'], [{}, []], [1])] + [
+    'not base64!', '',
+]
+
+
+class MemberListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        for i in range(3):
+            Customer.objects.create(user=User.objects.create_user(f'member{i}'))
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_pages_through_the_roster(self):
+        with mock.patch('gym_app.views.platform.MEMBER_PAGE_SIZE', 2):
+            first = self.client.get('/platform/members/', {'sort': 'name'})
+            second = self.client.get('/platform/members/', {'sort': 'name', 'cursor': first.context['next_cursor']})
+        self.assertEqual([m.user.username for m in first.context['members']], ['member0', 'member1'])
+        self.assertEqual([m.user.username for m in second.context['members']], ['member2'])
+        self.assertIsNone(second.context['next_cursor'])
+
+    def test_tampered_cursor_gives_the_first_page(self):
+        for sort in ('newest', 'oldest', 'name'):
+            for cursor in TAMPERED_CURSORS:
+                response = self.client.get('/platform/members/', {'sort': sort, 'cursor': cursor})
+                self.assertEqual(response.status_code, 200, (sort, cursor))
+                self.assertEqual(len(response.context['members']), 3)
+
+
+class OwnerBookingsApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        other = GymOwner.objects.create(user=User.objects.create_user('other'), phone_number='0')
+        customer = Customer.objects.create(user=User.objects.create_user('customer'))
+        for owner in (cls.owner, other):
+            gym = Gym.objects.create(owner=owner, name='Gym', address='-', city='-', latitude=0, longitude=0,
+                                     phone_number='0')
+            plan = GymPlan.objects.create(gym=gym, name='Monthly', duration='month', price=1000, features='')
+            for _ in range(5):
+                create_booking(customer, gym, plan, 1000)
+        cls.expected = [str(b) for b in Booking.objects.filter(gym__owner=cls.owner)
+                        .order_by('-created_at', '-id').values_list('booking_id', flat=True)]
+
+    def setUp(self):
+        self.api = Client(HTTP_AUTHORIZATION=f'Bearer {issue_token(self.owner.user)}')
+
+    def page(self, **params):
+        response = self.api.get('/api/owner/bookings/', {'page_size': 2, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_through_the_owners_bookings_newest_first(self):
+        seen, page = [], self.page()
+        while True:
+            seen += [row['booking_id'] for row in page['results']]
+            if not page['next_cursor']:
+                break
+            page = self.page(cursor=page['next_cursor'])
+        self.assertEqual(seen, self.expected)
+
+    def test_malformed_cursor_gives_the_first_page(self):
+        for cursor in TAMPERED_CURSORS:
+            results = self.page(cursor=cursor)['results']
+            self.assertEqual([row['booking_id'] for row in results], self.expected[:2], cursor)
+
+    def test_dashboard_totals_cover_only_the_owners_paid_bookings(self):
+        complete(Booking.objects.filter(gym__owner=self.owner).first(), 'pay_1')
+        response = self.api.get('/api/owner/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['total_bookings'], float(data['total_revenue'])), (5, 1000.0))
+        self.assertEqual([gym['owner']['id'] for gym in data['gyms']], [self.owner.pk])
+        customer = Client(HTTP_AUTHORIZATION=f'Bearer {issue_token(User.objects.get(username="customer"))}')
+        self.assertEqual(customer.get('/api/owner/dashboard/').status_code, 403)
+
+
+class PlanFeatureTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        cls.gym = Gym.objects.create(owner=owner, name='Gym', address='-', city='-', latitude=0, longitude=0,
+                                     phone_number='0')
+
+    def plan(self, features):
+        return GymPlan.objects.create(gym=self.gym, name='Monthly', duration='month', price=1000, features=features)
+
+    def slugs(self, plan):
+        return sorted(plan.plan_features.values_list('feature__slug', flat=True))
+
+    def test_plans_share_features_by_slug(self):
+        first, second = self.plan('Sauna, Parking'), self.plan('sauna,  Steam Room, !!!')
+        self.assertEqual(second.feature_list, ['sauna', 'Steam Room'])
+        self.assertEqual(self.slugs(second), ['sauna', 'steam-room'])
+        self.assertEqual(Feature.objects.count(), 3)
+
+        first.features = 'Parking'
+        first.save(update_fields=['features'])
+        self.assertEqual(self.slugs(first), ['parking'])
+        self.assertEqual(self.slugs(second), ['sauna', 'steam-room'])
+
+    def test_long_labels_are_cut_to_fit(self):
+        plan = self.plan('x' * 150 + ', ' + '\ufb01' * 80)  # the ligature slugifies to two letters
+        self.assertEqual([len(label) for label in plan.feature_list], [100, 80])
+        self.assertEqual(sorted(len(slug) for slug in Feature.objects.values_list('slug', flat=True)), [100, 100])
+
+    def test_backfill_links_existing_plans(self):
+        plan = self.plan('')
+        GymPlan.objects.filter(pk=plan.pk).update(features='Sauna, ' + 'y' * 150 + ', !!!, sauna')
+        migration = importlib.import_module('gym_app.migrations.0005_plan_features')
+        migration.parse_plan_features(apps, None)
+        plan.refresh_from_db()
+        self.assertEqual(plan.feature_list, ['Sauna', 'y' * 100])
+        self.assertEqual(self.slugs(plan), ['sauna', 'y' * 100])
+        self.assertEqual(PlanFeature.objects.count(), 2)
+
+
+class GymSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        cls.iron = Gym.objects.create(owner=owner, name='Iron Temple', address='-', city='Hyderabad',
+                                      latitude=0, longitude=0, phone_number='0')
+        cls.yoga = Gym.objects.create(owner=owner, name='Yoga House', address='-', city='Bengaluru',
+                                      latitude=0, longitude=0, phone_number='0')
+
+    def setUp(self):
+        # A fresh process-wide index, so postings from other tests don't leak in
+        patcher = mock.patch('gym_app.search._index', InvertedIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_prefix_queries_rank_whole_words_first(self):
+        index = InvertedIndex()
+        index.add(1, 'Iron Temple Hyderabad')
+        index.add(2, 'Ironman Fitness Hyderabad')
+        self.assertEqual(index.search('iron'), [(1, 2), (2, 1)])
+        self.assertEqual(index.search('iro hyd'), [(1, 2), (2, 2)])
+        self.assertEqual(index.search('iron fit'), [(2, 2)])
+        self.assertEqual(index.search('!!'), [])
+
+    def test_re_adding_a_gym_drops_its_old_terms(self):
+        index = InvertedIndex()
+        index.add(1, 'Iron Temple')
+        index.add(1, 'Steel Temple')
+        self.assertEqual(index.search('iron'), [])
+        self.assertEqual(index.search('steel'), [(1, 2)])
+        self.assertNotIn('iron', index.postings)
+
+    def test_follows_gym_and_plan_changes(self):
+        self.assertEqual(search_gym_ids('temple'), [self.iron.pk])
+        self.iron.name = 'Steel Works'
+        self.iron.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            GymPlan.objects.create(gym=self.yoga, name='Monthly', duration='month', price=1000, features='Sauna')
+        self.assertEqual(search_gym_ids('temple'), [])
+        self.assertEqual(search_gym_ids('steel'), [self.iron.pk])
+        self.assertEqual(search_gym_ids('sauna'), [self.yoga.pk])
+
+    def test_deleted_and_inactive_gyms_drop_out(self):
+        self.assertEqual(search_gym_ids('house'), [self.yoga.pk])
+        self.yoga.delete()
+        self.iron.is_active = False
+        self.iron.save()
+        self.assertEqual(search_gym_ids('house'), [])
+        self.assertEqual(search_gym_ids('temple'), [])
+
+    def test_search_api_keeps_the_ranking(self):
+        self.yoga.description = 'Next to the temple'
+        self.yoga.save()
+        response = self.client.get('/api/gyms/search/', {'q': 'temple'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([gym['id'] for gym in response.json()], [self.iron.pk, self.yoga.pk])
+        self.assertEqual(self.client.get('/api/gyms/search/', {'q': 'tem', 'limit': 1}).json()[0]['name'],
+                         'Iron Temple')
+        self.assertEqual(self.client.get('/api/gyms/search/', {'q': ' '}).json(), [])
+
+
+class ExploreCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        cls.gym = Gym.objects.create(owner=owner, name='Hyderabad Gym', address='-', city='-',
+                                     latitude=17.4, longitude=78.4, phone_number='0')
+
+    def setUp(self):
+        cache.clear()
+        self.near, self.far = geo_cell(17.4, 78.4), geo_cell(28.6, 77.2)
+
+    def names(self, cell):
+        return [item['name'] for item in get_explore_grid(cell)[0]]
+
+    def an_hour_later(self):
+        # Only the explore module's clock; the cache's own expiry keeps real time
+        return mock.patch('gym_app.explore_cache.time', **{'time.return_value': timezone.now().timestamp() + 3600})
+
+    def test_serves_cached_grids_until_they_go_stale(self):
+        with mock.patch('gym_app.explore_cache.build_explore_items', wraps=build_explore_items) as build:
+            self.names(self.near)
+            self.names(self.near)
+            self.assertEqual(build.call_count, 1)
+            with self.an_hour_later():
+                self.names(self.near)
+            self.assertEqual(build.call_count, 2)
+
+    def test_stale_grid_is_served_while_another_request_rebuilds(self):
+        self.names(self.near)
+        Gym.objects.filter(pk=self.gym.pk).update(name='Renamed')  # no signals, like a change not yet seen
+        lock_key = f'{_entry_key(self.near, {})}:lock'
+        with self.an_hour_later():
+            cache.add(lock_key, 1, 30)  # another request is rebuilding
+            self.assertEqual(self.names(self.near), ['Hyderabad Gym'])
+            cache.delete(lock_key)
+            self.assertEqual(self.names(self.near), ['Renamed'])
+
+    def test_gym_changes_reach_every_cell(self):
+        self.assertEqual(self.names(self.far), ['Hyderabad Gym'])
+        self.assertEqual(self.names(None), ['Hyderabad Gym'])
+        self.gym.name = 'Renamed'
+        self.gym.save()
+        self.assertEqual(self.names(self.far), ['Renamed'])
+        self.assertEqual(self.names(None), ['Renamed'])
+        self.gym.delete()
+        self.assertEqual(self.names(self.far), [])
+        self.assertEqual(self.names(self.near), [])
+
+
+class GymEtagTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        cls.gym = Gym.objects.create(owner=owner, name='Gym', address='-', city='-', latitude=17.4, longitude=78.4,
+                                     phone_number='0')
+        cls.asha = Customer.objects.create(user=User.objects.create_user('asha'), last_latitude=17.4,
+                                           last_longitude=78.4)
+        cls.ravi = Customer.objects.create(user=User.objects.create_user('ravi'), last_latitude=12.9,
+                                           last_longitude=77.6)
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        first = client.get(url)
+        self.assertEqual(first.status_code, 200)
+        again = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((again.status_code, again['ETag']), (304, first['ETag']))
+        return first['ETag']
+
+    def test_list_and_detail_answer_a_matching_etag_with_304(self):
+        self.revalidate('/api/gyms/')
+        self.revalidate(f'/api/gyms/{self.gym.pk}/')
+        response = self.client.get('/api/gyms/', HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_etags_change_after_an_edit(self):
+        list_etag, detail_etag = self.revalidate('/api/gyms/'), self.revalidate(f'/api/gyms/{self.gym.pk}/')
+        GymPlan.objects.create(gym=self.gym, name='Monthly', duration='month', price=1000, features='')
+        self.assertNotEqual(self.revalidate(f'/api/gyms/{self.gym.pk}/'), detail_etag)
+        self.assertNotEqual(self.revalidate('/api/gyms/'), list_etag)
+        self.gym.delete()
+        self.assertNotEqual(self.client.get('/api/gyms/')['ETag'], list_etag)
+
+    def test_list_etag_varies_per_customer(self):
+        etags = {
+            self.revalidate('/api/gyms/'),
+            self.revalidate('/api/gyms/', Client(HTTP_AUTHORIZATION=f'Bearer {issue_token(self.asha.user)}')),
+            self.revalidate('/api/gyms/', Client(HTTP_AUTHORIZATION=f'Bearer {issue_token(self.ravi.user)}')),
+        }
+        self.assertEqual(len(etags), 3)
+        self.assertIn('Authorization', self.client.get('/api/gyms/')['Vary'])
+
+
+class SnapshotDeltaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        cls.gyms = [
+            Gym.objects.create(owner=owner, name=name, address='-', city='-', latitude=0, longitude=0,
+                               phone_number='0')
+            for name in ('Iron', 'Steel', 'Yoga')
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.version = self.client.get('/api/gyms/snapshot/').json()['version']
+
+    def delta(self, since):
+        response = self.client.get('/api/gyms/snapshot/delta/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_returns_only_gyms_changed_since_the_version(self):
+        iron, steel, _ = self.gyms
+        self.assertEqual(self.delta(self.version)['columns']['id'], [])
+        iron.name = 'Iron Works'
+        iron.save()
+        steel.is_active = False
+        steel.save()
+        delta = self.delta(self.version)
+        self.assertEqual((delta['since'], delta['count']), (self.version, 2))
+        self.assertEqual((delta['columns']['name'], delta['removed']), (['Iron Works'], [steel.pk]))
+        self.assertGreater(delta['version'], self.version)
+        self.assertEqual(self.delta(delta['version'])['columns']['id'], [])
+
+    def test_a_version_from_before_a_delete_gets_the_full_snapshot(self):
+        self.gyms[2].delete()
+        full = self.delta(self.version)
+        self.assertNotIn('since', full)
+        self.assertEqual(full['columns']['name'], ['Iron', 'Steel'])
+        self.assertGreater(full['version'], self.version)
+        self.assertIn('since', self.delta(full['version']))
+
+    def test_a_lost_cache_sends_older_versions_the_full_snapshot(self):
+        cache.clear()
+        full = self.delta(self.version)
+        self.assertNotIn('since', full)
+        self.assertEqual(self.delta(full['version'])['columns']['id'], [])
+
+    def test_rejects_a_malformed_version(self):
+        self.assertEqual(self.client.get('/api/gyms/snapshot/delta/', {'since': 'x'}).status_code, 400)
+
+
+def km_north(lat, km):
+    return lat + km / KM_PER_DEGREE
+
+
+class NearbyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = GymOwner.objects.create(user=User.objects.create_user('owner'), phone_number='0')
+        cls.home = cls.gym('Home', 17.4, 78.4)
+        cls.far = cls.gym('Far', km_north(17.4, 3000), 78.4)
+        cls.customer = Customer.objects.create(user=User.objects.create_user('asha'), last_latitude=17.4,
+                                               last_longitude=78.4)
+
+    @classmethod
+    def gym(cls, name, lat, lon):
+        return Gym.objects.create(owner=cls.owner, name=name, address='-', city='-', latitude=round(lat, 6),
+                                  longitude=round(lon, 6), phone_number='0')
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('gym_app.nearby.refresh_nearby', wraps=refresh_nearby)
+        self.refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def names(self):
+        return [item['name'] for item in get_nearby(self.customer)['items']]
+
+    def move(self, km):
+        self.customer.last_latitude = Decimal(str(round(km_north(17.4, km), 6)))
+
+    def test_recomputes_once_the_customer_moves_far_enough(self):
+        self.assertEqual(self.names(), ['Home', 'Far'])
+        self.move(0.5)
+        self.names()
+        self.assertEqual(self.refresh.call_count, 1)
+        self.move(2)
+        self.names()
+        self.assertEqual(self.refresh.call_count, 2)
+
+    def test_invalidate_all_recomputes_every_list(self):
+        self.names()
+        Gym.objects.filter(pk=self.far.pk).update(name='Renamed')  # as if seen by nobody yet
+        self.assertEqual(self.names(), ['Home', 'Far'])
+        invalidate_all()
+        self.assertEqual(self.names(), ['Home', 'Renamed'])
+        self.assertEqual(self.refresh.call_count, 2)
+
+    def test_deleting_a_gym_drops_it_from_cached_lists(self):
+        self.names()
+        self.far.delete()
+        self.assertEqual(self.names(), ['Home'])
+
+    def test_grows_the_search_box_until_the_answer_is_exact(self):
+        # 13 km away on the diagonal sits inside the first 10 km box; 11 km north does not
+        offset = 13 / 2 ** 0.5
+        corner = self.gym('Corner', km_north(17.4, offset), 78.4 + offset / (KM_PER_DEGREE * 0.9542))
+        north = self.gym('North', km_north(17.4, 11), 78.4)
+        self.assertEqual(nearest_gym_ids(17.4, 78.4, 2), [self.home.pk, north.pk])
+        self.assertEqual(nearest_gym_ids(17.4, 78.4, 3), [self.home.pk, north.pk, corner.pk])
+        self.assertEqual(nearest_gym_ids(17.4, 78.4, 10), [self.home.pk, north.pk, corner.pk, self.far.pk])
+
+    def test_refresh_command_recomputes_customers_near_changed_gyms(self):
+        elsewhere = Customer.objects.create(user=User.objects.create_user('ravi'), last_latitude=km_north(17.4, 500),
+                                            last_longitude=78.4)
+        with mock.patch('gym_app.management.commands.refresh_nearby.refresh_nearby') as refresh:
+            call_command('refresh_nearby', stdout=io.StringIO())  # both gyms are new
+            self.assertEqual([call.args[0] for call in refresh.call_args_list], [self.customer.pk])
+            call_command('refresh_nearby', stdout=io.StringIO())  # nothing changed since
+            self.assertEqual(refresh.call_count, 1)
+            call_command('refresh_nearby', '--all', stdout=io.StringIO())
+            self.assertEqual({call.args[0] for call in refresh.call_args_list[1:]}, {self.customer.pk, elsewhere.pk})
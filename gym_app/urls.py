@@ -20,16 +20,38 @@ urlpatterns = [
     path('owner/gym/register/', views.gym_register, name='gym_register'),
     path('owner/gym/<int:gym_id>/plans/', views.gym_add_plans, name='gym_add_plans'),
     path('owner/gym/<int:gym_id>/plan/<int:plan_id>/edit/', views.gym_edit_plan, name='gym_edit_plan'),
+    path('owner/bookings/export/', views.owner_bookings_export, name='owner_bookings_export'),
+    
+    # Platform admin paths
+    path('platform/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('platform/members/', views.admin_member_list, name='admin_member_list'),
+    path('platform/members/<int:customer_id>/', views.admin_member_profile, name='admin_member_profile'),
     
     # API
     path('api/auth/google/', views.api_google_auth, name='api_google_auth'),
+    path('api/auth/token/', views.api_token_login, name='api_token_login'),
     path('api/register/customer/', views.api_register_customer, name='api_register_customer'),
     path('api/register/owner/', views.api_register_owner, name='api_register_owner'),
     path('api/gyms/create/', views.api_create_gym, name='api_create_gym'),
     path('api/gyms/<int:gym_id>/plans/create/', views.api_create_plan, name='api_create_plan'),
     path('api/gyms/', views.GymListAPI.as_view(), name='api_gym_list'),
+    path('api/gyms/search/', views.GymSearchAPI.as_view(), name='api_gym_search'),
+    path('api/gyms/snapshot/', views.gym_snapshot, name='api_gym_snapshot'),
+    path('api/gyms/snapshot/delta/', views.gym_snapshot_delta, name='api_gym_snapshot_delta'),
     path('api/gyms/<int:id>/', views.GymDetailAPI.as_view(), name='api_gym_detail'),
     path('api/gyms/<int:gym_id>/book/<int:plan_id>/', views.api_create_booking, name='api_create_booking'),
+    path('api/gyms/<int:gym_id>/availability/', views.api_gym_availability, name='api_gym_availability'),
+    path('api/gyms/<int:gym_id>/schedule/', views.api_gym_schedule, name='api_gym_schedule'),
+    path('api/gyms/<int:gym_id>/quote/', views.api_gym_quote, name='api_gym_quote'),
+    path('api/gyms/<int:gym_id>/price-rules/', views.api_price_rules, name='api_price_rules'),
+    path('api/price-rules/<int:rule_id>/', views.api_delete_price_rule, name='api_delete_price_rule'),
+    path('api/gyms/<int:gym_id>/slots/', views.api_reserve_slot, name='api_reserve_slot'),
+    path('api/reservations/<int:reservation_id>/cancel/', views.api_cancel_reservation, name='api_cancel_reservation'),
+    path('api/bookings/<uuid:booking_id>/', views.api_booking_status, name='api_booking_status'),
+    path('api/bookings/<uuid:booking_id>/refund/', views.api_refund_booking, name='api_refund_booking'),
     path('api/owner/dashboard/', views.api_owner_dashboard, name='api_owner_dashboard'),
+    path('api/owner/bookings/', views.api_owner_bookings, name='api_owner_bookings'),
+    path('api/owner/analytics/', views.api_owner_analytics, name='api_owner_analytics'),
+    path('api/payments/webhook/<str:provider>/', views.payment_webhook, name='payment_webhook'),
     path('api/update-location/', views.update_location, name='update_location'),
 ]
@@ -0,0 +1,21 @@
+"""
+Views, split by audience so each module only imports what it needs.
+
+Heavy optional dependencies load on first use instead of at import:
+``qrcode``/PIL in ``gym_app.qr`` and the Firebase token verifier inside
+``api_google_auth``.
+"""
+from ..geo import calculate_distance  # noqa: F401  (kept importable from here)
+from .accounts import auth_login, auth_logout, customer_register, landing_page, owner_register  # noqa: F401
+from .api import (  # noqa: F401
+    GymDetailAPI, GymListAPI, GymSearchAPI, api_booking_status, api_cancel_reservation, api_create_booking,
+    api_create_gym, api_create_plan, api_delete_price_rule, api_google_auth, api_gym_availability,
+    api_gym_quote, api_gym_schedule, api_owner_analytics, api_owner_bookings, api_owner_dashboard,
+    api_price_rules, api_refund_booking, api_register_customer, api_register_owner, api_reserve_slot,
+    api_token_login, gym_snapshot, gym_snapshot_delta, payment_webhook,
+)
+from .customer import booking_success, checkout, explore, gym_detail, update_location  # noqa: F401
+from .owner import (  # noqa: F401
+    gym_add_plans, gym_edit_plan, gym_register, owner_bookings_export, owner_dashboard,
+)
+from .platform import admin_dashboard, admin_member_list, admin_member_profile  # noqa: F401
@@ -0,0 +1,66 @@
+"""
+Landing page, registration, login and logout.
+"""
+from django.contrib import messages
+from django.contrib.auth import login, logout
+from django.shortcuts import redirect, render
+
+from ..forms import CustomerSignUpForm, GymOwnerSignUpForm, LoginForm
+from ..roles import user_role
+
+
+def landing_page(request):
+    """Landing page with role selection."""
+    return render(request, 'gym_app/landing.html')
+
+
+def customer_register(request):
+    """Customer registration page."""
+    if request.method == 'POST':
+        form = CustomerSignUpForm(request.POST)
+        if form.is_valid():
+            user = form.save()
+            login(request, user)
+            messages.success(request, 'Welcome to MuscleMeter! Start exploring gyms near you.')
+            return redirect('explore')
+    else:
+        form = CustomerSignUpForm()
+    return render(request, 'gym_app/customer_register.html', {'form': form})
+
+
+def owner_register(request):
+    """Gym owner registration page."""
+    if request.method == 'POST':
+        form = GymOwnerSignUpForm(request.POST, request.FILES)
+        if form.is_valid():
+            user = form.save()
+            login(request, user)
+            messages.success(request, 'Welcome! Now register your gym to get started.')
+            return redirect('gym_register')
+    else:
+        form = GymOwnerSignUpForm()
+    return render(request, 'gym_app/owner_register.html', {'form': form})
+
+
+def auth_login(request):
+    """Login page for both customers and owners."""
+    if request.method == 'POST':
+        form = LoginForm(request, data=request.POST)
+        if form.is_valid():
+            user = form.get_user()
+            login(request, user)
+            
+            # Redirect based on user type
+            if user_role(user) == 'owner':
+                return redirect('owner_dashboard')
+            return redirect('explore')
+    else:
+        form = LoginForm()
+    return render(request, 'gym_app/login.html', {'form': form})
+
+
+def auth_logout(request):
+    """Logout user."""
+    logout(request)
+    messages.info(request, "You have been logged out.")
+    return redirect('landing')
@@ -0,0 +1,655 @@
+"""
+REST API views used by the standalone frontend.
+"""
+from datetime import date
+import gzip
+import hashlib
+
+from django.contrib.auth import authenticate, login
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import generics, permissions, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from ..analytics import owner_analytics
+from ..authentication import issue_token
+from ..filters import TRUE_VALUES, filter_gyms, gym_facets, parse_gym_filters
+from ..geo import calculate_distance
+from ..lifecycle import InvalidTransition, create_booking, refund
+from ..models import Booking, Customer, Gym, GymOwner, GymPhoto, GymPlan, GymSchedule, PriceRule, SlotReservation
+from ..nearby import customer_location, get_nearby
+from ..pagination import keyset_page
+from ..payments import InvalidSignature, drain_if_due, get_gateway, receive_webhook, start_payment
+from ..pricing import InvalidPromoCode, quote_plan, quote_plans
+from ..qr import qr_png_base64
+from ..roles import user_role
+from ..routers import ReplicaReadMixin
+from ..search import search_gym_ids
+from ..serializers import (
+    GymPlanSerializer, GymScheduleSerializer, GymSerializer, OwnerBookingSerializer, PriceRuleSerializer,
+)
+from ..slots import (
+    SlotFull, SlotUnavailable, cancel_reservation, parse_slot, reserve_slot, week_availability,
+)
+from ..snapshot import build_delta, delta_available, get_snapshot, pick_encoding, to_version
+
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def api_google_auth(request):
+    token = request.data.get('token')
+    requested_role = request.data.get('role')  # 'owner' or 'customer'
+    
+    if not token:
+        return Response({'error': 'No token provided'}, status=400)
+    
+    # jwt/cryptography are only needed here, so they load on the first Google login
+    from ..firebase_tokens import InvalidIdToken, verify_id_token
+    
+    try:
+        # Verify Token locally against the cached Google signing keys
+        try:
+            decoded_token = verify_id_token(token)
+        except InvalidIdToken as e:
+            raise Exception(f"Invalid Token: {e}")
+
+        email = decoded_token.get('email')
+        # A token without the claim is treated as unverified
+        if not email or decoded_token.get('email_verified') is not True:
+            raise Exception("Token has no verified email")
+        
+        # Get or Create User; both role profiles come back in the same query
+        user = User.objects.select_related('gym_owner_profile', 'customer_profile').filter(username=email).first()
+        if user is None:
+            user, created = User.objects.get_or_create(username=email, defaults={
+                'email': email,
+                'first_name': decoded_token.get('name', '').split(' ')[0],
+                'last_name': ' '.join(decoded_token.get('name', '').split(' ')[1:])
+            })
+        
+        # Log them in
+        login(request, user)
+        
+        # Check Existing Roles
+        is_owner = hasattr(user, 'gym_owner_profile')
+        is_customer = hasattr(user, 'customer_profile')
+        
+        assigned_role = 'customer' # Default
+        
+        if is_owner:
+            assigned_role = 'owner'
+        elif is_customer:
+            # Existing Customer trying to be Owner?
+            if requested_role == 'owner':
+                 GymOwner.objects.get_or_create(user=user)
+                 assigned_role = 'owner'
+            else:
+                assigned_role = 'customer'
+        else:
+            # New User - Assign Role
+            if requested_role == 'owner':
+                GymOwner.objects.create(user=user)
+                assigned_role = 'owner'
+            else:
+                Customer.objects.create(user=user)
+                assigned_role = 'customer'
+
+        return Response({
+            'success': True,
+            'username': user.username,
+            'role': assigned_role,
+            'token': issue_token(user)
+        })
+        
+    except Exception as e:
+        print(f"Auth Error: {e}")
+        # Return the actual error for debugging (remove in production later)
+        return Response({'error': f'Auth failed: {str(e)}'}, status=400)
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def api_token_login(request):
+    """Exchange a username and password for an API token (the only password check a client needs)."""
+    user = authenticate(
+        request,
+        username=request.data.get('username'),
+        password=request.data.get('password'),
+    )
+    if user is None:
+        return Response({'error': 'Invalid username or password'}, status=400)
+    
+    return Response({
+        'success': True,
+        'username': user.username,
+        'role': user_role(user) or None,
+        'token': issue_token(user)
+    })
+
+class GymListAPI(ReplicaReadMixin, generics.ListAPIView):
+    serializer_class = GymSerializer
+    permission_classes = [permissions.AllowAny]
+    queryset = Gym.objects.filter(is_active=True).select_related('owner__user').prefetch_related('photos', 'plans')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        filters = parse_gym_filters(self.request.query_params)
+        queryset = filter_gyms(queryset, filters)
+        lat = self.request.query_params.get('lat')
+        lon = self.request.query_params.get('lon')
+        
+        if not (lat and lon) and hasattr(self.request.user, 'customer_profile'):
+            nearby = get_nearby(self.request.user.customer_profile)
+            if nearby is not None:
+                if not filters:
+                    # Precomputed nearest gyms, in their cached order
+                    distances = {item['id']: item['distance'] for item in nearby['items']}
+                    gyms = list(queryset.filter(id__in=distances))
+                    for gym in gyms:
+                        gym.distance = distances[gym.id]
+                    gyms.sort(key=lambda x: x.distance)
+                    return gyms
+                lat, lon = nearby['lat'], nearby['lon']
+        
+        if lat and lon:
+            # Calculate distance using Python (basic implementation, ideally use PostGIS)
+            gyms = list(queryset)
+            for gym in gyms:
+                gym.distance = calculate_distance(lat, lon, gym.latitude, gym.longitude)
+            gyms.sort(key=lambda x: x.distance)
+            return gyms
+        return queryset
+
+    def get_etag(self, request):
+        """Changes whenever any gym does, or the query, the caller's location or (for open-now) the time."""
+        params = sorted(request.query_params.lists())
+        want_facets = request.query_params.get('facets', '').lower() in TRUE_VALUES
+        if want_facets or 'open_now' in request.query_params:
+            params.append(('at', timezone.localtime().strftime('%H:%M')[:4]))
+        if not request.query_params.get('lat') and hasattr(request.user, 'customer_profile'):
+            params.append(('customer', request.user.customer_profile.pk, customer_location(request.user.customer_profile)))
+        digest = hashlib.md5(repr(params).encode()).hexdigest()[:12]
+        return f'"gyms-{_gyms_version()}-{digest}"'
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if _etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+            # Facets change the response shape, so only send them when asked for
+            if request.query_params.get('facets', '').lower() in TRUE_VALUES:
+                filters = parse_gym_filters(request.query_params)
+                response.data = {
+                    'count': len(response.data),
+                    'filters': filters,
+                    'facets': gym_facets(filters),
+                    'results': response.data,
+                }
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
+
+class GymSearchAPI(generics.ListAPIView):
+    """Full-text search over gym name, area, description and plan features."""
+    serializer_class = GymSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        try:
+            limit = min(int(self.request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            limit = 20
+        if not query or limit < 1:
+            return []
+        
+        ids = search_gym_ids(query, limit)
+        gyms = Gym.objects.filter(id__in=ids).select_related('owner__user').prefetch_related('photos', 'plans')
+        # Keep the search ranking
+        position = {gym_id: i for i, gym_id in enumerate(ids)}
+        return sorted(gyms, key=lambda gym: position[gym.id])
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    tags = parse_etags(header)
+    return '*' in tags or etag in tags
+
+
+def _gyms_version():
+    """Version of the gym table as a whole: newest change plus row count (catches deletes)."""
+    stats = Gym.objects.aggregate(latest=Max('updated_at'), count=Count('id'))
+    return f'{to_version(stats["latest"])}-{stats["count"]}'
+
+
+def _compressed_response(request, variants, content_type='application/json'):
+    """Serve the best pre-encoded variant of a body for the client's Accept-Encoding."""
+    coding = pick_encoding(request.META.get('HTTP_ACCEPT_ENCODING'), variants)
+    response = HttpResponse(variants[coding], content_type=content_type)
+    if coding != 'identity':
+        response['Content-Encoding'] = coding
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+@require_GET
+def gym_snapshot(request):
+    """All active gyms as one compact columnar payload, revalidated by ETag."""
+    snapshot = get_snapshot()
+    if request.META.get('HTTP_IF_NONE_MATCH') == snapshot['etag']:
+        response = HttpResponseNotModified()
+    else:
+        variants = {k: v for k, v in snapshot.items() if k in ('identity', 'gzip', 'br')}
+        response = _compressed_response(request, variants)
+    response['ETag'] = snapshot['etag']
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@require_GET
+def gym_snapshot_delta(request):
+    """Gyms changed since ``?since=<version>`` from an earlier snapshot."""
+    try:
+        since = int(request.GET.get('since', ''))
+    except ValueError:
+        return JsonResponse({'error': 'since must be a snapshot version'}, status=400)
+    if not delta_available(since):
+        # Gyms were deleted since then, which a delta can't show; the reply has no "since" key
+        return gym_snapshot(request)
+
+    body = build_delta(since)
+    variants = {'identity': body}
+    if len(body) > 1024:
+        variants['gzip'] = gzip.compress(body)
+    response = _compressed_response(request, variants)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+class GymDetailAPI(ReplicaReadMixin, generics.RetrieveAPIView):
+    serializer_class = GymSerializer
+    permission_classes = [permissions.AllowAny]
+    queryset = Gym.objects.filter(is_active=True)
+    lookup_field = 'id'
+
+    def retrieve(self, request, *args, **kwargs):
+        # Plan and photo changes touch the gym's updated_at too (see signals.touch_gym)
+        updated_at = self.get_queryset().filter(id=kwargs['id']).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return super().retrieve(request, *args, **kwargs)  # 404
+        etag = f'"gym-{kwargs["id"]}-{to_version(updated_at)}"'
+        if _etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def api_create_booking(request, gym_id, plan_id):
+    gym = get_object_or_404(Gym, id=gym_id)
+    plan = get_object_or_404(GymPlan, id=plan_id)
+    
+    try:
+        quote = quote_plan(plan, request.data.get('promo_code', '').strip())
+    except InvalidPromoCode as exc:
+        return Response({'error': str(exc)}, status=400)
+    
+    booking = create_booking(
+        request.user.customer_profile, gym, plan, quote['price'],
+        auto_renew=str(request.data.get('auto_renew', '')).lower() in TRUE_VALUES, actor=request.user,
+    )
+    intent = start_payment(booking, card_number=request.data.get('card_number', ''))
+    booking.refresh_from_db(fields=['payment_status'])
+    
+    # Until the payment settles, poll api_booking_status for the pass
+    return Response({
+        'success': True,
+        'booking_id': booking.booking_id,
+        'amount': booking.amount,
+        'payment_status': booking.payment_status,
+        'redirect_url': intent.redirect_url,
+        **_pass_details(booking),
+    }, status=201 if booking.payment_status == 'completed' else 202)
+
+
+def _pass_details(booking):
+    """Access code and QR image, once the booking is paid for."""
+    if booking.payment_status != 'completed':
+        return {}
+    return {
+        'access_code': booking.access_code,
+        'qr_image': qr_png_base64(f"Code: {booking.access_code}\nGym: {booking.gym.name}"),
+    }
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def api_booking_status(request, booking_id):
+    booking = get_object_or_404(
+        Booking.objects.select_related('gym'), booking_id=booking_id, customer__user=request.user,
+    )
+    if booking.payment_status == 'pending':
+        drain_if_due()
+        booking.refresh_from_db(fields=['payment_status'])
+    return Response({
+        'booking_id': booking.booking_id,
+        'payment_status': booking.payment_status,
+        **_pass_details(booking),
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def api_owner_dashboard(request):
+    if request.role != 'owner':
+        return Response({'error': 'Not authorized'}, status=403)
+        
+    owner = request.user.gym_owner_profile
+    gyms = owner.gyms.select_related('owner__user').prefetch_related('photos', 'plans')
+    serializer = GymSerializer(gyms, many=True)
+    
+    # Same totals as the web dashboard, in one query
+    stats = Booking.objects.filter(gym__owner=owner).aggregate(
+        total_bookings=Count('id'),
+        total_revenue=Sum('amount', filter=Q(payment_status__in=Booking.PAID_STATUSES)),
+    )
+    return Response({
+        'gyms': serializer.data,
+        'total_bookings': stats['total_bookings'],
+        'total_revenue': stats['total_revenue'] or 0,
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def api_owner_bookings(request):
+    """Owner's bookings newest first, one keyset page at a time (``?cursor=`` from the previous page)."""
+    if request.role != 'owner':
+        return Response({'error': 'Not authorized'}, status=403)
+    
+    try:
+        page_size = min(max(int(request.query_params.get('page_size', 25)), 1), 100)
+    except ValueError:
+        page_size = 25
+    
+    bookings = Booking.objects.filter(gym__owner=request.user.gym_owner_profile).select_related(
+        'customer__user', 'plan', 'gym'
+    )
+    rows, next_cursor = keyset_page(
+        bookings, [('created_at', True), ('id', True)], request.query_params.get('cursor'), page_size
+    )
+    return Response({
+        'results': OwnerBookingSerializer(rows, many=True).data,
+        'next_cursor': next_cursor,
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def api_owner_analytics(request):
+    """Plan performance, retention cohorts and busy hours, as of the last ``refresh_analytics`` run."""
+    if request.role != 'owner':
+        return Response({'error': 'Not authorized'}, status=403)
+    
+    gym_id = request.query_params.get('gym')
+    if gym_id is not None and not gym_id.isdigit():
+        return Response({'error': 'gym must be a gym id'}, status=400)
+    try:
+        months = min(max(int(request.query_params.get('months', 12)), 1), 36)
+    except ValueError:
+        months = 12
+    
+    return Response(owner_analytics(request.user.gym_owner_profile, int(gym_id) if gym_id else None, months))
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def api_register_customer(request):
+    try:
+        data = request.data
+        if Customer.objects.filter(user__username=data.get('username')).exists():
+            return Response({'error': 'Username already exists'}, status=400)
+            
+        user = User.objects.create_user(
+            username=data['username'],
+            email=data.get('email', ''),
+            password=data['password'],
+            first_name=data.get('first_name', ''),
+            last_name=data.get('last_name', '')
+        )
+        Customer.objects.create(user=user, phone_number=data.get('phone_number', ''))
+        
+        login(request, user)
+        return Response({'success': True, 'username': user.username, 'role': 'customer', 'token': issue_token(user)})
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+@api_view(['POST'])
+@permission_classes([permissions.AllowAny])
+def api_register_owner(request):
+    try:
+        data = request.data
+        if GymOwner.objects.filter(user__username=data.get('username')).exists():
+            return Response({'error': 'Username already exists'}, status=400)
+
+        user = User.objects.create_user(
+            username=data['username'],
+            email=data.get('email', ''),
+            password=data['password'],
+            first_name=data.get('first_name', ''),
+            last_name=data.get('last_name', '')
+        )
+        GymOwner.objects.create(user=user, phone_number=data.get('phone_number', ''))
+        
+        login(request, user)
+        return Response({'success': True, 'username': user.username, 'role': 'owner', 'token': issue_token(user)})
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def api_create_gym(request):
+    if request.role != 'owner':
+        return Response({'error': 'Not authorized'}, status=403)
+    
+    try:
+        data = request.data
+        gym = Gym.objects.create(
+            owner=request.user.gym_owner_profile,
+            name=data['name'],
+            description=data.get('description', ''),
+            address=data['address'],
+            city=data['city'],
+            latitude=data.get('latitude', 0),
+            longitude=data.get('longitude', 0),
+            phone_number=data.get('phone_number', ''),
+            email=data.get('email', ''),
+            opening_time=data.get('opening_time','06:00'),
+            closing_time=data.get('closing_time','22:00'),
+            is_active=True
+        )
+        
+        # Handle Photos
+        if request.FILES.getlist('photos'):
+            for i, photo in enumerate(request.FILES.getlist('photos')):
+                GymPhoto.objects.create(
+                    gym=gym,
+                    image=photo,
+                    is_primary=(i == 0)
+                )
+
+        return Response({'success': True, 'gym_id': gym.id})
+    except Exception as e:
+        print(f"Create Gym Error: {e}")
+        return Response({'error': str(e)}, status=400)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def api_create_plan(request, gym_id):
+    gym = get_object_or_404(Gym, id=gym_id)
+    if gym.owner.user != request.user:
+        return Response({'error': 'Not authorized'}, status=403)
+        
+    try:
+        serializer = GymPlanSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(gym=gym)
+            return Response({'success': True})
+        return Response(serializer.errors, status=400)
+    except Exception as e:
+        return Response({'error': str(e)}, status=400)
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def api_gym_availability(request, gym_id):
+    """A week of slot availability from ``?start=YYYY-MM-DD`` (default today)."""
+    gym = get_object_or_404(Gym, id=gym_id, is_active=True)
+    start = request.query_params.get('start')
+    try:
+        start = date.fromisoformat(start) if start else None
+    except ValueError:
+        return Response({'error': 'start must be a date (YYYY-MM-DD)'}, status=400)
+    
+    return Response({
+        'gym_id': gym.id,
+        'slot_minutes': gym.slot_minutes,
+        'days': week_availability(gym, start),
+    })
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def api_reserve_slot(request, gym_id):
+    """Reserve a place in one slot: ``{"date": "YYYY-MM-DD", "start": "HH:MM"}``."""
+    if not hasattr(request.user, 'customer_profile'):
+        return Response({'error': 'Only customers can reserve slots'}, status=403)
+    gym = get_object_or_404(Gym, id=gym_id, is_active=True)
+    try:
+        day, start_time = parse_slot(request.data.get('date', ''), request.data.get('start', ''))
+    except (TypeError, ValueError):
+        return Response({'error': 'date (YYYY-MM-DD) and start (HH:MM) are required'}, status=400)
+    
+    try:
+        reservation = reserve_slot(request.user.customer_profile, gym, day, start_time)
+    except SlotFull as e:
+        return Response({'error': str(e)}, status=409)
+    except SlotUnavailable as e:
+        return Response({'error': str(e)}, status=400)
+    
+    return Response({
+        'success': True,
+        'reservation_id': reservation.id,
+        'date': day.isoformat(),
+        'start': start_time.strftime('%H:%M'),
+    }, status=201)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def api_cancel_reservation(request, reservation_id):
+    reservation = get_object_or_404(
+        SlotReservation, id=reservation_id, customer__user_id=request.user.id,
+    )
+    cancel_reservation(reservation)
+    return Response({'success': True})
+
+@api_view(['GET', 'PUT'])
+@permission_classes([permissions.IsAuthenticatedOrReadOnly])
+def api_gym_schedule(request, gym_id):
+    """Weekly opening hours; the owner replaces them all with PUT ``{"intervals": [...]}``.
+
+    An empty list goes back to opening_time/closing_time every day.
+    """
+    gym = get_object_or_404(Gym.objects.select_related('owner'), id=gym_id)
+    if request.method == 'PUT':
+        if gym.owner.user_id != request.user.id:
+            return Response({'error': 'Not authorized'}, status=403)
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Send an object: {"intervals": [...]}'}, status=400)
+        serializer = GymScheduleSerializer(data=request.data.get('intervals', []), many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        
+        rows = [GymSchedule(gym=gym, **interval) for interval in serializer.validated_data]
+        for row in rows:
+            row.normalize()
+        with transaction.atomic():
+            gym.schedule.all().delete()
+            GymSchedule.objects.bulk_create(rows)
+            gym.save(update_fields=['updated_at'])  # bulk_create sends no signals; this clears the gym's caches
+    
+    return Response({
+        'gym_id': gym.id,
+        'intervals': GymScheduleSerializer(gym.schedule.all(), many=True).data,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def api_gym_quote(request, gym_id):
+    """Current prices of all the gym's active plans, with ``?code=`` applied when given."""
+    gym = get_object_or_404(Gym, id=gym_id, is_active=True)
+    try:
+        quotes = quote_plans(gym, gym.plans.filter(is_active=True), request.query_params.get('code', '').strip())
+    except InvalidPromoCode as exc:
+        return Response({'error': str(exc)}, status=400)
+    return Response({'gym_id': gym.id, 'quotes': quotes})
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([permissions.IsAuthenticated])
+def api_price_rules(request, gym_id):
+    """The owner's discount rules for a gym; POST adds one."""
+    gym = get_object_or_404(Gym.objects.select_related('owner'), id=gym_id)
+    if gym.owner.user_id != request.user.id:
+        return Response({'error': 'Not authorized'}, status=403)
+    
+    if request.method == 'POST':
+        serializer = PriceRuleSerializer(data=request.data, context={'gym': gym})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        serializer.save(gym=gym)
+        return Response(serializer.data, status=201)
+    
+    return Response(PriceRuleSerializer(gym.price_rules.all(), many=True).data)
+
+
+@api_view(['DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def api_delete_price_rule(request, rule_id):
+    rule = get_object_or_404(PriceRule, id=rule_id, gym__owner__user=request.user)
+    rule.delete()
+    return Response(status=204)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def api_refund_booking(request, booking_id):
+    """Refund a paid pass; for the gym's owner and platform staff."""
+    booking = get_object_or_404(Booking.objects.select_related('gym__owner'), booking_id=booking_id)
+    if not (request.user.is_staff or booking.gym.owner.user_id == request.user.id):
+        return Response({'error': 'Not authorized'}, status=403)
+    try:
+        refund(booking, reason=request.data.get('reason', 'refund')[:50], actor=request.user)
+    except InvalidTransition as exc:
+        return Response({'error': str(exc)}, status=409)
+    return Response({'booking_id': booking.booking_id, 'payment_status': booking.payment_status})
+
+
+@csrf_exempt
+@require_POST
+def payment_webhook(request, provider):
+    """Provider callbacks: verified and queued here, applied in batches (see payments.py)."""
+    gateway = get_gateway()
+    if provider != gateway.name:
+        return JsonResponse({'error': 'Unknown payment provider'}, status=404)
+    try:
+        created = receive_webhook(gateway, request.body.decode(), request.headers)
+    except (InvalidSignature, UnicodeDecodeError):
+        return JsonResponse({'error': 'Invalid signature'}, status=400)
+    return JsonResponse({'received': True, 'duplicate': not created})
@@ -0,0 +1,185 @@
+"""
+Customer-facing pages: gym discovery, gym details, checkout and passes.
+"""
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+
+from ..explore_cache import geo_cell, get_explore_grid
+from ..filters import parse_gym_filters
+from ..forms import BookingForm
+from ..geo import calculate_distance
+from ..lifecycle import create_booking
+from ..locations import location_buffer
+from ..models import Booking, Gym, GymPlan
+from ..nearby import get_nearby
+from ..payments import drain_if_due, start_payment
+from ..pricing import InvalidPromoCode, quote_plan
+from ..qr import qr_png_base64
+from ..routers import replica_reads
+
+
+@replica_reads
+def explore(request):
+    """Gym discovery page with location-based results."""
+    # Get user location from query params (set by JavaScript)
+    user_lat = request.GET.get('lat')
+    user_lon = request.GET.get('lon')
+    filters = parse_gym_filters(request.GET)
+    near_you = False
+    
+    # Logged-in customers without a location in the URL get their precomputed list
+    if not (user_lat and user_lon) and hasattr(request.user, 'customer_profile'):
+        nearby = get_nearby(request.user.customer_profile)
+        if nearby is not None:
+            near_you = True
+            if not filters:
+                gyms = nearby['items']
+                grid_html = render_to_string('gym_app/explore_grid.html', {
+                    'gyms': gyms, 'cell_lat': nearby['lat'], 'cell_lon': nearby['lon'],
+                })
+            user_lat, user_lon = nearby['lat'], nearby['lon']
+    
+    if not near_you or filters:
+        # Visitors in the same geo cell share one cached result list and grid
+        cell = geo_cell(user_lat, user_lon)
+        gyms, grid_html = get_explore_grid(cell, filters)
+    
+    context = {
+        'gyms': gyms,
+        'grid_html': grid_html,
+        'filters': filters,
+        'user_lat': user_lat,
+        'user_lon': user_lon,
+        'near_you': near_you,
+    }
+    return render(request, 'gym_app/explore.html', context)
+
+
+@replica_reads
+def gym_detail(request, gym_id):
+    """Gym detail page with photos, plans, and contact info."""
+    gym = get_object_or_404(Gym.objects.select_related('owner__user'), id=gym_id, is_active=True)
+    photos = gym.photos.all()
+    plans = gym.plans.filter(is_active=True)
+    
+    # Get user location for distance
+    user_lat = request.GET.get('lat')
+    user_lon = request.GET.get('lon')
+    distance = None
+    
+    if user_lat and user_lon:
+        distance = round(calculate_distance(user_lat, user_lon, gym.latitude, gym.longitude), 1)
+    
+    is_owner = False
+    if request.role == 'owner':
+        is_owner = (request.user.gym_owner_profile.pk == gym.owner_id)
+
+    context = {
+        'gym': gym,
+        'photos': photos,
+        'plans': plans,
+        'distance': distance,
+        'primary_photo': photos.filter(is_primary=True).first() or photos.first(),
+        'is_owner': is_owner,
+    }
+    return render(request, 'gym_app/gym_detail.html', context)
+
+
+@login_required
+def checkout(request, gym_id, plan_id):
+    """Checkout page for booking a gym plan."""
+    gym = get_object_or_404(Gym, id=gym_id, is_active=True)
+    plan = get_object_or_404(GymPlan, id=plan_id, gym=gym, is_active=True)
+    
+    # Ensure user is a customer
+    if not hasattr(request.user, 'customer_profile'):
+        messages.error(request, 'Please register as a customer to book.')
+        return redirect('customer_register')
+    
+    # The price is quoted again on payment, so the amount charged is the one shown
+    promo_code = (request.POST.get('promo_code') or request.GET.get('promo') or '').strip()
+    promo_error = ''
+    try:
+        quote = quote_plan(plan, promo_code)
+    except InvalidPromoCode as exc:
+        quote, promo_code, promo_error = quote_plan(plan), '', str(exc)
+    
+    if request.method == 'POST':
+        form = BookingForm(request.POST)
+        if form.is_valid() and not promo_error:
+            booking = create_booking(
+                request.user.customer_profile, gym, plan, quote['price'],
+                auto_renew=form.cleaned_data['auto_renew'], actor=request.user,
+            )
+            # Settles asynchronously through the provider's webhook; the success page waits for it
+            intent = start_payment(booking, card_number=form.cleaned_data['card_number'])
+            if intent.redirect_url:
+                return redirect(intent.redirect_url)
+            return redirect('booking_success', booking_id=booking.booking_id)
+    else:
+        form = BookingForm(initial={'plan_id': plan.id, 'promo_code': promo_code})
+    
+    context = {
+        'gym': gym,
+        'plan': plan,
+        'form': form,
+        'quote': quote,
+        'promo_code': promo_code,
+        'promo_error': promo_error,
+    }
+    return render(request, 'gym_app/checkout.html', context)
+
+
+def booking_success(request, booking_id):
+    """Booking confirmation page with QR code."""
+    booking = get_object_or_404(Booking, booking_id=booking_id)
+    
+    # Verify booking belongs to current user (if logged in)
+    if request.user.is_authenticated:
+        if hasattr(request.user, 'customer_profile'):
+            if booking.customer != request.user.customer_profile:
+                messages.error(request, 'Access denied.')
+                return redirect('explore')
+    
+    if booking.payment_status == 'pending':
+        # Without a payments worker (PAYMENT_INLINE_DRAIN), apply queued webhooks here; the page refreshes until it settles
+        drain_if_due()
+        booking.refresh_from_db()
+    
+    qr_image = None
+    if booking.payment_status == 'completed':
+        qr_data = f"MuscleMeter Pass\nCode: {booking.access_code}\nGym: {booking.gym.name}\nValid: {booking.start_date} to {booking.end_date}"
+        qr_image = qr_png_base64(qr_data, fill_color="#CCFF00", back_color="#121212")
+    
+    context = {
+        'booking': booking,
+        'qr_image': qr_image,
+    }
+    return render(request, 'gym_app/booking_success.html', context)
+
+
+def update_location(request):
+    """API endpoint to update customer's last known location.
+
+    Pings are buffered and written in batches (see locations.py); ``queued``
+    is false when the customer hasn't moved far enough to record.
+    """
+    if request.method == 'POST' and request.user.is_authenticated:
+        if hasattr(request.user, 'customer_profile'):
+            import json
+            try:
+                data = json.loads(request.body)
+                latitude = float(data['latitude'])
+                longitude = float(data['longitude'])
+            except (ValueError, KeyError, TypeError):
+                return JsonResponse({'status': 'error'}, status=400)
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                return JsonResponse({'status': 'error'}, status=400)
+            queued = location_buffer.record(
+                request.user.customer_profile, latitude, longitude, data.get('city', '')
+            )
+            return JsonResponse({'status': 'ok', 'queued': queued})
+    return JsonResponse({'status': 'error'}, status=400)
@@ -0,0 +1,167 @@
+"""
+Gym owner pages: dashboard, booking export and gym/plan management.
+"""
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+
+from ..analytics import owner_analytics
+from ..exports import FORMATS as EXPORT_FORMATS, iter_export, owner_booking_rows
+from ..forms import GymPhotoForm, GymPlanForm, GymRegistrationForm
+from ..models import Booking, Gym, GymPhoto, GymPlan
+
+
+@login_required
+def owner_dashboard(request):
+    """Dashboard for gym owners to manage their gyms."""
+    if request.role != 'owner':
+        messages.error(request, 'Access denied. This area is for gym owners only.')
+        return redirect('landing')
+    
+    owner = request.user.gym_owner_profile
+    gym_bookings = Booking.objects.filter(gym=OuterRef('pk')).order_by().values('gym')
+    gyms = owner.gyms.all().prefetch_related('photos', 'plans').annotate(
+        booking_count=Coalesce(Subquery(gym_bookings.annotate(n=Count('id')).values('n')), 0),
+    )
+    
+    # Calculate stats (bookings themselves are loaded page by page from api_owner_bookings)
+    stats = Booking.objects.filter(gym__owner=owner).aggregate(
+        total_bookings=Count('id'),
+        total_revenue=Sum('amount', filter=Q(payment_status__in=Booking.PAID_STATUSES)),
+    )
+    total_bookings = stats['total_bookings']
+    total_revenue = stats['total_revenue'] or 0
+    
+    context = {
+        'owner': owner,
+        'gyms': gyms,
+        'total_bookings': total_bookings,
+        'total_revenue': total_revenue,
+        'analytics': owner_analytics(owner, months=6),
+    }
+    return render(request, 'gym_app/owner_dashboard.html', context)
+
+
+@login_required
+def owner_bookings_export(request):
+    """Stream the owner's booking history as CSV (default) or NDJSON."""
+    if request.role != 'owner':
+        messages.error(request, 'Access denied. This area is for gym owners only.')
+        return redirect('landing')
+    
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+    gym_id = request.GET.get('gym')
+    if gym_id is not None and not gym_id.isdigit():
+        return JsonResponse({'error': 'gym must be a gym id'}, status=400)
+    
+    rows = owner_booking_rows(request.user.gym_owner_profile, int(gym_id) if gym_id else None)
+    response = StreamingHttpResponse(iter_export(rows, export_format), content_type=EXPORT_FORMATS[export_format])
+    filename = f"bookings-{timezone.now():%Y%m%d}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def gym_register(request):
+    """Register a new gym (for gym owners)."""
+    if request.role != 'owner':
+        messages.error(request, 'Please register as a gym owner first.')
+        return redirect('owner_register')
+    
+    if request.method == 'POST':
+        gym_form = GymRegistrationForm(request.POST)
+        photo_form = GymPhotoForm(request.POST, request.FILES)
+        
+        if gym_form.is_valid() and photo_form.is_valid():
+            gym = gym_form.save(commit=False)
+            gym.owner = request.user.gym_owner_profile
+            gym.save()
+            
+            # Save photos
+            photos = photo_form.get_photos()
+            for i, photo in enumerate(photos):
+                GymPhoto.objects.create(
+                    gym=gym,
+                    image=photo,
+                    is_primary=(i == 0)  # First photo is primary
+                )
+            
+            messages.success(request, f'{gym.name} has been registered! Now add your plans.')
+            return redirect('gym_add_plans', gym_id=gym.id)
+    else:
+        gym_form = GymRegistrationForm()
+        photo_form = GymPhotoForm()
+    
+    context = {
+        'gym_form': gym_form,
+        'photo_form': photo_form,
+    }
+    return render(request, 'gym_app/gym_register.html', context)
+
+
+@login_required
+def gym_add_plans(request, gym_id):
+    """Add plans to a gym."""
+    gym = get_object_or_404(Gym, id=gym_id)
+    
+    # Verify ownership
+    if gym.owner.user != request.user:
+        messages.error(request, 'Access denied.')
+        return redirect('owner_dashboard')
+    
+    if request.method == 'POST':
+        form = GymPlanForm(request.POST)
+        if form.is_valid():
+            plan = form.save(commit=False)
+            plan.gym = gym
+            plan.save()
+            messages.success(request, f'Plan "{plan.name}" added!')
+            
+            if 'add_another' in request.POST:
+                return redirect('gym_add_plans', gym_id=gym.id)
+            return redirect('owner_dashboard')
+    else:
+        form = GymPlanForm()
+    
+    existing_plans = gym.plans.all()
+    
+    context = {
+        'gym': gym,
+        'form': form,
+        'existing_plans': existing_plans,
+    }
+    return render(request, 'gym_app/gym_add_plans.html', context)
+
+
+@login_required
+def gym_edit_plan(request, gym_id, plan_id):
+    """Edit an existing gym plan."""
+    gym = get_object_or_404(Gym, id=gym_id)
+    plan = get_object_or_404(GymPlan, id=plan_id, gym=gym)
+    
+    # Verify ownership
+    if gym.owner.user != request.user:
+        messages.error(request, 'Access denied.')
+        return redirect('owner_dashboard')
+    
+    if request.method == 'POST':
+        form = GymPlanForm(request.POST, instance=plan)
+        if form.is_valid():
+            form.save()
+            messages.success(request, f'Plan "{plan.name}" updated successfully!')
+            return redirect('owner_dashboard')
+    else:
+        form = GymPlanForm(instance=plan)
+    
+    context = {
+        'gym': gym,
+        'plan': plan,
+        'form': form,
+    }
+    return render(request, 'gym_app/gym_edit_plan.html', context)
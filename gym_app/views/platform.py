@@ -0,0 +1,72 @@
+"""
+Platform staff pages: headline stats and the member roster.
+"""
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404, redirect, render
+
+from ..members import MEMBER_SORTS, PAGE_SIZE as MEMBER_PAGE_SIZE, cached_platform_stats, member_queryset
+from ..models import Booking
+from ..pagination import keyset_page
+from ..qr import qr_png_base64
+
+
+@login_required
+def admin_dashboard(request):
+    """Platform-wide dashboard for staff: members, active passes and revenue."""
+    if not request.user.is_staff:
+        messages.error(request, 'Access denied. This area is for platform staff only.')
+        return redirect('landing')
+    
+    context = cached_platform_stats()
+    context['recent_payments'] = (
+        Booking.objects.filter(payment_status__in=Booking.PAID_STATUSES)
+        .select_related('customer__user', 'gym', 'plan')
+        .order_by('-created_at', '-id')[:10]
+    )
+    return render(request, 'gym_app/admin_dashboard.html', context)
+
+
+@login_required
+def admin_member_list(request):
+    """Member roster with server-side search, sort and keyset pagination."""
+    if not request.user.is_staff:
+        messages.error(request, 'Access denied. This area is for platform staff only.')
+        return redirect('landing')
+    
+    search = request.GET.get('q', '')
+    sort = request.GET.get('sort', 'newest')
+    if sort not in MEMBER_SORTS:
+        sort = 'newest'
+    
+    members, next_cursor = keyset_page(
+        member_queryset(search), MEMBER_SORTS[sort], request.GET.get('cursor'), MEMBER_PAGE_SIZE
+    )
+    
+    context = {
+        'members': members,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+        'search': search,
+        'sort': sort,
+        'sorts': list(MEMBER_SORTS),
+    }
+    return render(request, 'gym_app/admin_member_list.html', context)
+
+
+@login_required
+def admin_member_profile(request, customer_id):
+    """Single member with pass status and booking history."""
+    if not request.user.is_staff:
+        messages.error(request, 'Access denied. This area is for platform staff only.')
+        return redirect('landing')
+    
+    member = get_object_or_404(member_queryset(), id=customer_id)
+    payments = member.bookings.select_related('gym', 'plan').order_by('-created_at', '-id')[:50]
+    
+    context = {
+        'member': member,
+        'payments': payments,
+        'qr_image': qr_png_base64(f"MuscleMeter Member #{member.id:04d}"),
+    }
+    return render(request, 'gym_app/member_profile.html', context)
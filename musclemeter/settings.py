@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import json
 import os
 import dj_database_url
+from corsheaders.defaults import default_headers
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,12 +50,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Must be top
+    'gym_app.routers.ReplicaPinMiddleware',  # per-request DB routing state
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'gym_app.roles.RoleMiddleware',  # request.role; after AuthenticationMiddleware
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,13 +85,44 @@ WSGI_APPLICATION = 'musclemeter.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': dj_database_url.config(
-        default='sqlite:///' + str(BASE_DIR / 'db.sqlite3'),
-        conn_max_age=600
+def database_config(env, default=None):
+    """Persistent, health-checked connections; DATABASE_POOL=1 switches Postgres to psycopg 3's pool."""
+    config = dj_database_url.config(
+        env=env,
+        default=default,
+        conn_max_age=600,
+        conn_health_checks=True,  # ping reused connections before each request
     )
+    if config and os.environ.get('DATABASE_POOL') and 'postgresql' in config['ENGINE']:
+        # Needs psycopg[pool]; pooled connections are checked on checkout and
+        # recycled when idle, and don't combine with CONN_MAX_AGE
+        config['CONN_MAX_AGE'] = 0
+        config['CONN_HEALTH_CHECKS'] = False
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': 1,
+            'max_size': int(os.environ.get('DATABASE_POOL_SIZE', '4')),
+            'max_idle': 300,
+        }
+    return config
+
+
+DATABASES = {
+    'default': database_config('DATABASE_URL', 'sqlite:///' + str(BASE_DIR / 'db.sqlite3')),
 }
 
+# Optional read replica for the read-heavy gym views (gym_app/routers.py).
+# Locally, a second SQLite file filled by `manage.py sync_replica` stands in for it.
+if os.environ.get('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = database_config('DATABASE_REPLICA_URL')
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['gym_app.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10  # keep a client on the primary this long after it writes
+
+
+# Loads users with their gym owner / customer profiles joined in (gym_app/roles.py)
+AUTHENTICATION_BACKENDS = ['gym_app.roles.ProfileModelBackend']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -141,6 +176,9 @@ CORS_ALLOW_ALL_ORIGINS = True  # For development/easiest setup (allow all)
 #     "https://your-netlify-app-name.netlify.app",
 #     "http://localhost:3000",
 # ]
+# The frontend revalidates cached API responses with If-None-Match and reads their ETag
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match')
+CORS_EXPOSE_HEADERS = ['ETag']
 
 # DRF Configuration
 REST_FRAMEWORK = {
@@ -148,11 +186,94 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        # Signed bearer tokens first: no DB access per request (see gym_app/authentication.py)
+        'gym_app.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
 }
 
+# Firebase project whose ID tokens /api/auth/google/ accepts (gym_app/firebase_tokens.py)
+FIREBASE_PROJECT_ID = os.environ.get('FIREBASE_PROJECT_ID') or json.loads(
+    os.environ.get('FIREBASE_CREDENTIALS') or '{}'
+).get('project_id', '')
+
+# Lifetime of API tokens issued by /api/auth/token/ and the login/register endpoints
+API_TOKEN_MAX_AGE = int(os.environ.get('API_TOKEN_MAX_AGE', 60 * 60 * 24 * 7))  # seconds
+
+# Payments (gym_app/payments.py). Webhook events are queued and applied in batches by
+# `manage.py process_payments --loop`. PAYMENT_INLINE_DRAIN=1 (local development without
+# that worker) lets the booking status pages drain a batch, at most once per interval.
+PAYMENT_GATEWAY = os.environ.get('PAYMENT_GATEWAY', 'gym_app.payments.FakeGateway')
+PAYMENT_WEBHOOK_SECRET = os.environ.get('PAYMENT_WEBHOOK_SECRET', 'insecure-dev-webhook-secret')  # check --deploy rejects the default
+PAYMENT_BATCH_SIZE = 500  # webhook events applied per transaction
+PAYMENT_INLINE_DRAIN = os.environ.get('PAYMENT_INLINE_DRAIN', '0') == '1'
+PAYMENT_DRAIN_INTERVAL = 1  # seconds
+
+# Email. Prints to the console unless EMAIL_BACKEND says otherwise: use
+# django.core.mail.backends.filebased.EmailBackend with EMAIL_FILE_PATH to keep copies,
+# or django.core.mail.backends.smtp.EmailBackend with the EMAIL_HOST settings in production.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', str(BASE_DIR / 'sent_emails'))
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '1') == '1'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'MuscleMeter <no-reply@musclemeter.app>')
+
+# Notifications (gym_app/notifications.py), queued in an outbox and sent by
+# `manage.py send_notifications --loop`; `manage.py queue_expiry_reminders` runs daily.
+NOTIFICATION_CHANNELS = {
+    'email': 'gym_app.notifications.EmailChannel',
+}
+NOTIFICATION_BATCH_SIZE = 200  # notifications claimed per batch
+NOTIFICATION_CONCURRENCY = 4  # sends in flight at once
+EXPIRY_REMINDER_DAYS = 3
+
+# Cache: a per-process LRU (gym_app/cache.py) in front of a cache shared by all workers.
+# Set REDIS_URL in production (`check --deploy` requires it). The file cache is for development:
+# its add()/incr() aren't atomic across processes, and every set lists the whole directory,
+# so it keeps Django's default 300-entry cap.
+if os.environ.get('REDIS_URL'):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / '.cache')),
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'gym_app.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', '1000')),
+            'LOCAL_TIMEOUT': 5,  # seconds a worker may serve its own copy of a shared value
+        },
+    },
+    'shared': SHARED_CACHE,
+}
+
+# Explore page cache
+# Results are shared per geo cell; tune the cell size with `manage.py explore_cache_stats`
+EXPLORE_CACHE_CELL_SIZE = float(os.environ.get('EXPLORE_CACHE_CELL_SIZE', '0.01'))  # degrees (~1.1 km)
+EXPLORE_CACHE_FRESH_TTL = 60  # seconds before an entry is revalidated
+EXPLORE_CACHE_STALE_TTL = 600  # seconds a stale entry may still be served
+
+# Customer location pings (gym_app/locations.py)
+LOCATION_MIN_DISTANCE_KM = float(os.environ.get('LOCATION_MIN_DISTANCE_KM', '0.1'))  # smaller moves are dropped
+LOCATION_FLUSH_INTERVAL = int(os.environ.get('LOCATION_FLUSH_INTERVAL', '30'))  # seconds between batched writes (manage.py flush_locations)
+
+# Precomputed "gyms near me" lists (gym_app/nearby.py, manage.py refresh_nearby)
+NEARBY_LIMIT = 50  # gyms kept per customer
+NEARBY_RECOMPUTE_KM = float(os.environ.get('NEARBY_RECOMPUTE_KM', '1.0'))  # move this far to rebuild on read
+NEARBY_REFRESH_RADIUS_KM = 20  # customers this close to a changed gym are refreshed
+NEARBY_CACHE_TTL = 60 * 60 * 24
+
 # Cloudinary Configuration
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.environ.get('CLOUDINARY_CLOUD_NAME'),